@@ -0,0 +1,206 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Awaitable wrappers around the blocking point, key and signature
+operations, for use from an asyncio event loop.
+
+The operations run on an Executor (see executor) through an
+AsyncExecutor, which bounds the number of calls in flight and the
+number of calls waiting for a worker. Native results of calls that
+were cancelled while running are freed as soon as the call finishes.
+"""
+
+import collections
+import threading
+
+import executor as ec_executor
+
+_asyncio = None
+
+def _import_asyncio():
+    # asyncio (trollius on Python 2) takes longer to import than
+    # the rest of the library, so it is only imported when needed
+    global _asyncio
+    if _asyncio is None:
+        try:
+            import asyncio
+        except ImportError:
+            try:
+                import trollius as asyncio
+            except ImportError:
+                raise ImportError( 'aio needs asyncio, or trollius on Python 2' )
+        _asyncio = asyncio
+    return _asyncio
+
+def available():
+    """
+    Returns whether asyncio (or trollius) can be imported, so
+    that AsyncExecutor and the awaitable methods can be used.
+    """
+    try:
+        _import_asyncio()
+    except ImportError:
+        return False
+    return True
+
+class Overloaded(Exception):
+    '''
+    Raised when a call is submitted while the
+    AsyncExecutor's pending queue is full.
+    '''
+    pass
+
+class AsyncExecutor:
+    '''
+    Runs blocking calls on an Executor and exposes
+    their results as asyncio futures.
+    '''
+
+    def __init__(self, executor=None, max_in_flight=None, max_pending=None):
+        '''
+        Constructor
+
+        At most max_in_flight calls (default: one per worker) are
+        handed to the executor at a time. Further calls wait in a queue
+        of at most max_pending entries (default: unbounded); once it is
+        full, run raises Overloaded.
+        '''
+        _import_asyncio()
+        self.executor = executor or ec_executor.get_executor()
+        self.max_in_flight = max_in_flight or self.executor.workers
+        self.max_pending = max_pending
+        self._in_flight = 0
+        # The calls waiting for a worker, oldest first, by waiter
+        self._pending = collections.OrderedDict()
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Schedules fn( *args, **kwargs ) and returns an asyncio
+        future for its result. Must be called from the loop thread.
+        """
+        asyncio = _import_asyncio()
+        loop = asyncio.get_event_loop()
+        waiter = asyncio.Future( loop=loop )
+        if self._in_flight < self.max_in_flight:
+            self.__submit( loop, waiter, fn, args, kwargs )
+        elif self.max_pending is not None and len( self._pending ) >= self.max_pending:
+            raise Overloaded( '%d calls are already waiting' % len( self._pending ) )
+        else:
+            self._pending[waiter] = ( loop, fn, args, kwargs )
+            waiter.add_done_callback( self.__discard )
+        return waiter
+
+    def in_flight(self):
+        return self._in_flight
+
+    def pending(self):
+        return len( self._pending )
+
+    def __discard(self, waiter):
+        # A waiter cancelled while pending no longer counts towards
+        # max_pending (if it was handed to the executor, it is gone)
+        self._pending.pop( waiter, None )
+
+    def __submit(self, loop, waiter, fn, args, kwargs):
+        self._in_flight += 1
+        future = self.executor.submit( fn, *args, **kwargs )
+
+        def on_cancel(waiter):
+            if waiter.cancelled():
+                future.cancel()
+
+        def on_done(future):
+            try:
+                loop.call_soon_threadsafe( self.__finish, waiter, future )
+            except RuntimeError:
+                # The loop is closed; nobody will read the result
+                _release( future )
+
+        waiter.add_done_callback( on_cancel )
+        future.add_done_callback( on_done )
+
+    def __finish(self, waiter, future):
+        self._in_flight -= 1
+        while self._pending and self._in_flight < self.max_in_flight:
+            next_waiter, ( loop, fn, args, kwargs ) = self._pending.popitem( last=False )
+            if not next_waiter.done():
+                self.__submit( loop, next_waiter, fn, args, kwargs )
+
+        if waiter.done():
+            _release( future )
+        elif future.cancelled():
+            waiter.cancel()
+        elif future.exception() is not None:
+            waiter.set_exception( future.exception() )
+        else:
+            waiter.set_result( future.result() )
+
+    def __str__(self):
+        return "AsyncExecutor<in flight: %d/%d, pending: %d>" % ( self._in_flight, self.max_in_flight, len( self._pending ) )
+
+    __repr__ = __str__
+
+def _release(future):
+    """
+    Frees the native resources held by the result
+    of a call whose caller has gone away.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    for item in result if isinstance( result, ( list, tuple ) ) else [ result ]:
+        if hasattr( item, 'free' ):
+            item.free()
+
+_default = None
+_default_lock = threading.Lock()
+
+def configure(executor=None, max_in_flight=None, max_pending=None):
+    """
+    Replaces the AsyncExecutor used by run and the
+    awaitable methods of Curve, KeyPair and sample_lsag.
+    """
+    global _default
+    with _default_lock:
+        _default = AsyncExecutor( executor, max_in_flight, max_pending )
+    return _default
+
+def get_async_executor():
+    """
+    Returns the AsyncExecutor used by run,
+    creating a default one on first use.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = AsyncExecutor()
+        return _default
+
+def run(fn, *args, **kwargs):
+    """
+    Runs fn( *args, **kwargs ) on the default AsyncExecutor
+    and returns an awaitable for its result.
+    """
+    return get_async_executor().run( fn, *args, **kwargs )
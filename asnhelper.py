@@ -44,7 +44,7 @@ class ASNHelper:
             data, buf = buf[:length], buf[length:]
 #            print (cls, pc, tag, length)
             if tag == ASNHelper.TAG_INTEGER or tag == ASNHelper.TAG_OCTET_STRING:
-                yield int( "".join( map( lambda x: "%X" % ord(x), data ) ), 16 )
+                yield int( "".join( map( lambda x: "%02X" % ord(x), data ) ), 16 )
             elif tag == ASNHelper.TAG_OCTET_STRING:
                 yield data
             elif tag == ASNHelper.TAG_OBJECT_IDENTIFIER:
@@ -69,6 +69,6 @@ class ASNHelper:
         else:
             octet_count = int(first_octet) - 0x80
             length_octets, buf = buf[:octet_count], buf[octet_count:]
-            length = int( "".join( map( lambda x: "%X" % ord(x), length_octets )), 16 )
+            length = int( "".join( map( lambda x: "%02X" % ord(x), length_octets )), 16 )
             return buf, length
             
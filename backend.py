@@ -0,0 +1,359 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+"""
+Native backends for key pair generation, ECDH and ECDSA.
+
+OpenSSL 3 deprecates the EC_KEY, ECDH and ECDSA functions, and only
+its EVP_PKEY interface reaches the implementations of the providers.
+Two backends are available:
+
+    LegacyBackend   EC_KEY_generate_key, ECDH_compute_key, ECDSA_sign
+                    and ECDSA_verify, on EC_KEYs (KeyPair.os_key)
+    EVPBackend      EVP_PKEY_generate, EVP_PKEY_derive, EVP_PKEY_sign
+                    and EVP_PKEY_verify, on EVP_PKEYs (KeyPair.os_pkey)
+
+get() returns the backend for the loaded library, chosen the first
+time it is called: EVPBackend from OpenSSL 3.0 on, LegacyBackend
+before. use() overrides the choice.
+
+Shared secrets are the x coordinate of the shared point,
+curve.field_bytes long, with no key derivation function applied.
+Signatures are DER-encoded and made over a digest computed by the
+caller. The EVP backend only supports named curves.
+"""
+
+import ctypes
+import threading
+
+from pyelliptic import openssl
+from pyelliptic.openssl import OpenSSL
+import bignum as ec_bignum
+import point as ec_point
+
+OPENSSL_3 = 0x30000000
+
+def check_peer(public_key):
+    """
+    Raises an exception unless public_key, a Point or a KeyPair, is
+    a valid point of the subgroup (see Point.is_valid). ECDH with a
+    point off the curve, or of small order, leaks bits of the
+    private key.
+    """
+    point = public_key if isinstance( public_key, ec_point.Point ) else public_key.public_key
+    if not point.is_valid():
+        raise Exception( 'Peer public key is not valid' )
+
+def group_name(curve):
+    """
+    Returns the OpenSSL short name of a named curve.
+    """
+    nid = OpenSSL.EC_GROUP_get_curve_name( curve.os_group )
+    if nid == 0:
+        raise Exception( 'Only named curves have an EVP_PKEY group name' )
+    return OpenSSL.OBJ_nid2sn( nid )
+
+def new_pkey(curve, private_key=None, public_key=None):
+    """
+    Returns a new EVP_PKEY holding public_key (a Point),
+    and private_key if given. The caller must free it
+    with EVP_PKEY_free.
+    """
+    selection = openssl.EVP_PKEY_PUBLIC_KEY
+    # The builder refers to the values pushed until to_param is called
+    name = group_name( curve )
+    encoded = public_key.to_bytes( compressed=False )
+    builder = OpenSSL.OSSL_PARAM_BLD_new()
+    params = ctx = None
+    try:
+        OpenSSL.OSSL_PARAM_BLD_push_utf8_string( builder, "group", name, 0 )
+        OpenSSL.OSSL_PARAM_BLD_push_octet_string( builder, "pub", encoded, len( encoded ) )
+        if private_key is not None:
+            selection = openssl.EVP_PKEY_KEYPAIR
+            privk = ec_bignum.BigNum( decval=private_key )
+            OpenSSL.OSSL_PARAM_BLD_push_BN( builder, "priv", privk.bn )
+        params = OpenSSL.OSSL_PARAM_BLD_to_param( builder )
+        ctx = OpenSSL.EVP_PKEY_CTX_new_from_name( None, "EC", None )
+        pkey = ctypes.c_void_p()
+        if not params or not ctx or OpenSSL.EVP_PKEY_fromdata_init( ctx ) != 1 or \
+                OpenSSL.EVP_PKEY_fromdata( ctx, ctypes.byref( pkey ), selection, params ) != 1:
+            raise Exception( 'Could not create an EVP_PKEY' )
+        return pkey.value
+    finally:
+        if ctx:
+            OpenSSL.EVP_PKEY_CTX_free( ctx )
+        if params:
+            OpenSSL.OSSL_PARAM_free( params )
+        OpenSSL.OSSL_PARAM_BLD_free( builder )
+
+def new_ec_key(curve, public_key):
+    """
+    Returns a new EC_KEY holding only public_key (a Point).
+    The caller must free it with EC_KEY_free.
+    """
+    os_key = OpenSSL.EC_KEY_new()
+    if OpenSSL.EC_KEY_set_group( os_key, curve.os_group ) != 1 or \
+            OpenSSL.EC_KEY_set_public_key( os_key, public_key.os_point ) != 1:
+        OpenSSL.EC_KEY_free( os_key )
+        raise Exception( 'Could not create an EC_KEY' )
+    return os_key
+
+class LegacyBackend:
+    '''
+    Key pairs, ECDH and ECDSA with the EC_KEY functions,
+    the only ones available before OpenSSL 3.
+    '''
+
+    name = 'legacy'
+    # The KeyPair attribute holding the native key
+    attribute = 'os_key'
+
+    def generate(self, curve):
+        """
+        Generates a random key pair, returned as the private key,
+        the public key and an EC_KEY holding both, which the
+        caller must free.
+        """
+        os_key = OpenSSL.EC_KEY_new()
+        try:
+            if OpenSSL.EC_KEY_set_group( os_key, curve.os_group ) != 1 or \
+                    OpenSSL.EC_KEY_generate_key( os_key ) != 1:
+                raise Exception( 'Could not generate a key pair' )
+            private_key = ec_bignum.BigNum( OpenSSL.EC_KEY_get0_private_key( os_key ) ).get_value()
+            # Copy the public key, so that it outlives the EC_KEY
+            pubk = OpenSSL.EC_POINT_dup( OpenSSL.EC_KEY_get0_public_key( os_key ), curve.os_group )
+        except:
+            OpenSSL.EC_KEY_free( os_key )
+            raise
+        return private_key, ec_point.Point( curve, openssl_point=pubk, owned=True ), os_key
+
+    def ecdh(self, keypair, public_key):
+        """
+        Returns the x coordinate of keypair.private_key * public_key.
+        """
+        check_peer( public_key )
+        size = keypair.curve.field_bytes
+        buf = OpenSSL.malloc( 0, size )
+        if OpenSSL.ECDH_compute_key( buf, size, public_key.os_point, keypair.os_key, None ) != size:
+            raise Exception( 'ECDH failed' )
+        return buf.raw
+
+    def sign(self, keypair, digest):
+        """
+        Returns the DER-encoded ECDSA signature of digest.
+        """
+        buf = OpenSSL.malloc( 0, OpenSSL.ECDSA_size( keypair.os_key ) )
+        size = ctypes.c_uint( 0 )
+        if OpenSSL.ECDSA_sign( 0, digest, len( digest ), buf, ctypes.byref( size ), keypair.os_key ) != 1:
+            raise Exception( 'ECDSA signing failed' )
+        return buf.raw[:size.value]
+
+    def verify(self, curve, public_key, digest, signature):
+        """
+        Returns whether signature is a valid signature of digest
+        by public_key, a Point or a KeyPair.
+        """
+        if isinstance( public_key, ec_point.Point ):
+            os_key = new_ec_key( curve, public_key )
+            try:
+                return OpenSSL.ECDSA_verify( 0, digest, len( digest ), signature, len( signature ), os_key ) == 1
+            finally:
+                OpenSSL.EC_KEY_free( os_key )
+        return OpenSSL.ECDSA_verify( 0, digest, len( digest ), signature, len( signature ), public_key.os_key ) == 1
+
+    def __str__(self):
+        return "LegacyBackend"
+
+    __repr__ = __str__
+
+class KeygenContext:
+    '''
+    Owns an EVP_PKEY_CTX set up for generating keys on one
+    curve. Contexts must not be shared between threads.
+    '''
+
+    def __init__(self, curve):
+        # Kept for __del__, which may run after the module is torn down
+        self.__free = OpenSSL.EVP_PKEY_CTX_free
+        self.ctx = OpenSSL.EVP_PKEY_CTX_new_from_name( None, "EC", None )
+        if not self.ctx or OpenSSL.EVP_PKEY_keygen_init( self.ctx ) != 1 or \
+                OpenSSL.EVP_PKEY_CTX_set_group_name( self.ctx, group_name( curve ) ) != 1:
+            raise Exception( 'Could not set up key generation for %s' % curve )
+
+    def __del__(self):
+        if self.ctx:
+            self.__free( self.ctx )
+
+class EVPBackend:
+    '''
+    Key pairs, ECDH and ECDSA with the EVP_PKEY functions
+    of OpenSSL 3.
+    '''
+
+    name = 'evp'
+    # The KeyPair attribute holding the native key
+    attribute = 'os_pkey'
+
+    def __init__(self):
+        # Key generation contexts by curve id, per thread
+        self.__local = threading.local()
+
+    def __keygen_context(self, curve):
+        contexts = getattr( self.__local, 'contexts', None )
+        if contexts is None:
+            contexts = self.__local.contexts = {}
+        nid = OpenSSL.EC_GROUP_get_curve_name( curve.os_group )
+        context = contexts.get( nid )
+        if context is None:
+            context = contexts[nid] = KeygenContext( curve )
+        return context.ctx
+
+    def generate(self, curve):
+        """
+        Generates a random key pair, returned as the private key,
+        the public key and an EVP_PKEY holding both, which the
+        caller must free.
+        """
+        pkey = ctypes.c_void_p()
+        if OpenSSL.EVP_PKEY_generate( self.__keygen_context( curve ), ctypes.byref( pkey ) ) != 1:
+            raise Exception( 'Could not generate a key pair' )
+        pkey = pkey.value
+        privk = ctypes.c_void_p()
+        try:
+            buf = OpenSSL.malloc( 0, curve.point_size( compressed=False ) )
+            size = ctypes.c_size_t( 0 )
+            if OpenSSL.EVP_PKEY_get_bn_param( pkey, "priv", ctypes.byref( privk ) ) != 1 or \
+                    OpenSSL.EVP_PKEY_get_octet_string_param( pkey, "pub", buf, len( buf ), ctypes.byref( size ) ) != 1:
+                raise Exception( 'Could not read the generated key pair' )
+            private_key = ec_bignum.BigNum( privk.value ).get_value()
+        except:
+            OpenSSL.EVP_PKEY_free( pkey )
+            raise
+        finally:
+            if privk.value:
+                OpenSSL.BN_free( privk.value )
+        # The public key is only decoded when used
+        return private_key, ec_point.Point( curve, encoded=buf.raw[:size.value] ), pkey
+
+    def __public_pkey(self, curve, public_key):
+        """
+        Returns the EVP_PKEY of public_key, a Point or a KeyPair,
+        and whether the caller must free it.
+        """
+        if isinstance( public_key, ec_point.Point ):
+            return new_pkey( curve, public_key=public_key ), True
+        return public_key.os_pkey, False
+
+    def ecdh(self, keypair, public_key):
+        """
+        Returns the x coordinate of keypair.private_key * public_key.
+        """
+        check_peer( public_key )
+        peer, owned = self.__public_pkey( keypair.curve, public_key )
+        ctx = OpenSSL.EVP_PKEY_CTX_new( keypair.os_pkey, None )
+        try:
+            size = ctypes.c_size_t( keypair.curve.field_bytes )
+            buf = OpenSSL.malloc( 0, size.value )
+            if not ctx or OpenSSL.EVP_PKEY_derive_init( ctx ) != 1 or \
+                    OpenSSL.EVP_PKEY_derive_set_peer_ex( ctx, peer, 1 ) != 1 or \
+                    OpenSSL.EVP_PKEY_derive( ctx, buf, ctypes.byref( size ) ) != 1:
+                raise Exception( 'ECDH failed' )
+            return buf.raw[:size.value]
+        finally:
+            if ctx:
+                OpenSSL.EVP_PKEY_CTX_free( ctx )
+            if owned:
+                OpenSSL.EVP_PKEY_free( peer )
+
+    def sign(self, keypair, digest):
+        """
+        Returns the DER-encoded ECDSA signature of digest.
+        """
+        ctx = OpenSSL.EVP_PKEY_CTX_new( keypair.os_pkey, None )
+        try:
+            size = ctypes.c_size_t( 0 )
+            if not ctx or OpenSSL.EVP_PKEY_sign_init( ctx ) != 1 or \
+                    OpenSSL.EVP_PKEY_sign( ctx, None, ctypes.byref( size ), digest, len( digest ) ) != 1:
+                raise Exception( 'ECDSA signing failed' )
+            buf = OpenSSL.malloc( 0, size.value )
+            if OpenSSL.EVP_PKEY_sign( ctx, buf, ctypes.byref( size ), digest, len( digest ) ) != 1:
+                raise Exception( 'ECDSA signing failed' )
+            return buf.raw[:size.value]
+        finally:
+            if ctx:
+                OpenSSL.EVP_PKEY_CTX_free( ctx )
+
+    def verify(self, curve, public_key, digest, signature):
+        """
+        Returns whether signature is a valid signature of digest
+        by public_key, a Point or a KeyPair.
+        """
+        pkey, owned = self.__public_pkey( curve, public_key )
+        ctx = OpenSSL.EVP_PKEY_CTX_new( pkey, None )
+        try:
+            if not ctx or OpenSSL.EVP_PKEY_verify_init( ctx ) != 1:
+                raise Exception( 'ECDSA verification failed' )
+            return OpenSSL.EVP_PKEY_verify( ctx, signature, len( signature ), digest, len( digest ) ) == 1
+        finally:
+            if ctx:
+                OpenSSL.EVP_PKEY_CTX_free( ctx )
+            if owned:
+                OpenSSL.EVP_PKEY_free( pkey )
+
+    def __str__(self):
+        return "EVPBackend"
+
+    __repr__ = __str__
+
+BACKENDS = {
+    LegacyBackend.name: LegacyBackend(),
+    EVPBackend.name: EVPBackend(),
+}
+
+_backend = None
+
+def select(version):
+    """
+    Returns the backend to use with the given OpenSSL version number.
+    """
+    return BACKENDS['evp' if version >= OPENSSL_3 else 'legacy']
+
+def get():
+    """
+    Returns the backend in use, chosen by the version
+    of the loaded library unless set with use().
+    """
+    global _backend
+    if _backend is None:
+        _backend = select( OpenSSL.version_number() )
+    return _backend
+
+def use(name):
+    """
+    Makes the backend called name ('legacy' or 'evp') the one in use,
+    or with None goes back to choosing by the library version.
+    """
+    global _backend
+    if name is not None and name not in BACKENDS:
+        raise Exception( 'Unknown backend %s' % name )
+    _backend = BACKENDS[name] if name is not None else None
@@ -0,0 +1,68 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import multiprocessing
+import time
+from random import randint
+
+from curve import Curve
+import executor as ec_executor
+
+
+CURVE = "secp256k1"
+MUL_COUNT = 2000
+
+def run_scaling_test( curve, scalars, workers ):
+    # Warm up the pool so thread start-up is not measured
+    curve.map_mul( scalars[:workers], workers=workers )
+    t_start = time.time()
+    results = curve.map_mul( scalars, workers=workers )
+    t = time.time() - t_start
+    print "%2d worker(s): %d multiplications took %.3f seconds (%.1f mul/s)" \
+                % ( workers, len( scalars ), t, len( scalars ) / t )
+    return ( workers, t, results )
+
+def run( max_workers=None ):
+    curve = Curve( CURVE )
+    max_workers = max_workers or multiprocessing.cpu_count()
+    scalars = [ randint( 1, curve.order - 1 ) for _ in range( MUL_COUNT ) ]
+
+    results = []
+    reference = None
+    for workers in range( 1, max_workers + 1 ):
+        workers, t, products = run_scaling_test( curve, scalars, workers )
+        if reference is None:
+            reference = products
+        assert products == reference
+        results.append( ( workers, t ) )
+
+    t_1 = results[0][1]
+    for workers, t in results:
+        print "%2d worker(s): speed-up %.2fx" % ( workers, t_1 / t )
+
+    ec_executor.shutdown_executors()
+    return results
+
+if __name__ == "__main__":
+    run()
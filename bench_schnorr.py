@@ -0,0 +1,71 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+from random import randint
+
+from curve import Curve
+import schnorr
+
+
+CURVES = [ "secp256k1", "secp384r1", "secp521r1" ]
+BATCH_SIZES = [ 1, 10, 100, 1000 ]
+
+def make_items( curve, n ):
+    items = []
+    for i in range( n ):
+        private_key = randint( 1, curve.order - 1 )
+        message = "message %d" % i
+        items.append( ( schnorr.public_key( curve, private_key ), message, schnorr.sign( curve, private_key, message ) ) )
+    return items
+
+def run_curve( name ):
+    curve = Curve( name )
+    items = make_items( curve, max( BATCH_SIZES ) )
+    results = []
+    for n in BATCH_SIZES:
+        batch = items[:n]
+
+        t_start = time.time()
+        assert all( schnorr.verify( curve, *item ) for item in batch )
+        t_single = time.time() - t_start
+
+        t_start = time.time()
+        assert schnorr.batch_verify( curve, batch )
+        t_batch = time.time() - t_start
+
+        print "%s, %d signatures: one by one %.3f ms/sig, batch %.3f ms/sig (%.2fx)" \
+                    % ( name, n, 1000 * t_single / n, 1000 * t_batch / n, t_single / t_batch )
+        results.append( ( name, n, t_single / n, t_batch / n ) )
+    return results
+
+def run():
+    results = []
+    for name in CURVES:
+        results.extend( run_curve( name ) )
+    print repr( results )
+    return results
+
+if __name__ == "__main__":
+    run()
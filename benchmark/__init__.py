@@ -0,0 +1,140 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Benchmark suite for Py-EC.
+
+Measures the operations in benchmark.operations on every curve in
+OpenSSL.curves and returns the statistics as a JSON-serialisable dict.
+Run it from the repository root with
+
+    python -m benchmark --output results.json
+    python -m benchmark --baseline results.json
+
+the second form comparing against an earlier run and exiting with a
+non-zero status if any operation regressed.
+"""
+
+import platform
+import random
+import sys
+import time
+
+from pyelliptic.openssl import OpenSSL
+from curve import Curve
+import fixedbase as ec_fixedbase
+import harness
+import operations as ec_operations
+import importtime
+import memory
+
+def run( curves=None, names=None, ring_sizes=ec_operations.RING_SIZES,
+         warmup=1, repeat=5, min_time=0.05, seed=0, import_time=True, memory_counts=(), log=None ):
+    """
+    Runs the suite and returns the results.
+
+    curves and names restrict the curves and operations measured
+    (default: all). Inputs are drawn from a random.Random seeded
+    with seed, so runs with the same arguments use the same values.
+    The precomputation cache (see fixedbase) is cleared before each
+    operation, and disabled for operations whose function has a false
+    precomputation attribute.
+
+    With import_time, the time to start an interpreter and import
+    the library (see benchmark.importtime) is reported under 'import'.
+    The EC_METHOD of every curve (see curve.method_name) is reported
+    in the metadata, and logged as the operation 'method'.
+
+    For every count in memory_counts, the memory taken per object in
+    the benchmark.memory scenarios is reported on each curve, as e.g.
+    'memory_point[10000]'; these are not compared against baselines.
+    """
+    curves = curves or sorted( OpenSSL.curves, key=lambda name: OpenSSL.curves[name] )
+    selected = [ ( name, factory ) for name, factory in ec_operations.operations( ring_sizes )
+                 if names is None or name in names or name.split( '[' )[0] in names ]
+    memory_selected = [ ( name, factory ) for name, factory in memory.SCENARIOS
+                        if names is None or name in names ]
+    results = {}
+    methods = {}
+    if import_time:
+        results['import'] = {}
+        for name, statement in importtime.STATEMENTS:
+            if names is None or name in names:
+                stats = harness.measure( importtime.operation( statement ), warmup=warmup,
+                                         repeat=repeat, min_time=min_time )
+                results['import'][name] = stats
+                if log is not None:
+                    log( 'import', name, stats )
+    max_entries = ec_fixedbase.cache.max_entries
+    try:
+        for curvename in curves:
+            try:
+                curve = Curve( curvename )
+            except Exception, e:
+                results[curvename] = { 'error': str( e ) }
+                continue
+            results[curvename] = {}
+            methods[curvename] = curve.method
+            if log is not None:
+                log( curvename, 'method', { 'method': curve.method } )
+            for name, factory in selected:
+                ec_fixedbase.cache.clear()
+                try:
+                    fn = factory( curve, random.Random( seed ) )
+                    ec_fixedbase.cache.max_entries = max_entries if getattr( fn, 'precomputation', True ) else 0
+                    stats = harness.measure( fn, warmup=warmup, repeat=repeat, min_time=min_time )
+                except Exception, e:
+                    stats = { 'error': "%s: %s" % ( type( e ).__name__, e ) }
+                finally:
+                    ec_fixedbase.cache.max_entries = max_entries
+                results[curvename][name] = stats
+                if log is not None:
+                    log( curvename, name, stats )
+            for name, factory in memory_selected:
+                for count in memory_counts:
+                    try:
+                        stats = memory.measure( factory( curve ), count )
+                    except Exception, e:
+                        stats = { 'error': "%s: %s" % ( type( e ).__name__, e ) }
+                    results[curvename]['%s[%d]' % ( name, count )] = stats
+                    if log is not None:
+                        log( curvename, '%s[%d]' % ( name, count ), stats )
+    finally:
+        ec_fixedbase.cache.clear()
+    return {
+        'meta': {
+            'time': time.strftime( '%Y-%m-%dT%H:%M:%SZ', time.gmtime() ),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'warmup': warmup,
+            'repeat': repeat,
+            'min_time': min_time,
+            'seed': seed,
+            'methods': methods,
+        },
+        'results': results,
+    }
+
+compare = harness.compare
@@ -0,0 +1,96 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import json
+import optparse
+import sys
+
+import benchmark
+import operations as ec_operations
+
+def log( curvename, name, stats ):
+    if 'method' in stats:
+        print "%-10s %-18s %s" % ( curvename, name, stats['method'] )
+    elif 'bytes' in stats:
+        print "%-10s %-18s %10.1f bytes/object" % ( curvename, name, stats['bytes'] )
+    elif 'error' in stats:
+        print "%-10s %-18s error: %s" % ( curvename, name, stats['error'] )
+    else:
+        print "%-10s %-18s %10.3f ms/op (min %.3f, stdev %.3f, %dx%d)" \
+                    % ( curvename, name, 1000 * stats['median'], 1000 * stats['min'],
+                        1000 * stats['stdev'], stats['repeat'], stats['number'] )
+    sys.stdout.flush()
+
+def main( argv ):
+    parser = optparse.OptionParser( usage="python -m benchmark [options]" )
+    parser.add_option( "-c", "--curve", action="append", dest="curves",
+                       help="curve to measure (repeatable, default: all)" )
+    parser.add_option( "-o", "--operation", action="append", dest="names",
+                       help="operation to measure (repeatable, default: all)" )
+    parser.add_option( "--ring-sizes", default=",".join( map( str, ec_operations.RING_SIZES ) ),
+                       help="comma-separated LSAG ring sizes [%default]" )
+    parser.add_option( "--warmup", type="int", default=1, help="warm-up calls [%default]" )
+    parser.add_option( "--repeat", type="int", default=5, help="timed repetitions [%default]" )
+    parser.add_option( "--min-time", type="float", default=0.05,
+                       help="minimum seconds per repetition [%default]" )
+    parser.add_option( "--seed", type="int", default=0, help="random seed [%default]" )
+    parser.add_option( "--no-import-time", action="store_false", dest="import_time", default=True,
+                       help="do not measure the import time" )
+    parser.add_option( "--memory-counts", default="",
+                       help="comma-separated object counts for the memory scenarios [none]" )
+    parser.add_option( "--output", help="write the results as JSON to this file" )
+    parser.add_option( "--baseline", help="compare against results in this JSON file" )
+    parser.add_option( "--threshold", type="float", default=0.10,
+                       help="slow-down counted as a regression [%default]" )
+    options, args = parser.parse_args( argv )
+
+    ring_sizes = [ int( n ) for n in options.ring_sizes.split( "," ) if n ]
+    memory_counts = [ int( n ) for n in options.memory_counts.split( "," ) if n ]
+    results = benchmark.run( curves=options.curves, names=options.names, ring_sizes=ring_sizes,
+                             warmup=options.warmup, repeat=options.repeat,
+                             min_time=options.min_time, seed=options.seed,
+                             import_time=options.import_time, memory_counts=memory_counts, log=log )
+
+    if options.output:
+        with open( options.output, "w" ) as f:
+            json.dump( results, f, indent=2, sort_keys=True )
+
+    if options.baseline:
+        with open( options.baseline ) as f:
+            baseline = json.load( f )
+        rows = benchmark.compare( results, baseline, options.threshold )
+        regressions = 0
+        print
+        for curvename, name, base, median, ratio, regressed in rows:
+            print "%-10s %-18s %10.3f -> %10.3f ms/op (%.2fx)%s" \
+                        % ( curvename, name, 1000 * base, 1000 * median, ratio,
+                            "  REGRESSION" if regressed else "" )
+            regressions += regressed
+        print "%d of %d measurements regressed by more than %d%%" \
+                    % ( regressions, len( rows ), round( 100 * options.threshold ) )
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main( sys.argv[1:] ) )
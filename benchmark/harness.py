@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Timing and comparison helpers for the benchmark suite.
+"""
+
+import math
+import timeit
+
+timer = timeit.default_timer
+
+def measure( fn, warmup=1, repeat=5, min_time=0.05 ):
+    """
+    Times calls of fn() and returns statistics of the time per call.
+
+    fn is first called warmup times. The number of calls per
+    repetition is then chosen so that one repetition takes at least
+    min_time seconds, and repeat repetitions are timed.
+    """
+    for _ in range( warmup ):
+        fn()
+
+    # Calibrate the number of calls per repetition
+    number = 1
+    while True:
+        t = _time_calls( fn, number )
+        if t >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if t <= 0 else max( 2, min( 10, int( math.ceil( min_time / t ) ) ) )
+
+    samples = [ _time_calls( fn, number ) / number for _ in range( repeat ) ]
+    return statistics( samples, number )
+
+def _time_calls( fn, number ):
+    t_start = timer()
+    for _ in xrange( number ):
+        fn()
+    return timer() - t_start
+
+def statistics( samples, number=1 ):
+    """
+    Returns a dict with min, max, mean, median and standard
+    deviation of samples (seconds per call).
+    """
+    samples = sorted( samples )
+    n = len( samples )
+    mean = sum( samples ) / n
+    if n % 2:
+        median = samples[n // 2]
+    else:
+        median = ( samples[n // 2 - 1] + samples[n // 2] ) / 2
+    stdev = math.sqrt( sum( ( s - mean ) ** 2 for s in samples ) / ( n - 1 ) ) if n > 1 else 0.0
+    return {
+        'min': samples[0],
+        'max': samples[-1],
+        'mean': mean,
+        'median': median,
+        'stdev': stdev,
+        'repeat': n,
+        'number': number,
+    }
+
+def compare( results, baseline, threshold=0.10 ):
+    """
+    Compares two result sets (as produced by benchmark.run) and
+    returns a list of ( curve, operation, baseline median, median,
+    ratio, regressed ) tuples for every measurement present in both.
+
+    A measurement has regressed when its median is more than
+    threshold (a fraction) slower than the baseline median.
+    """
+    rows = []
+    for curve, operations in sorted( results['results'].items() ):
+        base_operations = baseline['results'].get( curve, {} )
+        for operation, stats in sorted( operations.items() ):
+            base = base_operations.get( operation )
+            if base is None or 'median' not in base or 'median' not in stats:
+                continue
+            ratio = stats['median'] / base['median'] if base['median'] > 0 else float( 'inf' )
+            rows.append( ( curve, operation, base['median'], stats['median'], ratio, ratio > 1 + threshold ) )
+    return rows
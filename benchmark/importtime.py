@@ -0,0 +1,55 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Measures the time a fresh interpreter takes to import the library.
+
+Short-lived processes pay this on every invocation. Each statement
+is run with python -c in a new process from the repository root;
+'startup' is the interpreter alone, for reference.
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+STATEMENTS = [
+    ( 'startup', 'pass' ),
+    ( 'import_openssl', 'from pyelliptic.openssl import OpenSSL' ),
+    ( 'import_point', 'import point' ),
+    ( 'import_curve', 'import curve' ),
+    ( 'first_curve', 'import curve; curve.Curve( "secp256k1" )' ),
+    ( 'bind_all', 'from pyelliptic.openssl import OpenSSL; OpenSSL.bind_all()' ),
+]
+
+def operation( statement ):
+    """
+    Returns a function that runs statement in a new interpreter.
+    """
+    command = [ sys.executable, '-c', statement ]
+    def run():
+        subprocess.check_call( command, cwd=ROOT )
+    return run
@@ -0,0 +1,96 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+"""
+Measures the memory taken per Point and KeyPair object.
+
+Each scenario is a ( name, factory ) pair. The factory is called with
+a Curve and returns a function make( i ) creating the i-th object.
+measure creates count objects in a forked child process, so that
+nothing stays allocated in the benchmark process, and reports the
+growth of the child's resident size per object.
+"""
+
+import os
+import resource
+
+from point import Point
+from keypair import KeyPair
+
+# Objects are made from this many distinct keys
+DISTINCT = 1000
+
+def _keys( curve ):
+    keys = KeyPair.generate_many( curve, DISTINCT )
+    return [ key.private_key for key in keys ], [ key.public_key for key in keys ]
+
+def point( curve ):
+    encodings = [ public_key.to_bytes() for public_key in _keys( curve )[1] ]
+    return lambda i: Point.from_bytes( curve, encodings[i % DISTINCT] )
+
+def point_encoded( curve ):
+    # Points that are not decoded until used
+    encodings = [ public_key.to_bytes() for public_key in _keys( curve )[1] ]
+    return lambda i: Point( curve, encoded=encodings[i % DISTINCT] )
+
+def keypair( curve ):
+    private_keys, public_keys = _keys( curve )
+    return lambda i: KeyPair( curve, private_key=private_keys[i % DISTINCT], public_key=public_keys[i % DISTINCT] )
+
+def keypair_generated( curve ):
+    return lambda i: KeyPair( curve )
+
+SCENARIOS = [
+    ( 'memory_point', point ),
+    ( 'memory_point_encoded', point_encoded ),
+    ( 'memory_keypair', keypair ),
+    ( 'memory_keypair_generated', keypair_generated ),
+]
+
+def resident_bytes():
+    try:
+        with open( "/proc/self/statm" ) as f:
+            return int( f.read().split()[1] ) * resource.getpagesize()
+    except IOError:
+        # Peak instead of current size, in kilobytes on Linux
+        return resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss * 1024
+
+def measure( make, count ):
+    """
+    Creates count objects with make( i ) in a child process and
+    returns { 'bytes': growth of its resident size per object,
+    'count': count }.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close( read_fd )
+        before = resident_bytes()
+        objects = [ make( i ) for i in xrange( count ) ]
+        os.write( write_fd, "%d" % ( resident_bytes() - before ) )
+        os._exit( 0 )
+    os.close( write_fd )
+    growth = int( os.read( read_fd, 64 ) )
+    os.close( read_fd )
+    os.waitpid( pid, 0 )
+    return { 'bytes': float( growth ) / count, 'count': count }
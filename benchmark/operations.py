@@ -0,0 +1,290 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+The operations measured by the benchmark suite.
+
+Each entry of OPERATIONS is a ( name, factory ) pair. The factory is
+called with a Curve and a seeded random.Random, prepares its inputs
+and returns a function without arguments that performs the operation
+once. Inputs are cycled, so every call works on different values.
+Functions with a false precomputation attribute are measured with
+the precomputation cache disabled.
+"""
+
+import hashlib
+import itertools
+
+from asnhelper import ASNHelper
+from bignum import BigNum
+from keypair import KeyPair
+import backend
+import glv
+import hd
+import sample_lsag
+
+INPUTS = 64
+
+def _scalars( curve, rng, count=INPUTS ):
+    return [ rng.randint( 1, curve.order - 1 ) for _ in range( count ) ]
+
+def _points( curve, rng, count=INPUTS ):
+    return curve.map_mul( _scalars( curve, rng, count ), workers=1 )
+
+def point_add( curve, rng ):
+    pairs = itertools.cycle( zip( _points( curve, rng ), _points( curve, rng ) ) )
+    def run():
+        p, q = next( pairs )
+        return p + q
+    return run
+
+def scalar_mul( curve, rng ):
+    inputs = itertools.cycle( zip( _scalars( curve, rng ), _points( curve, rng ) ) )
+    def run():
+        k, p = next( inputs )
+        return k * p
+    return run
+
+def fixed_base_mul( curve, rng ):
+    fixed = curve.G.precompute()
+    scalars = itertools.cycle( _scalars( curve, rng ) )
+    def run():
+        return next( scalars ) * fixed
+    return run
+
+def generator_mul( curve, rng ):
+    scalars = itertools.cycle( _scalars( curve, rng ) )
+    def run():
+        return curve.mul_base( next( scalars ) )
+    return run
+
+def _mul_pair_inputs( curve, rng ):
+    return zip( _scalars( curve, rng ), _points( curve, rng ), _scalars( curve, rng ), _points( curve, rng ) )
+
+def mul_pair( curve, rng ):
+    inputs = itertools.cycle( _mul_pair_inputs( curve, rng ) )
+    def run():
+        return curve.mul_pair( *next( inputs ) )
+    return run
+
+def mul_pair_glv( curve, rng ):
+    # The pure-Python GLV reference (secp256k1 only), to compare with mul_pair
+    engine = glv.GLVEngine( curve )
+    inputs = itertools.cycle( _mul_pair_inputs( curve, rng ) )
+    def run():
+        return engine.mul_pair( *next( inputs ) )
+    return run
+
+def validate_many( curve, rng ):
+    coordinates = [ ( point.x, point.y ) for point in _points( curve, rng ) ]
+    def run():
+        return curve.validate_many( coordinates, workers=1 )
+    return run
+
+def hash_to_point( curve, rng ):
+    messages = itertools.cycle( [ "message %d" % rng.getrandbits( 64 ) for _ in range( INPUTS ) ] )
+    def run():
+        return curve.hash_to_point( next( messages ) )
+    return run
+
+def keypair_generate( curve, rng ):
+    def run():
+        keypair = KeyPair( curve )
+        # The public key is only computed when used
+        keypair.public_key
+        return keypair
+    return run
+
+def bignum_conversion( curve, rng ):
+    values = itertools.cycle( _scalars( curve, rng ) )
+    def run():
+        return BigNum( decval=next( values ) ).get_value()
+    return run
+
+def der_parse( curve, rng ):
+    der = curve.parameters_der()
+    def run():
+        return list( ASNHelper.consume( der ) )
+    return run
+
+def keypair_generate_many( count, compact=False ):
+    def factory( curve, rng ):
+        def run():
+            return KeyPair.generate_many( curve, count, compact=compact )
+        return run
+    return factory
+
+def backend_generate( name ):
+    def factory( curve, rng ):
+        def run():
+            keypair = KeyPair.generate( curve, backend.BACKENDS[name] )
+            keypair.free()
+            return keypair
+        return run
+    return factory
+
+def _backend_keypairs( curve, rng ):
+    keypairs = [ KeyPair( curve, private_key=k ) for k in _scalars( curve, rng, 8 ) ]
+    for keypair in keypairs:
+        # Create the native keys outside the measurement
+        keypair.os_key, keypair.os_pkey
+    return keypairs
+
+def backend_ecdh( name ):
+    def factory( curve, rng ):
+        inputs = itertools.cycle( zip( _backend_keypairs( curve, rng ), _points( curve, rng, 8 ) ) )
+        def run():
+            keypair, point = next( inputs )
+            return keypair.ecdh( point, backend.BACKENDS[name] )
+        return run
+    return factory
+
+def backend_ecdsa_sign( name ):
+    def factory( curve, rng ):
+        inputs = itertools.cycle( ( keypair, hashlib.sha256( str( i ) ).digest() )
+                                  for i, keypair in enumerate( _backend_keypairs( curve, rng ) ) )
+        def run():
+            keypair, digest = next( inputs )
+            return keypair.ecdsa_sign( digest, backend.BACKENDS[name] )
+        return run
+    return factory
+
+def backend_ecdsa_verify( name ):
+    def factory( curve, rng ):
+        items = []
+        for i, keypair in enumerate( _backend_keypairs( curve, rng ) ):
+            digest = hashlib.sha256( str( i ) ).digest()
+            items.append( ( keypair.public_key, digest, keypair.ecdsa_sign( digest, backend.BACKENDS[name] ) ) )
+        inputs = itertools.cycle( items )
+        def run():
+            public_key, digest, signature = next( inputs )
+            return backend.BACKENDS[name].verify( curve, public_key, digest, signature )
+        return run
+    return factory
+
+def scalar_take( count ):
+    def factory( curve, rng ):
+        def run():
+            return curve.scalars.take( count )
+        return run
+    return factory
+
+def scalar_randint( count ):
+    def factory( curve, rng ):
+        def run():
+            return [ rng.randint( 1, curve.order - 1 ) for _ in xrange( count ) ]
+        return run
+    return factory
+
+def hd_child( curve, rng ):
+    node = hd.HDNode.from_seed( curve, "%032x" % rng.getrandbits( 128 ) ).neuter()
+    indices = itertools.cycle( range( INPUTS ) )
+    def run():
+        return node.child( next( indices ) )
+    return run
+
+def hd_derive_range( count ):
+    def factory( curve, rng ):
+        node = hd.HDNode.from_seed( curve, "%032x" % rng.getrandbits( 128 ) ).neuter()
+        def run():
+            return node.derive_range( 0, count )
+        return run
+    return factory
+
+def lsag_sign( ring_size ):
+    def factory( curve, rng ):
+        keys = [ KeyPair( curve, private_key=k ) for k in _scalars( curve, rng, ring_size ) ]
+        def run():
+            return sample_lsag.sign( curve, keys, 0 )
+        return run
+    return factory
+
+def lsag_verify( ring_size ):
+    def factory( curve, rng ):
+        keys = [ KeyPair( curve, private_key=k ) for k in _scalars( curve, rng, ring_size ) ]
+        signature = sample_lsag.sign( curve, keys, 0 )
+        def run():
+            assert sample_lsag.verify( curve, *signature )
+        return run
+    return factory
+
+def clsag_sign( ring_size ):
+    def factory( curve, rng ):
+        keys = [ KeyPair( curve, private_key=k ) for k in _scalars( curve, rng, ring_size ) ]
+        def run():
+            return sample_lsag.clsag_sign( curve, keys, 0 )
+        return run
+    return factory
+
+def clsag_verify( ring_size ):
+    def factory( curve, rng ):
+        keys = [ KeyPair( curve, private_key=k ) for k in _scalars( curve, rng, ring_size ) ]
+        signature = sample_lsag.clsag_sign( curve, keys, 0 )
+        def run():
+            assert sample_lsag.clsag_verify( curve, *signature )
+        return run
+    return factory
+
+OPERATIONS = [
+    ( 'point_add', point_add ),
+    ( 'scalar_mul', scalar_mul ),
+    ( 'fixed_base_mul', fixed_base_mul ),
+    ( 'generator_mul', generator_mul ),
+    ( 'mul_pair', mul_pair ),
+    ( 'mul_pair_glv', mul_pair_glv ),
+    ( 'validate_many[64]', validate_many ),
+    ( 'hash_to_point', hash_to_point ),
+    ( 'keypair_generate', keypair_generate ),
+    ( 'keypair_generate_many[64]', keypair_generate_many( 64 ) ),
+    ( 'keypair_generate_compact[64]', keypair_generate_many( 64, compact=True ) ),
+    ( 'backend_generate[legacy]', backend_generate( 'legacy' ) ),
+    ( 'backend_generate[evp]', backend_generate( 'evp' ) ),
+    ( 'ecdh[legacy]', backend_ecdh( 'legacy' ) ),
+    ( 'ecdh[evp]', backend_ecdh( 'evp' ) ),
+    ( 'ecdsa_sign[legacy]', backend_ecdsa_sign( 'legacy' ) ),
+    ( 'ecdsa_sign[evp]', backend_ecdsa_sign( 'evp' ) ),
+    ( 'ecdsa_verify[legacy]', backend_ecdsa_verify( 'legacy' ) ),
+    ( 'ecdsa_verify[evp]', backend_ecdsa_verify( 'evp' ) ),
+    ( 'scalar_take[1000]', scalar_take( 1000 ) ),
+    ( 'scalar_randint[1000]', scalar_randint( 1000 ) ),
+    ( 'bignum_conversion', bignum_conversion ),
+    ( 'der_parse', der_parse ),
+    ( 'hd_child', hd_child ),
+    ( 'hd_derive_range[64]', hd_derive_range( 64 ) ),
+]
+
+RING_SIZES = [ 2, 10, 100 ]
+
+def operations( ring_sizes=RING_SIZES ):
+    """
+    Returns the ( name, factory ) pairs to measure, with
+    LSAG and CLSAG signing and verification for every ring size.
+    """
+    result = list( OPERATIONS )
+    for n in ring_sizes:
+        result.append( ( 'lsag_sign[%d]' % n, lsag_sign( n ) ) )
+        result.append( ( 'lsag_verify[%d]' % n, lsag_verify( n ) ) )
+        result.append( ( 'clsag_sign[%d]' % n, clsag_sign( n ) ) )
+        result.append( ( 'clsag_verify[%d]' % n, clsag_verify( n ) ) )
+    return result
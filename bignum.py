@@ -22,6 +22,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
+import threading
+
 from pyelliptic.openssl import OpenSSL
 from echelper import ECHelper
 
@@ -63,3 +65,44 @@ class BigNum:
         return "BigNum<0x%X>" % self.get_value()
 
     __repr__ = __str__
+
+class BigNumContext:
+    '''
+    Wraps an OpenSSL BN_CTX, the scratch space used by
+    the BN and EC_POINT arithmetic functions.
+
+    BN_CTX objects must not be shared between threads, so
+    each thread gets its own through BigNumContext.get().
+    '''
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.ctx = OpenSSL.BN_CTX_new()
+
+    @staticmethod
+    def get():
+        """
+        Returns the context of the calling thread,
+        creating it on first use.
+        """
+        context = getattr( BigNumContext._local, 'context', None )
+        if context is None:
+            context = BigNumContext()
+            BigNumContext._local.context = context
+        return context
+
+    @staticmethod
+    def release():
+        """
+        Frees the context of the calling thread, if any.
+        """
+        BigNumContext._local.context = None
+
+    def __del__(self):
+        OpenSSL.BN_CTX_free( self.ctx )
+
+    def __str__(self):
+        return "BigNumContext<0x%X>" % self.ctx
+
+    __repr__ = __str__
@@ -0,0 +1,214 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Client for the server in daemon.py.
+
+    >>> from client import Client
+    >>> with Client( '/tmp/pyec.sock' ) as c:
+    ...     [ ( private_key, public_key ) ] = c.keygen( 'secp256k1' )
+    ...     signature = c.sign( 'secp256k1', private_key, 'message' )
+    ...     c.verify( 'secp256k1', public_key, 'message', signature )
+    True
+
+The client does not load OpenSSL: curves are given by name (see
+CURVES) or by OpenSSL curve id. sign_many and verify_many send all
+their requests before reading the responses, so the server handles
+them in batches.
+"""
+
+import socket
+import struct
+
+# The protocol, see daemon
+REQUEST = struct.Struct( ">IBHI" )
+RESPONSE = struct.Struct( ">IBI" )
+COUNT = struct.Struct( ">I" )
+
+INFO = 0
+KEYGEN = 1
+SIGN = 2
+VERIFY = 3
+
+OK = 0
+ERROR = 1
+
+# OpenSSL curve ids (NIDs, from obj_mac.h, which do not change between
+# versions) of the prime curves, by short name and alias, so that the
+# client does not have to load OpenSSL to look them up
+CURVES = {
+    'prime192v1': 409, 'prime192v2': 410, 'prime192v3': 411,
+    'prime239v1': 412, 'prime239v2': 413, 'prime239v3': 414,
+    'prime256v1': 415,
+    'secp112r1': 704, 'secp112r2': 705, 'secp128r1': 706, 'secp128r2': 707,
+    'secp160k1': 708, 'secp160r1': 709, 'secp160r2': 710,
+    'secp192k1': 711, 'secp224k1': 712, 'secp224r1': 713,
+    'secp256k1': 714, 'secp384r1': 715, 'secp521r1': 716,
+    'brainpoolP160r1': 921, 'brainpoolP160t1': 922,
+    'brainpoolP192r1': 923, 'brainpoolP192t1': 924,
+    'brainpoolP224r1': 925, 'brainpoolP224t1': 926,
+    'brainpoolP256r1': 927, 'brainpoolP256t1': 928,
+    'brainpoolP320r1': 929, 'brainpoolP320t1': 930,
+    'brainpoolP384r1': 931, 'brainpoolP384t1': 932,
+    'brainpoolP512r1': 933, 'brainpoolP512t1': 934,
+    'P-192': 409, 'P-224': 713, 'P-256': 415, 'P-384': 715, 'P-521': 716,
+    'secp192r1': 409, 'secp256r1': 415,
+}
+
+def lookup_curve( curve ):
+    """
+    Returns the OpenSSL id of a curve given by name (see CURVES),
+    by id, or as a Curve.
+    """
+    if isinstance( curve, ( int, long ) ):
+        return curve
+    if isinstance( curve, basestring ):
+        if curve not in CURVES:
+            raise Exception( 'Unknown curve %s' % curve )
+        return CURVES[curve]
+    # A Curve object, so OpenSSL is loaded already
+    from pyelliptic.openssl import OpenSSL
+    return OpenSSL.EC_GROUP_get_curve_name( curve.os_group )
+
+def recv_exact( sock, size ):
+    """
+    Reads exactly size bytes from sock, or returns
+    None if the connection is closed first.
+    """
+    chunks = []
+    while size > 0:
+        chunk = sock.recv( size )
+        if not chunk:
+            return None
+        chunks.append( chunk )
+        size -= len( chunk )
+    return "".join( chunks )
+
+class Client:
+    '''
+    A connection to the server. Not safe to share between threads.
+    '''
+
+    # Bytes per field element and scalar, by curve id
+    __sizes = {}
+
+    def __init__(self, path, timeout=None):
+        '''
+        Constructor
+        '''
+        self.sock = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+        self.sock.settimeout( timeout )
+        self.sock.connect( path )
+        self.__next_id = 0
+
+    def keygen(self, curve, count=1):
+        """
+        Returns count new ( private key, x-only public key ) pairs,
+        the private keys as integers.
+        """
+        curve_id = lookup_curve( curve )
+        body = self.__call( KEYGEN, curve_id, COUNT.pack( count ) )
+        size = len( body ) // ( 2 * count )
+        return [ ( int( body[2*i*size:( 2*i + 1 )*size].encode( "hex" ), 16 ), body[( 2*i + 1 )*size:( 2*i + 2 )*size] )
+                 for i in range( count ) ]
+
+    def sign(self, curve, private_key, message):
+        """
+        Returns the Schnorr signature of message.
+        """
+        return self.sign_many( curve, [ ( private_key, message ) ] )[0]
+
+    def verify(self, curve, public_key, message, signature):
+        """
+        Returns whether signature is a valid signature
+        of message under public_key.
+        """
+        return self.verify_many( curve, [ ( public_key, message, signature ) ] )[0]
+
+    def sign_many(self, curve, items):
+        """
+        Signs every ( private key, message ) pair.
+        """
+        curve_id = lookup_curve( curve )
+        size = self.__size( curve_id )
+        return self.__call_many( SIGN, curve_id,
+                                 [ ( "%0*x" % ( 2 * size, k ) ).decode( "hex" ) + message for k, message in items ] )
+
+    def verify_many(self, curve, items):
+        """
+        Verifies every ( public key, message, signature ) tuple,
+        returning a list of booleans.
+        """
+        curve_id = lookup_curve( curve )
+        results = self.__call_many( VERIFY, curve_id,
+                                    [ public_key + signature + message for public_key, message, signature in items ] )
+        return [ result == "\x01" for result in results ]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __size(self, curve_id):
+        if curve_id not in Client.__sizes:
+            Client.__sizes[curve_id] = COUNT.unpack( self.__call( INFO, curve_id, "" ) )[0]
+        return Client.__sizes[curve_id]
+
+    def __call(self, operation, curve_id, body):
+        return self.__call_many( operation, curve_id, [ body ] )[0]
+
+    def __call_many(self, operation, curve_id, bodies):
+        ids = []
+        frames = []
+        for body in bodies:
+            self.__next_id = ( self.__next_id + 1 ) & 0xFFFFFFFF
+            ids.append( self.__next_id )
+            frames.append( REQUEST.pack( self.__next_id, operation, curve_id, len( body ) ) + body )
+        self.sock.sendall( "".join( frames ) )
+        responses = {}
+        while len( responses ) < len( ids ):
+            header = recv_exact( self.sock, RESPONSE.size )
+            if header is None:
+                raise Exception( 'Connection closed by the server' )
+            request_id, status, length = RESPONSE.unpack( header )
+            body = recv_exact( self.sock, length ) if length else ""
+            if body is None:
+                raise Exception( 'Connection closed by the server' )
+            responses[request_id] = ( status, body )
+        results = []
+        for request_id in ids:
+            status, body = responses[request_id]
+            if status != OK:
+                raise Exception( body )
+            results.append( body )
+        return results
+
+    def __str__(self):
+        return "Client<%s>" % self.sock.getpeername()
+
+    __repr__ = __str__
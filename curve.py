@@ -26,20 +26,73 @@ import ctypes
 import math
 import hashlib
 
+from pyelliptic import openssl
 from pyelliptic.openssl import OpenSSL
 from echelper import ECHelper
 from asnhelper import ASNHelper
 import point as ec_point
+import executor as ec_executor
+import bignum as ec_bignum
+import aio as ec_aio
+from gf2m import GF2m
+import scalarsource as ec_scalarsource
+
+# The EC_METHODs exported by OpenSSL, by the name of the
+# function returning them
+EXPORTED_METHODS = [
+    ( 'simple', 'EC_GFp_simple_method' ),
+    ( 'mont', 'EC_GFp_mont_method' ),
+    ( 'nist', 'EC_GFp_nist_method' ),
+    ( 'nistp224', 'EC_GFp_nistp224_method' ),
+    ( 'nistp256', 'EC_GFp_nistp256_method' ),
+    ( 'nistp521', 'EC_GFp_nistp521_method' ),
+    ( 'gf2m', 'EC_GF2m_simple_method' ),
+]
+
+# Methods with arithmetic specialised for their curve. Their own
+# EC_POINT_mul is faster than the tables of fixedbase, which
+# are not used on these curves
+OPTIMIZED_METHODS = ( 'nistp224', 'nistp256', 'nistp521', 'nistz256', 'internal' )
+
+_methods = None
+
+def method_name(os_group):
+    """
+    Returns the name of the EC_METHOD of an EC_GROUP (see
+    EXPORTED_METHODS). OpenSSL keeps some methods to itself: the
+    assembly P-256 implementation is called 'nistz256', the
+    others 'internal'.
+    """
+    global _methods
+    if _methods is None:
+        methods = {}
+        for name, function in EXPORTED_METHODS:
+            try:
+                methods[getattr( OpenSSL, function )()] = name
+            except AttributeError:
+                # Only built with some configurations
+                pass
+        _methods = methods
+    name = _methods.get( OpenSSL.EC_GROUP_method_of( os_group ) )
+    if name is None:
+        nid = OpenSSL.EC_GROUP_get_curve_name( os_group )
+        name = 'nistz256' if nid != 0 and nid == OpenSSL.curves.get( 'prime256v1' ) else 'internal'
+    return name
 
 class Curve:
     '''
     classdocs
     '''
 
-
     def __init__(self, curvename=None, curveid=None, openssl_group=None):
         '''
         Constructor
+
+        curvename may be a short name (see OpenSSL.curves) or an
+        alias (OpenSSL.curve_aliases) such as 'P-256' or 'secp256r1'.
+        An openssl_group with explicit parameters equal to those of
+        a named curve is replaced by the named group, which may use
+        a faster EC_METHOD (see method).
         '''
         if curvename != None:
             curve = OpenSSL.get_curve( curvename )
@@ -47,17 +100,34 @@ class Curve:
         elif curveid != None:
             self.os_group = OpenSSL.EC_GROUP_new_by_curve_name( curveid )
         elif openssl_group != None:
-            self.os_group = openssl_group
+            self.os_group = self.__named_group( openssl_group )
         else:
             raise Exception('No curve provided')
+        if not self.os_group:
+            raise Exception( 'OpenSSL has no curve %s' % ( curvename if curvename != None else curveid ) )
+        # The EC_METHOD doing the arithmetic, see method_name
+        self.method = method_name( self.os_group )
+        self.optimized = self.method in OPTIMIZED_METHODS
         self.__set_parameters()
         self.__set_base_point()
+        # Random private keys and nonces, see ScalarSource
+        self.scalars = ec_scalarsource.ScalarSource( self )
         
+    @staticmethod
+    def __named_group(group):
+        if OpenSSL.EC_GROUP_get_curve_name( group ) != 0:
+            return group
+        try:
+            nid = OpenSSL.EC_GROUP_check_named_curve( group, 0, None )
+        except AttributeError:
+            # Before OpenSSL 3.0
+            return group
+        if nid <= 0:
+            return group
+        return OpenSSL.EC_GROUP_new_by_curve_name( nid )
+
     def __set_parameters(self):
-        size = OpenSSL.i2d_ECPKParameters(self.os_group, 0)
-        mb = ctypes.create_string_buffer(size)
-        OpenSSL.i2d_ECPKParameters(self.os_group, ctypes.byref(ctypes.pointer(mb)))
-        asntree = [x for x in ASNHelper.consume( mb.raw )][0]
+        asntree = [x for x in ASNHelper.consume( self.parameters_der() )][0]
         self.ver, self.field, self.curve, self.G_raw, self.order, self.h = asntree
         
         if self.field[0] == '42.134.72.206.61.1.1': # Prime field
@@ -67,6 +137,7 @@ class Curve:
             self.a = self.curve[0]
             self.b = self.curve[1]
             self.f = lambda x: x**3 + self.a*x + self.b
+            self.field_bytes = ( self.p.bit_length() + 7 ) // 8
         elif self.field[0] == '42.134.72.206.61.1.2': # Characteristic two field
             self.field_type = 'power-of-two'
             self.m = self.field[1][0]
@@ -80,32 +151,272 @@ class Curve:
                 raise Exception('Unknown field OID %s' % self.field[1][1])
             self.a = self.curve[0]
             self.b = self.curve[1]
+            self.field_bytes = ( self.m + 7 ) // 8
+            self.gf2m = GF2m( self.m, self.poly_coeffs )
         else:
             raise Exception( 'Unknown curve field' )
         
     def __set_base_point(self):
         self.G = ec_point.Point( self, openssl_point=OpenSSL.EC_GROUP_get0_generator( self.os_group ) )
         
+    def __getstate__(self):
+        # Curves are pickled by name and rebuilt from OpenSSL
+        nid = OpenSSL.EC_GROUP_get_curve_name( self.os_group )
+        if nid == 0:
+            raise Exception( 'Only named curves can be pickled' )
+        return { 'nid': nid }
+
+    def __setstate__(self, state):
+        self.__init__( curveid=state['nid'] )
+
+    def parameters_der(self):
+        """
+        Returns the DER encoding of the explicit curve parameters.
+        """
+        # OpenSSL 1.1 and later only write the OID of a named curve,
+        # so encode a copy of the group flagged as explicit
+        group = OpenSSL.EC_GROUP_dup( self.os_group )
+        try:
+            OpenSSL.EC_GROUP_set_asn1_flag( group, openssl.OPENSSL_EC_EXPLICIT_CURVE )
+            size = OpenSSL.i2d_ECPKParameters(group, 0)
+            mb = ctypes.create_string_buffer(size)
+            OpenSSL.i2d_ECPKParameters(group, ctypes.byref(ctypes.pointer(mb)))
+        finally:
+            OpenSSL.EC_GROUP_free( group )
+        return mb.raw
+
+    def parameters_digest(self):
+        """
+        Returns a SHA-256 digest of the curve parameters (field,
+        coefficients, base point, order and cofactor), identifying
+        the curve independently of its name.
+        """
+        return hashlib.sha256( "%s|%s|%s|%s|%s" % ( self.field, self.curve, self.G_raw, self.order, self.h ) ).digest()
+
+    def point_size(self, compressed=True):
+        """
+        Returns the length in bytes of an encoded point
+        on this curve (see Point.to_bytes).
+        """
+        if compressed:
+            return 1 + self.field_bytes
+        return 1 + 2 * self.field_bytes
+
     def hash_to_field(self, in_str):
         return int( hashlib.sha512( in_str ).hexdigest()[:self.bitlength//4], 16 )
     
     def hash_to_point(self, in_str):
         return self.find_point_try_and_increment( self.hash_to_field( in_str ) )
+
+    def hash_to_points(self, in_strs):
+        """
+        Hashes every string onto the curve, like hash_to_point.
+        """
+        return self.find_points_try_and_increment( [ self.hash_to_field( s ) for s in in_strs ] )
         
     def find_point_try_and_increment(self, x):
-        if self.field_type != 'prime':
-            raise Exception( "find_point_try_and_increment is only implemented for curves over prime fields")
-        
-        ## HUSK AT FREE BIGNUMS
-        found = False
-        x -= 1
-        while not found:
-            x += 1
-            f_x = self.f( x )
-            y = ECHelper.modular_sqrt( f_x, self.p )
-            if y != 0:
-                return ec_point.Point( self, x=x, y=y )
-                    
+        return self.find_points_try_and_increment( [ x ] )[0]
+
+    def find_points_try_and_increment(self, xs):
+        """
+        Finds the first point at or after every x coordinate,
+        multiplied by the cofactor so that it lies in the subgroup
+        of order self.order.
+        """
+        if self.field_type == 'power-of-two':
+            if self.m % 2 == 0:
+                raise Exception( 'Cannot hash to a curve over GF(2^%d): the half-trace is only defined for odd m' % self.m )
+            return [ self.__find_binary_point( x ) for x in xs ]
+
+        points = []
+        for x in xs:
+            while True:
+                y = ECHelper.modular_sqrt( self.f( x ), self.p )
+                point = self.__clear_cofactor( ec_point.Point( self, x=x, y=y ) ) if y != 0 else None
+                if point is not None:
+                    break
+                x += 1
+            points.append( point )
+        return points
+
+    def mul_base(self, k):
+        """
+        Returns k * G, using the generator multiplication
+        of the underlying EC_GROUP.
+        """
+        try:
+            o = ec_bignum.BigNum( decval=k )
+            result = OpenSSL.EC_POINT_new( self.os_group )
+            OpenSSL.EC_POINT_mul( self.os_group, result, o.bn, 0, 0, ec_bignum.BigNumContext.get().ctx )
+            return ec_point.Point( self, openssl_point=result, owned=True )
+        finally:
+            del o
+
+    def mul_base_many(self, scalars, add=None):
+        """
+        Returns [ k * G for k in scalars ], or [ k * G + add for k
+        in scalars ] if the point add is given.
+
+        The scalars may be private keys, so each product is computed
+        with EC_POINT_mul, as in mul_base. The products are converted
+        to affine coordinates in one batch, saving a field inversion
+        per point.
+        """
+        scalars = list( scalars )
+        group = self.os_group
+        ctx = ec_bignum.BigNumContext.get().ctx
+        os_points = ( ctypes.c_void_p * len( scalars ) )()
+        try:
+            for i, k in enumerate( scalars ):
+                o = ec_bignum.BigNum( decval=k )
+                os_points[i] = OpenSSL.EC_POINT_new( group )
+                OpenSSL.EC_POINT_mul( group, os_points[i], o.bn, 0, 0, ctx )
+                del o
+                if add is not None:
+                    OpenSSL.EC_POINT_add( group, os_points[i], os_points[i], add.os_point, ctx )
+            if scalars:
+                OpenSSL.EC_POINTs_make_affine( group, len( scalars ), os_points, ctx )
+        except:
+            for os_point in os_points:
+                if os_point:
+                    OpenSSL.EC_POINT_free( os_point )
+            raise
+        return [ ec_point.Point( self, openssl_point=os_point, owned=True ) for os_point in os_points ]
+
+    def mul_pair(self, a, P, b, Q):
+        """
+        Returns a * P + b * Q, with one EC_POINTs_mul, sharing
+        the point doublings.
+
+        The time taken depends on a and b, so this is for public
+        scalars, as in signature verification.
+        """
+        group = self.os_group
+        result = OpenSSL.EC_POINT_new( group )
+        try:
+            a_bn, b_bn = ec_bignum.BigNum( decval=a % self.order ), ec_bignum.BigNum( decval=b % self.order )
+            if P is self.G:
+                # Passed as the generator, which OpenSSL may multiply faster
+                os_points = ( ctypes.c_void_p * 1 )( Q.os_point )
+                os_scalars = ( ctypes.c_void_p * 1 )( b_bn.bn )
+                ok = OpenSSL.EC_POINTs_mul( group, result, a_bn.bn, 1, os_points, os_scalars, ec_bignum.BigNumContext.get().ctx )
+            else:
+                os_points = ( ctypes.c_void_p * 2 )( P.os_point, Q.os_point )
+                os_scalars = ( ctypes.c_void_p * 2 )( a_bn.bn, b_bn.bn )
+                ok = OpenSSL.EC_POINTs_mul( group, result, None, 2, os_points, os_scalars, ec_bignum.BigNumContext.get().ctx )
+            if ok != 1:
+                raise Exception( 'EC_POINTs_mul failed' )
+        except:
+            OpenSSL.EC_POINT_free( result )
+            raise
+        return ec_point.Point( self, openssl_point=result, owned=True )
+
+    def amul_base(self, k):
+        """
+        Awaitable version of mul_base, run on the
+        asynchronous executor (see aio).
+        """
+        return ec_aio.run( self.mul_base, k )
+
+    def amul(self, point, k):
+        """
+        Awaitable version of k * point, run on the
+        asynchronous executor (see aio).
+        """
+        return ec_aio.run( point.__mul__, k )
+
+    def __find_binary_point(self, x):
+        """
+        Finds the first point at or after x on a curve over GF(2^m).
+        Substituting y = xz in y^2 + xy = x^3 + ax^2 + b gives
+        z^2 + z = x + a + b/x^2, which is solved with the half-trace.
+        """
+        F = self.gf2m
+        x &= F.mask
+        while True:
+            if x != 0:
+                z = F.solve_quadratic( x ^ self.a ^ F.div( self.b, F.sqr( x ) ) )
+                if z is not None:
+                    point = self.__clear_cofactor( ec_point.Point( self, x=x, y=F.mul( x, z ) ) )
+                    if point is not None:
+                        return point
+            x = ( x + 1 ) & F.mask
+
+    def __clear_cofactor(self, point):
+        """
+        Returns h * point, which lies in the subgroup of order
+        self.order, or None if that is the point at infinity.
+        """
+        if self.h == 1:
+            return point
+        point = self.h * point
+        return None if point.is_infinity() else point
+
+    def map_mul(self, scalars, point=None, workers=None):
+        """
+        Multiplies point (default: G) by every scalar on a pool
+        of worker threads and returns the products in input order.
+        """
+        if point is None:
+            point = self.G
+        return ec_executor.get_executor( workers ).map( lambda k: k * point, scalars )
+
+    def map_add(self, pairs, workers=None):
+        """
+        Adds up every (P, Q) pair on a pool of worker threads
+        and returns the sums in input order.
+        """
+        return ec_executor.get_executor( workers ).map( lambda pq: pq[0] + pq[1], pairs )
+
+    def validate_many(self, points, workers=None):
+        """
+        Checks many untrusted points at once, each either a Point or
+        an ( x, y ) pair of coordinates, and returns the indices of
+        those that are not valid (see Point.is_valid) in increasing
+        order. The points are checked in chunks on a pool of worker
+        threads, each using its own BN_CTX.
+        """
+        points = list( points )
+        executor = ec_executor.get_executor( workers )
+        size = max( 1, len( points ) // ( 4 * executor.workers ) )
+        starts = range( 0, len( points ), size )
+        chunks = executor.map( lambda start: self.__invalid_indices( points, start, start + size ), starts, chunksize=1 )
+        return [ i for chunk in chunks for i in chunk ]
+
+    def __invalid_indices(self, points, start, stop):
+        group = self.os_group
+        ctx = ec_bignum.BigNumContext.get().ctx
+        order = ec_bignum.BigNum( decval=self.order )
+        tmp = OpenSSL.EC_POINT_new( group )
+        decoded = OpenSSL.EC_POINT_new( group )
+        invalid = []
+        try:
+            for i in xrange( start, min( stop, len( points ) ) ):
+                point = points[i]
+                if isinstance( point, ec_point.Point ):
+                    x, y = point.x, point.y
+                    os_point = point.os_point
+                    valid = point.curve == self
+                else:
+                    x, y = point
+                    os_point = decoded
+                    valid = True
+                valid = valid and ec_point.in_field( self, x ) and ec_point.in_field( self, y )
+                if valid and os_point is decoded:
+                    bx, by = ec_bignum.BigNum( decval=x ), ec_bignum.BigNum( decval=y )
+                    if self.field_type == 'prime':
+                        valid = OpenSSL.EC_POINT_set_affine_coordinates_GFp( group, decoded, bx.bn, by.bn, ctx ) == 1
+                    else:
+                        valid = OpenSSL.EC_POINT_set_affine_coordinates_GF2m( group, decoded, bx.bn, by.bn, ctx ) == 1
+                    del bx, by
+                if not ( valid and ec_point.is_valid_point( self, os_point, order, tmp, ctx ) ):
+                    invalid.append( i )
+        finally:
+            OpenSSL.EC_POINT_free( tmp )
+            OpenSSL.EC_POINT_free( decoded )
+            del order
+        return invalid
+
     def __eq__(self, other):
         if type(other) is type(self):
             return self.ver == other.ver and \
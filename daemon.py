@@ -0,0 +1,403 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+A long-running server for Schnorr key generation, signing and
+verification (see schnorr) over a Unix-domain socket, for processes
+too short-lived to pay for loading OpenSSL, setting up curves and
+building precomputed tables themselves.
+
+    python daemon.py --socket /tmp/pyec.sock [-c secp256k1 ...] [-w 4]
+
+starts the server; client.Client talks to it. Requests and responses
+are framed as
+
+    request    request id (4 bytes), operation (1), curve id (2),
+               body length (4), body
+    response   request id (4 bytes), status (1), body length (4), body
+
+with big-endian integers, the curve id being the OpenSSL curve id. A
+client may send many requests before reading the responses, which
+can arrive in any order. With s = curve.field_bytes, the bodies are
+
+    INFO       request:  empty
+               response: s (4 bytes)
+    KEYGEN     request:  count (4 bytes)
+               response: count times private key (s) and x-only
+                         public key (s)
+    SIGN       request:  private key (s), message
+               response: signature (2s)
+    VERIFY     request:  public key (s), signature (2s), message
+               response: 1 if the signature is valid, else 0
+
+An ERROR response holds a message. Requests arriving within max_delay
+of each other are handled together: key generation with one
+KeyPair.generate_many call, verification with schnorr.batch_verify
+(bisecting batches that fail to find the invalid signatures), and
+signing spread over the worker threads.
+"""
+
+import optparse
+import os
+import Queue
+import socket
+import sys
+import threading
+import time
+
+from pyelliptic.openssl import OpenSSL
+from curve import Curve
+from keypair import KeyPair
+import executor as ec_executor
+import fixedbase as ec_fixedbase
+import schnorr
+from client import REQUEST, RESPONSE, COUNT, INFO, KEYGEN, SIGN, VERIFY, OK, ERROR, recv_exact
+
+MAX_BODY = 1 << 20
+MAX_KEYS = 10000
+
+class Connection:
+    '''
+    A client connection, whose responses may be
+    sent from any worker thread.
+    '''
+
+    def __init__(self, sock):
+        '''
+        Constructor
+        '''
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, request_id, status, body):
+        with self.lock:
+            try:
+                self.sock.sendall( RESPONSE.pack( request_id, status, len( body ) ) + body )
+            except socket.error:
+                # The client has gone; its remaining responses are dropped
+                pass
+
+class Request:
+    '''
+    A request waiting to be handled.
+    '''
+
+    def __init__(self, connection, request_id, operation, curve_id, body):
+        '''
+        Constructor
+        '''
+        self.connection = connection
+        self.request_id = request_id
+        self.operation = operation
+        self.curve_id = curve_id
+        self.body = body
+        # Whether a response has been sent
+        self.answered = False
+
+    def reply(self, body):
+        self.answered = True
+        self.connection.send( self.request_id, OK, body )
+
+    def fail(self, message):
+        self.answered = True
+        self.connection.send( self.request_id, ERROR, message )
+
+class Server:
+    '''
+    The server. start() serves in background threads,
+    serve_forever() in the calling thread.
+    '''
+
+    def __init__(self, path, curves=( 'secp256k1', ), workers=None, max_batch=256, max_delay=0.002):
+        '''
+        Constructor
+
+        The curves named in curves are set up, and the tables
+        for their generators built, before serving starts.
+        '''
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = ec_executor.Executor( workers )
+        self.queue = Queue.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.__curves = {}
+        self.__curves_lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__threads = []
+        self.__socket = None
+        self.__connections = set()
+        for name in curves:
+            self.curve( OpenSSL.get_curve( name ) )
+
+    def curve(self, curve_id):
+        """
+        Returns the Curve for an OpenSSL curve id, setting it
+        up on first use. Raises an exception if the id is not
+        one of OpenSSL.curves.
+        """
+        with self.__curves_lock:
+            curve = self.__curves.get( curve_id )
+            if curve is None:
+                if curve_id not in OpenSSL.curves.values():
+                    raise Exception( 'Unknown curve id %d' % curve_id )
+                curve = self.__curves[curve_id] = Curve( curveid=curve_id )
+                ec_fixedbase.cache.table( curve.G )
+            return curve
+
+    def start(self):
+        """
+        Binds the socket and starts serving in background threads.
+        """
+        if os.path.exists( self.path ):
+            os.unlink( self.path )
+        self.__socket = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+        self.__socket.bind( self.path )
+        self.__socket.listen( 64 )
+        for target in ( self.__accept, self.__batch ):
+            thread = threading.Thread( target=target, name="ec-daemon-%s" % target.__name__.strip( '_' ) )
+            thread.daemon = True
+            thread.start()
+            self.__threads.append( thread )
+        return self
+
+    def serve_forever(self):
+        """
+        Serves until shutdown() is called or the
+        process is interrupted.
+        """
+        self.start()
+        try:
+            while not self.__stopped.is_set():
+                self.__stopped.wait( 1.0 )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Stops accepting connections, finishes the queued
+        requests and removes the socket file.
+        """
+        if self.__stopped.is_set():
+            return
+        self.__stopped.set()
+        if self.__socket is not None:
+            # Wakes up the accept loop
+            try:
+                self.__socket.shutdown( socket.SHUT_RDWR )
+            except socket.error:
+                pass
+            self.__socket.close()
+        self.queue.put( None )
+        for thread in self.__threads:
+            thread.join()
+        # Every response has been sent once the workers are done
+        self.executor.shutdown()
+        for sock in list( self.__connections ):
+            try:
+                sock.shutdown( socket.SHUT_RDWR )
+            except socket.error:
+                pass
+        if os.path.exists( self.path ):
+            os.unlink( self.path )
+
+    def __accept(self):
+        while not self.__stopped.is_set():
+            try:
+                sock, _ = self.__socket.accept()
+            except socket.error:
+                break
+            thread = threading.Thread( target=self.__read, args=( sock, ), name="ec-daemon-connection" )
+            thread.daemon = True
+            thread.start()
+
+    def __read(self, sock):
+        connection = Connection( sock )
+        self.__connections.add( sock )
+        try:
+            while True:
+                header = recv_exact( sock, REQUEST.size )
+                if header is None:
+                    break
+                request_id, operation, curve_id, length = REQUEST.unpack( header )
+                if length > MAX_BODY:
+                    connection.send( request_id, ERROR, 'Request body is larger than %d bytes' % MAX_BODY )
+                    break
+                body = recv_exact( sock, length ) if length else ""
+                if body is None:
+                    break
+                self.queue.put( Request( connection, request_id, operation, curve_id, body ) )
+        except socket.error:
+            pass
+        finally:
+            self.__connections.discard( sock )
+            sock.close()
+
+    def __batch(self):
+        """
+        Collects the requests arriving within max_delay of the
+        first one (at most max_batch) and hands them to the
+        workers grouped by operation and curve.
+        """
+        stopping = False
+        while not stopping:
+            request = self.queue.get()
+            if request is None:
+                break
+            batch = [ request ]
+            deadline = time.time() + self.max_delay
+            while len( batch ) < self.max_batch:
+                timeout = deadline - time.time()
+                try:
+                    request = self.queue.get( timeout=timeout ) if timeout > 0 else self.queue.get_nowait()
+                except Queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append( request )
+            groups = {}
+            for request in batch:
+                groups.setdefault( ( request.operation, request.curve_id ), [] ).append( request )
+            for ( operation, curve_id ), requests in groups.items():
+                if operation == SIGN:
+                    # Signatures are independent, so use every worker
+                    size = max( 1, -( -len( requests ) // self.executor.workers ) )
+                    chunks = [ requests[i:i + size] for i in range( 0, len( requests ), size ) ]
+                else:
+                    chunks = [ requests ]
+                for chunk in chunks:
+                    self.executor.submit( self.__handle, operation, curve_id, chunk )
+            self.requests += len( batch )
+            self.batches += 1
+
+    def __handle(self, operation, curve_id, requests):
+        try:
+            handler = HANDLERS.get( operation )
+            if handler is None:
+                raise Exception( 'Unknown operation %d' % operation )
+            handler( self.curve( curve_id ), requests )
+        except Exception, e:
+            # Requests answered before the error keep their response
+            for request in requests:
+                if not request.answered:
+                    request.fail( str( e ) )
+
+    def __str__(self):
+        return "Server<%s, %d requests in %d batches>" % ( self.path, self.requests, self.batches )
+
+    __repr__ = __str__
+
+def handle_info( curve, requests ):
+    for request in requests:
+        request.reply( COUNT.pack( curve.field_bytes ) )
+
+def handle_keygen( curve, requests ):
+    counts = []
+    for request in requests:
+        count = COUNT.unpack( request.body )[0] if len( request.body ) == COUNT.size else -1
+        if not 0 < count <= MAX_KEYS:
+            request.fail( 'Expected a key count between 1 and %d' % MAX_KEYS )
+            count = 0
+        counts.append( count )
+    scalars, points = KeyPair.generate_many( curve, sum( counts ), compact=True )
+    start = 0
+    for request, count in zip( requests, counts ):
+        if count:
+            # A compressed point is a sign byte followed by x
+            request.reply( "".join( [ schnorr.int_to_bytes( curve, scalars[i] ) + points.record( i )[1:]
+                                      for i in range( start, start + count ) ] ) )
+            start += count
+
+def handle_sign( curve, requests ):
+    size = curve.field_bytes
+    for request in requests:
+        try:
+            if len( request.body ) < size:
+                raise Exception( 'Request is too short' )
+            private_key = schnorr.bytes_to_int( request.body[:size] )
+            request.reply( schnorr.sign( curve, private_key, request.body[size:] ) )
+        except Exception, e:
+            request.fail( str( e ) )
+
+def handle_verify( curve, requests ):
+    size = curve.field_bytes
+    items = []
+    parsed = []
+    for request in requests:
+        if len( request.body ) < 3 * size:
+            request.fail( 'Request is too short' )
+            continue
+        body = request.body
+        items.append( ( body[:size], body[3 * size:], body[size:3 * size] ) )
+        parsed.append( request )
+    for request, valid in zip( parsed, verify_all( curve, items ) ):
+        request.reply( "\x01" if valid else "\x00" )
+
+def verify_all( curve, items ):
+    """
+    Returns whether each of the (public key, message, signature)
+    items is valid, checking them with batch_verify and splitting
+    batches that fail until the invalid signatures are found.
+    """
+    if not items:
+        return []
+    if len( items ) == 1:
+        return [ schnorr.verify( curve, *items[0] ) ]
+    if schnorr.batch_verify( curve, items ):
+        return [ True ] * len( items )
+    half = len( items ) // 2
+    return verify_all( curve, items[:half] ) + verify_all( curve, items[half:] )
+
+HANDLERS = {
+    INFO: handle_info,
+    KEYGEN: handle_keygen,
+    SIGN: handle_sign,
+    VERIFY: handle_verify,
+}
+
+def main( argv=None ):
+    parser = optparse.OptionParser( usage="python daemon.py --socket PATH [options]" )
+    parser.add_option( "-s", "--socket", help="path of the Unix-domain socket" )
+    parser.add_option( "-c", "--curve", action="append", dest="curves",
+                       help="curve to set up at start (repeatable, default: secp256k1)" )
+    parser.add_option( "-w", "--workers", type="int", default=ec_executor.cpu_count(),
+                       help="worker threads [%default]" )
+    parser.add_option( "--max-batch", type="int", default=256, help="requests per batch at most [%default]" )
+    parser.add_option( "--max-delay", type="float", default=0.002,
+                       help="seconds to wait for more requests for a batch [%default]" )
+    options, args = parser.parse_args( argv )
+    if not options.socket:
+        parser.error( "--socket is required" )
+    server = Server( options.socket, options.curves or [ 'secp256k1' ], options.workers,
+                     options.max_batch, options.max_delay )
+    sys.stderr.write( "Serving on %s\n" % options.socket )
+    server.serve_forever()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
@@ -59,14 +59,19 @@ class ECHelper:
 		"""
 		# Simple cases
 		#
+		if p % 4 == 3:
+			# The candidate root also decides whether a is a
+			# residue (its square is a iff it is), so the
+			# Legendre symbol is not computed separately
+			a %= p
+			x = pow(a, (p + 1) / 4, p)
+			return x if x * x % p == a else 0
 		if ECHelper.legendre_symbol(a, p) != 1:
 			return 0
 		elif a == 0:
 			return 0
 		elif p == 2:
 			return p
-		elif p % 4 == 3:
-			return pow(a, (p + 1) / 4, p)
 
 		# Partition p-1 to s * 2^e for an odd s (i.e.
 		# reduce all the powers of 2 from p-1)
@@ -137,3 +142,33 @@ class ECHelper:
 		"""
 		ls = pow(a, (p - 1) / 2, p)
 		return -1 if ls == p - 1 else ls
+
+	@staticmethod
+	def batch_inverse(values, p):
+		""" Invert every element of 'values' modulo p
+			using Montgomery's trick: one modular
+			inversion and 3(n-1) multiplications in
+			total instead of n inversions.
+
+			Elements that are 0 (mod p) have no inverse;
+			0 is returned in their place.
+		"""
+		values = [ a % p for a in values ]
+		if not any( values ):
+			return [ 0 ] * len( values )
+
+		prefix = []
+		acc = 1
+		for a in values:
+			prefix.append( acc )
+			if a:
+				acc = acc * a % p
+
+		inv = pow( acc, p - 2, p )
+		result = [ 0 ] * len( values )
+		for i in xrange( len( values ) - 1, -1, -1 ):
+			a = values[i]
+			if a:
+				result[i] = inv * prefix[i] % p
+				inv = inv * a % p
+		return result
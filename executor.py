@@ -0,0 +1,238 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import atexit
+import sys
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import bignum as ec_bignum
+
+class Future:
+    '''
+    The pending result of a call submitted to an Executor.
+    '''
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+        self._exc_info = None
+        self._cancelled = False
+        self._running = False
+
+    def cancel(self):
+        """
+        Cancels the call if it has not started yet.
+        Returns True if the call will not be run.
+        """
+        with self._lock:
+            if self._running or self._event.is_set():
+                return self._cancelled
+            self._cancelled = True
+        self.__finish()
+        return True
+
+    def cancelled(self):
+        return self._cancelled
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """
+        Waits for the call to finish and returns its result,
+        re-raising the exception if the call raised one.
+        """
+        if not self._event.wait( timeout ) and not self._event.is_set():
+            raise RuntimeError( 'Timed out waiting for result' )
+        if self._cancelled:
+            raise RuntimeError( 'Call was cancelled' )
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        if not self._event.wait( timeout ) and not self._event.is_set():
+            raise RuntimeError( 'Timed out waiting for result' )
+        return self._exc_info[1] if self._exc_info is not None else None
+
+    def add_done_callback(self, fn):
+        """
+        Calls fn( future ) when the future finishes, or right
+        away if it already has.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append( fn )
+                return
+        fn( self )
+
+    def _start(self):
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._running = True
+            return True
+
+    def _set_result(self, result):
+        self._result = result
+        self.__finish()
+
+    def _set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self.__finish()
+
+    def __finish(self):
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn( self )
+
+class Executor:
+    '''
+    A pool of worker threads for running OpenSSL operations.
+
+    ctypes releases the GIL while a native function runs, so
+    EC_POINT_mul and friends scale across cores when called from
+    several threads. Each worker keeps its own BN_CTX (see
+    BigNumContext) for its whole lifetime.
+    '''
+
+    def __init__(self, workers=None):
+        '''
+        Constructor
+        '''
+        self.workers = workers or cpu_count()
+        self._queue = queue.Queue()
+        self._shutdown = False
+        self._threads = []
+        for i in range( self.workers ):
+            t = threading.Thread( target=self.__work, name="ec-worker-%d" % i )
+            t.daemon = True
+            t.start()
+            self._threads.append( t )
+
+    def __work(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                future, fn, args, kwargs = item
+                if not future._start():
+                    continue
+                try:
+                    future._set_result( fn( *args, **kwargs ) )
+                except:
+                    future._set_exc_info( sys.exc_info() )
+                del future, fn, args, kwargs, item
+        finally:
+            ec_bignum.BigNumContext.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules fn( *args, **kwargs ) on a worker
+        and returns a Future for its result.
+        """
+        if self._shutdown:
+            raise RuntimeError( 'Executor has been shut down' )
+        future = Future()
+        self._queue.put( ( future, fn, args, kwargs ) )
+        return future
+
+    def map(self, fn, items, chunksize=None):
+        """
+        Applies fn to every item on the workers and returns
+        the results as a list in input order.
+        """
+        items = list( items )
+        if chunksize is None:
+            chunksize = max( 1, len( items ) // ( 4 * self.workers ) )
+        chunks = [ items[i:i+chunksize] for i in range( 0, len( items ), chunksize ) ]
+        futures = [ self.submit( _apply_chunk, fn, chunk ) for chunk in chunks ]
+        results = []
+        for future in futures:
+            results.extend( future.result() )
+        return results
+
+    def shutdown(self, wait=True):
+        """
+        Stops the workers once the queued calls have run.
+        """
+        if self._shutdown:
+            return
+        self._shutdown = True
+        for _ in self._threads:
+            self._queue.put( None )
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def __str__(self):
+        return "Executor<workers: %d>" % self.workers
+
+    __repr__ = __str__
+
+def cpu_count():
+    # multiprocessing is only needed for this, and slow to import
+    import multiprocessing
+    return multiprocessing.cpu_count()
+
+def _apply_chunk(fn, chunk):
+    return [ fn( item ) for item in chunk ]
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_executor(workers=None):
+    """
+    Returns the shared executor with the given number of workers
+    (default: one per CPU), starting it on first use.
+    """
+    workers = workers or cpu_count()
+    with _executors_lock:
+        executor = _executors.get( workers )
+        if executor is None:
+            executor = Executor( workers )
+            _executors[workers] = executor
+        return executor
+
+def shutdown_executors():
+    """
+    Shuts down all shared executors.
+    """
+    with _executors_lock:
+        executors = _executors.values()
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+atexit.register( shutdown_executors )
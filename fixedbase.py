@@ -0,0 +1,338 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import atexit
+import collections
+import ctypes
+import threading
+
+from pyelliptic import openssl
+from pyelliptic.openssl import OpenSSL
+import point as ec_point
+import bignum as ec_bignum
+
+def cacheable(curve):
+    """
+    Returns whether tables of points on curve are faster than
+    EC_POINT_mul: the curve is over a prime field and does
+    not have an optimized EC_METHOD.
+    """
+    return curve.field_type == 'prime' and not curve.optimized
+
+class FixedBasePoint(ec_point.Point):
+    '''
+    A point with a precomputed table of multiples, for points
+    that are multiplied by many different scalars (G, the LSAG H
+    point, long-lived public keys).
+
+    With window w, the table holds j * 2^(w*i) * P for every
+    digit j = 1..2^w-1 and every w-bit position i of the scalar,
+    in affine coordinates. A multiplication is then one point
+    addition per non-zero digit of the scalar and no doublings.
+    The additions and table lookups depend on the digits, so the
+    time taken leaks the scalar: only multiply by public scalars.
+
+    The table can also be read from a buffer of encoded points, such
+    as a memory-mapped file written by precomp.save. Entries are then
+    only decoded the first time they are used.
+    '''
+
+    def __init__(self, point, window=4, source=None):
+        '''
+        Constructor
+
+        source, if given, holds the encoded table entries (see
+        table_records), each point_size( False ) bytes long.
+        '''
+        ec_point.Point.__init__( self, point.curve,
+                                 openssl_point=OpenSSL.EC_POINT_dup( point.os_point, point.os_group ),
+                                 owned=True )
+        self.window = window
+        # Multiplying by h * order gives infinity for every
+        # point, so scalars are reduced modulo that
+        self.modulus = self.curve.h * self.curve.order
+        self.rows = ( self.modulus.bit_length() + window - 1 ) // window
+        self.columns = ( 1 << window ) - 1
+        self.source = None
+        if source is not None:
+            self.__use_source( source )
+        else:
+            self.__build_table()
+
+    def __getstate__(self):
+        # The table is rebuilt rather than pickled
+        return { 'point': ec_point.Point( self.curve, encoded=self.to_bytes() ), 'window': self.window }
+
+    def __setstate__(self, state):
+        self.__init__( state['point'], state['window'] )
+
+    def __use_source(self, source):
+        self.width = self.curve.point_size( False )
+        source = memoryview( source )
+        if len( source ) != self.rows * self.columns * self.width:
+            raise Exception( 'Table source has the wrong size' )
+        self.table = ( ctypes.c_void_p * ( self.rows * self.columns ) )()
+        self.source = source
+        self.__load_lock = threading.Lock()
+
+    def __load(self, index):
+        """
+        Decodes table entry index from the source. Threads may
+        decode the same entry at once; the first one to finish
+        stores its EC_POINT, and the others free theirs.
+        """
+        record = self.source[index*self.width:(index+1)*self.width].tobytes()
+        os_point = OpenSSL.EC_POINT_new( self.os_group )
+        if OpenSSL.EC_POINT_oct2point( self.os_group, os_point, record, len( record ), ec_bignum.BigNumContext.get().ctx ) != 1:
+            OpenSSL.EC_POINT_free( os_point )
+            raise Exception( 'Invalid point encoding in table entry %d' % index )
+        with self.__load_lock:
+            if self.table[index]:
+                OpenSSL.EC_POINT_free( os_point )
+            else:
+                self.table[index] = os_point
+            return self.table[index]
+
+    def table_records(self):
+        """
+        Yields the uncompressed encoding of every table entry,
+        row by row.
+        """
+        ctx = ec_bignum.BigNumContext.get().ctx
+        width = self.curve.point_size( False )
+        buf = OpenSSL.malloc( 0, width )
+        for index in range( self.rows * self.columns ):
+            os_point = self.table[index] or self.__load( index )
+            OpenSSL.EC_POINT_point2oct( self.os_group, os_point, openssl.POINT_CONVERSION_UNCOMPRESSED, buf, width, ctx )
+            yield buf.raw
+
+    def __build_table(self):
+        ctx = ec_bignum.BigNumContext.get().ctx
+        group = self.os_group
+        count = self.rows * self.columns
+        self.table = ( ctypes.c_void_p * count )()
+        base = OpenSSL.EC_POINT_dup( self.os_point, group )
+        try:
+            for i in range( self.rows ):
+                row = i * self.columns
+                self.table[row] = OpenSSL.EC_POINT_dup( base, group )
+                for j in range( 1, self.columns ):
+                    self.table[row + j] = OpenSSL.EC_POINT_new( group )
+                    OpenSSL.EC_POINT_add( group, self.table[row + j], self.table[row + j - 1], base, ctx )
+                # base = 2^w * base
+                OpenSSL.EC_POINT_add( group, base, self.table[row + self.columns - 1], base, ctx )
+        finally:
+            OpenSSL.EC_POINT_free( base )
+        OpenSSL.EC_POINTs_make_affine( group, count, self.table, ctx )
+
+    def os_mul(self, k):
+        """
+        Returns k times the point as a new EC_POINT (in projective
+        coordinates), which the caller must free.
+        """
+        ctx = ec_bignum.BigNumContext.get().ctx
+        group = self.os_group
+        k %= self.modulus
+        mask = self.columns
+        result = OpenSSL.EC_POINT_new( group )
+        OpenSSL.EC_POINT_set_to_infinity( group, result )
+        table = self.table
+        row = 0
+        while k:
+            digit = k & mask
+            if digit:
+                entry = table[row + digit - 1] or self.__load( row + digit - 1 )
+                OpenSSL.EC_POINT_add( group, result, result, entry, ctx )
+            k >>= self.window
+            row += self.columns
+        return result
+
+    def __mul__(self, other):
+        """
+        Multiplies the point by a scalar using the table
+        """
+        if isinstance( other, int ) or isinstance( other, long ):
+            return ec_point.Point( self.curve, openssl_point=self.os_mul( other ), owned=True )
+        else:
+            return NotImplemented
+
+    __rmul__ = __mul__
+
+    def mul_public(self, k):
+        return self * k
+
+    def precompute(self, window=4):
+        if window == self.window:
+            return self
+        return FixedBasePoint( self, window )
+
+    def free(self):
+        """
+        Frees the table and the underlying EC_POINT.
+        """
+        table, self.table = getattr( self, 'table', None ), None
+        if table is not None:
+            for os_point in table:
+                if os_point:
+                    OpenSSL.EC_POINT_free( os_point )
+        self.source = None
+        ec_point.Point.free( self )
+
+    def __str__(self):
+        return "FixedBasePoint<0x%X, 0x%X>" % ( self.x, self.y )
+
+    __repr__ = __str__
+
+class PrecomputationCache:
+    '''
+    Keeps FixedBasePoint tables for the points that are
+    multiplied most often by public scalars.
+
+    Every Point.mul_public of a plain Point is counted. Once a point
+    has been multiplied threshold times, a table is built for it, and
+    further multiplications of any point with the same coordinates
+    use the table. At most max_entries tables are kept; when a new
+    one is needed, the one used least often is dropped.
+
+    Only curves over prime fields are cached: OpenSSL adds points
+    over binary fields in affine coordinates, which makes the table
+    lookups slower than EC_POINT_mul there. Neither are curves with
+    an optimized EC_METHOD (see curve.OPTIMIZED_METHODS), such as
+    P-256, whose EC_POINT_mul is faster than the tables.
+    '''
+
+    def __init__(self, max_entries=16, threshold=16, window=4):
+        '''
+        Constructor
+        '''
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.window = window
+        self._lock = threading.Lock()
+        # (curve id, x, y) -> [uses, curve, FixedBasePoint or None, lock]
+        # The lock of an entry is held while its table is built
+        self._entries = collections.OrderedDict()
+
+    def lookup(self, point):
+        """
+        Counts a multiplication of point and returns its
+        FixedBasePoint, or None if it has no table (yet).
+        """
+        if self.max_entries <= 0 or not cacheable( point.curve ):
+            return None
+        key = ( id( point.curve ), point.x, point.y )
+        with self._lock:
+            entry = self._entries.pop( key, None )
+            if entry is None or entry[1] is not point.curve:
+                entry = [ 0, point.curve, None, threading.Lock() ]
+            entry[0] += 1
+            self._entries[key] = entry
+            if entry[2] is None and entry[0] < self.threshold:
+                self.__trim()
+                return None
+        return entry[2] or self.__build( entry, point )
+
+    def __build(self, entry, point):
+        """
+        Builds the table of an entry, unless another
+        thread has done so meanwhile.
+        """
+        with entry[3]:
+            if entry[2] is None:
+                fixed = FixedBasePoint( point, self.window )
+                with self._lock:
+                    entry[2] = fixed
+                    self.__evict()
+        return entry[2]
+
+    def __trim(self):
+        # Forget the oldest candidates, so that points that are only
+        # multiplied once or twice do not accumulate
+        limit = 16 * max( self.max_entries, 1 )
+        while len( self._entries ) > limit:
+            for key, entry in self._entries.iteritems():
+                if entry[2] is None:
+                    del self._entries[key]
+                    break
+            else:
+                return
+
+    def __evict(self):
+        tables = [ ( entry[0], key ) for key, entry in self._entries.iteritems() if entry[2] is not None ]
+        if len( tables ) > self.max_entries:
+            tables.sort()
+            for _, key in tables[:len( tables ) - self.max_entries]:
+                del self._entries[key]
+
+    def table(self, point):
+        """
+        Returns the FixedBasePoint of point, building it now if
+        there is none yet, for callers that know they are about to
+        do many multiplications. Returns None if point is not cached
+        (see cacheable), or max_entries is 0.
+        """
+        if self.max_entries <= 0 or not cacheable( point.curve ):
+            return None
+        key = ( id( point.curve ), point.x, point.y )
+        with self._lock:
+            entry = self._entries.pop( key, None )
+            if entry is None or entry[1] is not point.curve:
+                entry = [ 0, point.curve, None, threading.Lock() ]
+            entry[0] = max( entry[0], self.threshold )
+            self._entries[key] = entry
+        return entry[2] or self.__build( entry, point )
+
+    def add(self, fixed):
+        """
+        Adds a FixedBasePoint, e.g. one loaded with precomp.load,
+        to the cache as if it had been built here.
+        """
+        key = ( id( fixed.curve ), fixed.x, fixed.y )
+        with self._lock:
+            entry = self._entries.pop( key, None )
+            uses = max( entry[0] if entry is not None else 0, self.threshold )
+            self._entries[key] = [ uses, fixed.curve, fixed, threading.Lock() ]
+            self.__evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def tables(self):
+        """
+        Returns the FixedBasePoints currently kept.
+        """
+        with self._lock:
+            return [ entry[2] for entry in self._entries.values() if entry[2] is not None ]
+
+    def __str__(self):
+        return "PrecomputationCache<%d/%d tables>" % ( len( self.tables() ), self.max_entries )
+
+    __repr__ = __str__
+
+# The cache used by Point.mul_public; set max_entries to 0 to disable it
+cache = PrecomputationCache()
+
+# Free the tables while OpenSSL is still loaded
+atexit.register( cache.clear )
@@ -0,0 +1,146 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# _SPREAD[h] is the hex digit h with a zero bit inserted
+# before each of its bits, i.e. the square of h as a
+# polynomial over GF(2), written as two hex digits
+_SPREAD = dict( ( "%x" % d, "%02x" % int( "".join( "0" + c for c in bin( d )[2:] ), 2 ) ) for d in range( 16 ) )
+
+class GF2m:
+    '''
+    Arithmetic in the binary field GF(2^m) with a
+    trinomial or pentanomial reduction polynomial
+    f(x) = x^m + x^k_1 [+ x^k_2 + x^k_3] + 1,
+    elements being Python integers of at most m bits.
+    '''
+
+    def __init__(self, m, poly_coeffs):
+        '''
+        Constructor
+        '''
+        self.m = m
+        self.poly_coeffs = list( poly_coeffs )
+        self.mask = ( 1 << m ) - 1
+        self.f = ( 1 << m ) | 1
+        for k in self.poly_coeffs:
+            self.f |= 1 << k
+
+    def reduce(self, a):
+        """
+        Reduces a polynomial of any degree modulo f(x).
+        """
+        m, mask, ks = self.m, self.mask, self.poly_coeffs
+        while a >> m:
+            hi = a >> m
+            a = ( a & mask ) ^ hi
+            for k in ks:
+                a ^= hi << k
+        return a
+
+    def mul(self, a, b):
+        """
+        Multiplies two field elements, using a
+        4-bit comb over b.
+        """
+        if a == 0 or b == 0:
+            return 0
+        a2 = a << 1
+        a4 = a << 2
+        a8 = a << 3
+        t = [ 0, a, a2, a2 ^ a, a4, a4 ^ a, a4 ^ a2, a4 ^ a2 ^ a,
+              a8, a8 ^ a, a8 ^ a2, a8 ^ a2 ^ a, a8 ^ a4, a8 ^ a4 ^ a, a8 ^ a4 ^ a2, a8 ^ a4 ^ a2 ^ a ]
+        shift = ( b.bit_length() + 3 ) & ~3
+        r = 0
+        while shift:
+            shift -= 4
+            r = ( r << 4 ) ^ t[( b >> shift ) & 0xF]
+        return self.reduce( r )
+
+    def sqr(self, a):
+        """
+        Squares a field element. Squaring is linear over
+        GF(2), so this only spreads out the bits of a.
+        """
+        return self.reduce( int( "".join( map( _SPREAD.__getitem__, "%x" % a ) ), 16 ) )
+
+    def inv(self, a):
+        """
+        Inverts a non-zero field element with the extended
+        Euclidean algorithm for binary polynomials.
+        """
+        if a == 0:
+            raise ZeroDivisionError( 'Zero has no inverse in GF(2^m)' )
+        u, v = a, self.f
+        g1, g2 = 1, 0
+        while u != 1:
+            j = u.bit_length() - v.bit_length()
+            if j < 0:
+                u, v = v, u
+                g1, g2 = g2, g1
+                j = -j
+            u ^= v << j
+            g1 ^= g2 << j
+        return self.reduce( g1 )
+
+    def div(self, a, b):
+        return self.mul( a, self.inv( b ) )
+
+    def trace(self, a):
+        """
+        Returns the absolute trace a + a^2 + ... + a^(2^(m-1)),
+        which is 0 or 1.
+        """
+        t = a
+        for _ in xrange( self.m - 1 ):
+            a = self.sqr( a )
+            t ^= a
+        return t
+
+    def half_trace(self, a):
+        """
+        Returns the half-trace a + a^4 + ... + a^(4^((m-1)/2)).
+        For odd m, z = half_trace( c ) satisfies z^2 + z = c + Tr( c ).
+        """
+        if self.m % 2 == 0:
+            raise Exception( 'The half-trace is only defined for odd m' )
+        h = a
+        for _ in xrange( ( self.m - 1 ) // 2 ):
+            a = self.sqr( self.sqr( a ) )
+            h ^= a
+        return h
+
+    def solve_quadratic(self, c):
+        """
+        Solves z^2 + z = c, returning one of the two solutions
+        (the other is z + 1), or None if there is none.
+        """
+        z = self.half_trace( c )
+        if self.sqr( z ) ^ z != c:
+            return None
+        return z
+
+    def __str__(self):
+        return "GF2m<f(x): x^%d+%s1>" % ( self.m, "".join( map( lambda x: "x^%d+" % x, sorted( self.poly_coeffs, reverse=True ) ) ) )
+
+    __repr__ = __str__
@@ -0,0 +1,292 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+from pyelliptic.openssl import OpenSSL
+import bignum as ec_bignum
+from echelper import ECHelper
+import point as ec_point
+
+# secp256k1 (SEC 2, section 2.4.1)
+P = 2**256 - 2**32 - 977
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+# Cube roots of unity modulo n and p, with
+# LAMBDA * (x, y) = (BETA * x, y) for every point
+LAMBDA = 0x5363AD4CC05C30E0A5261C028812645A122E22EA20816678DF02967C1B23BD72
+BETA = 0x7AE96A2B657C07106E64479EAC3434E99CF0497512F58995C1396C28719501EE
+
+# A short basis ( A1, B1 ), ( A2, B2 ) of the lattice of
+# ( a, b ) with a + b * LAMBDA = 0 (mod n)
+A1 = 0x3086D221A7D46BCDE86C90E49284EB15
+B1 = -0xE4437ED6010E88286F547FA90ABFE4C3
+A2 = 0x114CA50F7A8E2F3F657C1108D9D44CFD8
+B2 = A1
+
+# The point at infinity in Jacobian coordinates
+INFINITY = ( 1, 1, 0 )
+
+def decompose(k):
+    """
+    Splits 0 <= k < n into k1 and k2 of about 128 bits
+    each (either may be negative), with
+    k = k1 + k2 * LAMBDA (mod n).
+    """
+    c1 = ( B2 * k + N // 2 ) // N
+    c2 = ( -B1 * k + N // 2 ) // N
+    return k - c1 * A1 - c2 * A2, -c1 * B1 - c2 * B2
+
+def wnaf(k, w):
+    """
+    Returns the width-w NAF of k >= 0 as a list of digits,
+    least significant first: every non-zero digit is odd, less
+    than 2^(w-1) in absolute value, and followed by at least
+    w-1 zeros.
+    """
+    digits = []
+    full = 1 << w
+    half = full >> 1
+    while k:
+        if k & 1:
+            d = k & ( full - 1 )
+            if d >= half:
+                d -= full
+            k -= d
+        else:
+            d = 0
+        digits.append( d )
+        k >>= 1
+    return digits
+
+# The point arithmetic below is done in Jacobian coordinates,
+# (X : Y : Z) being the affine point (X/Z^2, Y/Z^3). Values are
+# only reduced after multiplications: Python integers do not
+# overflow, and the % of CPython is faster than reductions
+# specialised for p written in Python.
+
+def double(X, Y, Z):
+    """
+    Returns 2 * (X : Y : Z) (dbl-2009-l, a = 0).
+    """
+    if Z == 0:
+        return INFINITY
+    p = P
+    A = X * X % p
+    B = Y * Y % p
+    C = B * B % p
+    D = X + B
+    D = 2 * ( D * D - A - C ) % p
+    E = 3 * A
+    X3 = ( E * E - 2 * D ) % p
+    return X3, ( E * ( D - X3 ) - 8 * C ) % p, 2 * Y * Z % p
+
+def add_affine(X1, Y1, Z1, x2, y2):
+    """
+    Returns (X1 : Y1 : Z1) + the affine point
+    (x2, y2) (madd-2007-bl).
+    """
+    if Z1 == 0:
+        return x2, y2, 1
+    p = P
+    Z1Z1 = Z1 * Z1 % p
+    H = ( x2 * Z1Z1 - X1 ) % p
+    r = 2 * ( y2 * Z1 * Z1Z1 - Y1 ) % p
+    if H == 0:
+        if r == 0:
+            return double( x2, y2, 1 )
+        return INFINITY
+    HH = H * H % p
+    I = 4 * HH
+    J = H * I % p
+    V = X1 * I % p
+    X3 = ( r * r - J - 2 * V ) % p
+    Z3 = Z1 + H
+    return X3, ( r * ( V - X3 ) - 2 * Y1 * J ) % p, ( Z3 * Z3 - Z1Z1 - HH ) % p
+
+def add(X1, Y1, Z1, X2, Y2, Z2):
+    """
+    Returns (X1 : Y1 : Z1) + (X2 : Y2 : Z2) (add-2007-bl).
+    """
+    if Z1 == 0:
+        return X2, Y2, Z2
+    if Z2 == 0:
+        return X1, Y1, Z1
+    p = P
+    Z1Z1 = Z1 * Z1 % p
+    Z2Z2 = Z2 * Z2 % p
+    U1 = X1 * Z2Z2 % p
+    S1 = Y1 * Z2 * Z2Z2 % p
+    H = ( X2 * Z1Z1 - U1 ) % p
+    r = 2 * ( Y2 * Z1 * Z1Z1 - S1 ) % p
+    if H == 0:
+        if r == 0:
+            return double( X1, Y1, Z1 )
+        return INFINITY
+    I = 4 * H * H % p
+    J = H * I % p
+    V = U1 * I % p
+    X3 = ( r * r - J - 2 * V ) % p
+    Z3 = Z1 + Z2
+    return X3, ( r * ( V - X3 ) - 2 * S1 * J ) % p, ( Z3 * Z3 - Z1Z1 - Z2Z2 ) * H % p
+
+def to_affine(points):
+    """
+    Converts Jacobian points, none at infinity, to affine
+    coordinates with a single inversion (see
+    ECHelper.batch_inverse).
+    """
+    p = P
+    result = []
+    for ( X, Y, _ ), z_inv in zip( points, ECHelper.batch_inverse( [ Z for _, _, Z in points ], p ) ):
+        z2 = z_inv * z_inv % p
+        result.append( ( X * z2 % p, Y * z2 * z_inv % p ) )
+    return result
+
+def odd_multiples(x, y, w):
+    """
+    Returns the affine points j * (x, y) for
+    j = 1, 3, ..., 2^(w-1) - 1.
+    """
+    twice = double( x, y, 1 )
+    points = [ ( x, y, 1 ) ]
+    for _ in xrange( ( 1 << ( w - 2 ) ) - 1 ):
+        points.append( add( *( points[-1] + twice ) ) )
+    return to_affine( points )
+
+class GLVEngine:
+    '''
+    Scalar multiplication on secp256k1 using its
+    endomorphism (Gallant-Lambert-Vanstone).
+
+    The map (x, y) -> (BETA * x, y) multiplies every point by
+    LAMBDA, so k * P can be computed as k1 * P + k2 * (LAMBDA * P)
+    with k1 and k2 of half the length of k: half the point
+    doublings. Both halves are written in width-w NAF and
+    processed together, adding precomputed odd multiples of P
+    (affine, for mixed additions) to a point in Jacobian
+    coordinates. a * P + b * Q (mul_pair) interleaves four
+    half-length scalars the same way. G has a larger table,
+    built once.
+
+    The field arithmetic is done in Python, which makes the engine
+    several times slower than EC_POINTs_mul, so Curve does not use
+    it: it is a reference implementation, measured against OpenSSL
+    by the mul_pair_glv benchmark operation. The additions and table
+    lookups depend on the NAF digits, so the time taken leaks the
+    scalars; it must never be given private keys or nonces.
+    '''
+
+    # NAF widths for G and for other points
+    G_WINDOW = 8
+    WINDOW = 5
+
+    def __init__(self, curve):
+        '''
+        Constructor
+        '''
+        if curve.field_type != 'prime' or curve.p != P or curve.a != 0 or curve.b != 7 or curve.order != N:
+            raise Exception( 'Provided curve is not secp256k1' )
+
+        self.curve = curve
+        G = curve.G
+        self.G = ( G.x, G.y )
+        Q = curve.mul_base( LAMBDA )
+        if ( BETA * G.x % P, G.y ) != ( Q.x, Q.y ):
+            raise Exception( 'Unexpected endomorphism' )
+        self.G_table = self.__tables( G.x, G.y, self.G_WINDOW )
+
+    def __tables(self, x, y, w):
+        """
+        Returns the odd multiples of (x, y) and of LAMBDA * (x, y).
+        """
+        table = odd_multiples( x, y, w )
+        return table, [ ( BETA * tx % P, ty ) for tx, ty in table ]
+
+    def __terms(self, point, k):
+        """
+        Returns the ( NAF digits, table, negate ) triples
+        for adding k * point.
+        """
+        if ( point.x, point.y ) == self.G:
+            w, tables = self.G_WINDOW, self.G_table
+        else:
+            w = self.WINDOW
+            tables = self.__tables( point.x, point.y, w )
+        return [ ( wnaf( abs( part ), w ), table, part < 0 )
+                 for part, table in zip( decompose( k % N ), tables ) if part != 0 ]
+
+    def __sum(self, terms):
+        """
+        Returns the Point sum of the scalar multiples in terms.
+        """
+        p = P
+        X, Y, Z = INFINITY
+        length = max( [ len( digits ) for digits, _, _ in terms ] + [ 0 ] )
+        for i in xrange( length - 1, -1, -1 ):
+            X, Y, Z = double( X, Y, Z )
+            for digits, table, negate in terms:
+                if i < len( digits ) and digits[i]:
+                    d = digits[i]
+                    x, y = table[abs( d ) >> 1]
+                    if ( d < 0 ) != negate:
+                        y = p - y
+                    X, Y, Z = add_affine( X, Y, Z, x, y )
+        return self.__to_point( X, Y, Z )
+
+    def __to_point(self, X, Y, Z):
+        if Z == 0:
+            return ec_point.Point.infinity( self.curve )
+        # OpenSSL converts to affine coordinates when the point is read
+        group = self.curve.os_group
+        result = OpenSSL.EC_POINT_new( group )
+        try:
+            x, y, z = ec_bignum.BigNum( decval=X ), ec_bignum.BigNum( decval=Y ), ec_bignum.BigNum( decval=Z )
+            if OpenSSL.EC_POINT_set_Jprojective_coordinates_GFp( group, result, x.bn, y.bn, z.bn,
+                                                                  ec_bignum.BigNumContext.get().ctx ) != 1:
+                raise Exception( 'Could not set the point' )
+        except:
+            OpenSSL.EC_POINT_free( result )
+            raise
+        return ec_point.Point( self.curve, openssl_point=result, owned=True )
+
+    def mul(self, point, k):
+        """
+        Returns k * point, for a public k.
+        """
+        if point.is_infinity() or k % N == 0:
+            return ec_point.Point.infinity( self.curve )
+        return self.__sum( self.__terms( point, k ) )
+
+    def mul_pair(self, a, point_a, b, point_b):
+        """
+        Returns a * point_a + b * point_b, for public a and b.
+        """
+        terms = []
+        for k, point in ( ( a, point_a ), ( b, point_b ) ):
+            if not point.is_infinity() and k % N != 0:
+                terms.extend( self.__terms( point, k ) )
+        return self.__sum( terms )
+
+    def __str__(self):
+        return "GLVEngine<w: %d, G w: %d>" % ( self.WINDOW, self.G_WINDOW )
+
+    __repr__ = __str__
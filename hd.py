@@ -0,0 +1,322 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Hierarchical deterministic key derivation following BIP32.
+
+A tree of key pairs is derived from a seed: every node has a key
+pair and a 32-byte chain code, and child i of a node is derived by
+hashing the parent's public key (or, for hardened children, private
+key) with the chain code and i. Children with i < HARDENED can also
+be derived from the parent's public key alone, as
+parent public key + tweak * G.
+
+On secp256k1 the keys are those of BIP32. Other curves use the same
+construction with their own key encodings; scalars are taken from the
+top bits of the 256-bit hash output, as many as the order has, and
+invalid ones are retried as in SLIP-0010.
+"""
+
+import collections
+import hashlib
+import hmac
+import struct
+import threading
+
+from keypair import KeyPair
+
+HARDENED = 0x80000000
+
+def _hmac(key, data):
+    return hmac.new( key, data, hashlib.sha512 ).digest()
+
+def _scalar(curve, I):
+    # The first 32 bytes of I, shortened to the length of the order
+    return int( I[:32].encode( "hex" ), 16 ) >> max( 0, 256 - curve.order.bit_length() )
+
+def parse_path(path):
+    """
+    Converts a path such as "m/44'/0'/0'/0" (or "m/44H/0H/0H/0") to
+    a tuple of child indices. Tuples and lists are returned as tuples.
+    """
+    if not isinstance( path, basestring ):
+        return tuple( path )
+    parts = path.split( "/" )
+    if parts[0] == "m":
+        parts = parts[1:]
+    indices = []
+    for part in parts:
+        if not part:
+            continue
+        if part[-1] in "'hH":
+            indices.append( int( part[:-1] ) + HARDENED )
+        else:
+            indices.append( int( part ) )
+    return tuple( indices )
+
+def format_path(indices):
+    return "/".join( [ "m" ] + [ "%d'" % ( i - HARDENED ) if i >= HARDENED else "%d" % i for i in indices ] )
+
+class HDNode:
+    '''
+    A node of a derivation tree: a private key (None for nodes
+    derived publicly), its public key and the chain code.
+
+    Nodes have the private_key and public_key attributes of a
+    KeyPair; keypair() makes a KeyPair with an OpenSSL EC_KEY.
+    '''
+
+    def __init__(self, curve, chain_code, private_key=None, public_key=None, path=()):
+        '''
+        Constructor
+        '''
+        if private_key is None and public_key is None:
+            raise Exception( 'A node needs a private or a public key' )
+        self.curve = curve
+        self.chain_code = chain_code
+        self.private_key = private_key
+        if public_key is None:
+            public_key = private_key * curve.G
+        self.public_key = public_key
+        self.path = tuple( path )
+
+    @staticmethod
+    def from_seed(curve, seed, key="Bitcoin seed"):
+        """
+        Returns the root node of the tree for seed (16 to 64 bytes).
+        """
+        I = _hmac( key, seed )
+        while True:
+            k = _scalar( curve, I )
+            if 0 < k < curve.order:
+                return HDNode( curve, I[32:], private_key=k )
+            I = _hmac( key, I )
+
+    def is_private(self):
+        return self.private_key is not None
+
+    def neuter(self):
+        """
+        Returns the node without its private key, from which
+        only non-hardened children can be derived.
+        """
+        return HDNode( self.curve, self.chain_code, public_key=self.public_key, path=self.path )
+
+    def __data(self, index):
+        if index >= HARDENED:
+            if self.private_key is None:
+                raise Exception( 'Hardened children need the private key' )
+            width = ( self.curve.order.bit_length() + 7 ) // 8
+            key = "\0" + ( "%0*X" % ( 2 * width, self.private_key ) ).decode( "hex" )
+        else:
+            key = self.public_key.to_bytes( True )
+        return key + struct.pack( ">I", index )
+
+    def __tweak(self, data):
+        """
+        Returns the tweak and chain code for the HMAC input data,
+        or None if the tweak is not below the order.
+        """
+        I = _hmac( self.chain_code, data )
+        tweak = _scalar( self.curve, I )
+        if tweak >= self.curve.order:
+            return None, I[32:]
+        return tweak, I[32:]
+
+    def child(self, index):
+        """
+        Derives child index (add HARDENED for a hardened child).
+        """
+        if not 0 <= index < 1 << 32:
+            raise Exception( 'Child index out of range' )
+        data = self.__data( index )
+        while True:
+            tweak, chain_code = self.__tweak( data )
+            if tweak is not None:
+                if self.private_key is not None:
+                    k = ( self.private_key + tweak ) % self.curve.order
+                    if k:
+                        return HDNode( self.curve, chain_code, private_key=k, path=self.path + ( index, ) )
+                else:
+                    public_key = tweak * self.curve.G + self.public_key
+                    if not public_key.is_infinity():
+                        return HDNode( self.curve, chain_code, public_key=public_key, path=self.path + ( index, ) )
+            # Invalid child: derive again from the chain code (SLIP-0010)
+            data = "\1" + chain_code + struct.pack( ">I", index )
+
+    def derive(self, path):
+        """
+        Derives the node at path (relative to this node, see parse_path).
+        """
+        node = self
+        for index in parse_path( path ):
+            node = node.child( index )
+        return node
+
+    def derive_range(self, start, count):
+        """
+        Derives children start, ..., start + count - 1 and returns
+        them as a list. This is the same as calling child for each
+        index, but the public keys are made affine in one batch
+        (see Curve.mul_base_many).
+        """
+        curve = self.curve
+        n = curve.order
+        # The serialized parent key is the same for all normal
+        # and for all hardened children
+        keys = {}
+        tweaks = []
+        for index in range( start, start + count ):
+            hardened = index >= HARDENED
+            if hardened not in keys:
+                keys[hardened] = self.__data( index )[:-4]
+            tweak, chain_code = self.__tweak( keys[hardened] + struct.pack( ">I", index ) )
+            if tweak is not None and self.private_key is not None:
+                tweak = ( self.private_key + tweak ) % n or None
+            tweaks.append( ( index, tweak, chain_code ) )
+
+        valid = [ tweak for _, tweak, _ in tweaks if tweak is not None ]
+        if self.private_key is not None:
+            # The child keys are the scalars themselves
+            points = iter( curve.mul_base_many( valid ) )
+        else:
+            points = iter( curve.mul_base_many( valid, add=self.public_key ) )
+
+        children = []
+        for index, tweak, chain_code in tweaks:
+            point = next( points ) if tweak is not None else None
+            if point is None or point.is_infinity():
+                # Invalid tweak, retried as in child
+                children.append( self.child( index ) )
+            elif self.private_key is not None:
+                children.append( HDNode( curve, chain_code, private_key=tweak, public_key=point, path=self.path + ( index, ) ) )
+            else:
+                children.append( HDNode( curve, chain_code, public_key=point, path=self.path + ( index, ) ) )
+        return children
+
+    def keypair(self):
+        if self.private_key is None:
+            raise Exception( 'Node has no private key' )
+        return KeyPair( self.curve, private_key=self.private_key )
+
+    def __eq__(self, other):
+        if isinstance( other, HDNode ):
+            return self.chain_code == other.chain_code and \
+                   self.private_key == other.private_key and \
+                   self.public_key == other.public_key
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __str__(self):
+        return "HDNode<%s, Public:%s>" % ( format_path( self.path ), self.public_key )
+
+    __repr__ = __str__
+
+class KeyTree:
+    '''
+    A derivation tree that keeps the most recently used nodes, so
+    that deriving many paths below the same account or chain does
+    not derive the common ancestors again.
+
+    At most max_entries intermediate nodes are kept; the least
+    recently used one is dropped first.
+    '''
+
+    def __init__(self, root, max_entries=1024):
+        '''
+        Constructor
+        '''
+        self.root = root
+        self.curve = root.curve
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # path -> HDNode
+        self._nodes = collections.OrderedDict()
+
+    @staticmethod
+    def from_seed(curve, seed, max_entries=1024):
+        return KeyTree( HDNode.from_seed( curve, seed ), max_entries )
+
+    def __cached(self, path):
+        with self._lock:
+            node = self._nodes.pop( path, None )
+            if node is not None:
+                self._nodes[path] = node
+            return node
+
+    def __store(self, path, node):
+        with self._lock:
+            self._nodes[path] = node
+            while len( self._nodes ) > self.max_entries:
+                self._nodes.popitem( last=False )
+
+    def node(self, path):
+        """
+        Returns the node at path, deriving it from its
+        nearest cached ancestor.
+        """
+        path = parse_path( path )
+        node, depth = self.root, 0
+        for depth in range( len( path ), 0, -1 ):
+            cached = self.__cached( path[:depth] )
+            if cached is not None:
+                node = cached
+                break
+        else:
+            depth = 0
+        if depth == len( path ):
+            self.hits += 1
+            return node
+        self.misses += 1
+        for i in range( depth, len( path ) ):
+            node = node.child( path[i] )
+            if self.max_entries > 0:
+                self.__store( path[:i + 1], node )
+        return node
+
+    def keypair(self, path):
+        return self.node( path ).keypair()
+
+    def derive_range(self, path, start, count):
+        """
+        Derives children start, ..., start + count - 1 of the node
+        at path. The node is cached, but the children are not.
+        """
+        return self.node( path ).derive_range( start, count )
+
+    def clear(self):
+        with self._lock:
+            self._nodes.clear()
+
+    def __len__(self):
+        return len( self._nodes )
+
+    def __str__(self):
+        return "KeyTree<%d/%d nodes, %d hits, %d misses>" % ( len( self._nodes ), self.max_entries, self.hits, self.misses )
+
+    __repr__ = __str__
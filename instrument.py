@@ -0,0 +1,248 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Opt-in instrumentation of the OpenSSL calls and native objects.
+
+While enabled, every ctypes function of the OpenSSL wrapper is
+replaced by a wrapper that counts its calls and their latency, the
+allocations and frees of EC_POINT, BIGNUM, BN_CTX, EC_KEY and
+EC_GROUP objects are tracked, and live Point, BigNum and KeyPair
+instances are counted. When disabled, the original functions are
+put back, so there is no overhead at all.
+
+    >>> import instrument
+    >>> with instrument.profile() as p:
+    ...     sample_lsag.verify( curve, *signature )
+    >>> p.stats['calls']['EC_POINT_mul']['count']     # 4 per ring member
+    20
+    >>> print p.report()
+
+Latency histograms have HISTOGRAM_BUCKETS buckets; bucket i counts
+the calls that took less than 2^i microseconds (and at least
+2^(i-1)), the last bucket also counting everything slower.
+"""
+
+import ctypes
+import threading
+import timeit
+import weakref
+
+from pyelliptic.openssl import OpenSSL
+import point as ec_point
+import bignum as ec_bignum
+import keypair as ec_keypair
+
+HISTOGRAM_BUCKETS = 24
+
+# Native allocation and free functions: name -> ( kind, delta )
+ALLOCATIONS = {
+    'BN_new': ( 'BIGNUM', 1 ),
+    'BN_free': ( 'BIGNUM', -1 ),
+    'BN_clear_free': ( 'BIGNUM', -1 ),
+    'BN_CTX_new': ( 'BN_CTX', 1 ),
+    'BN_CTX_free': ( 'BN_CTX', -1 ),
+    'EC_POINT_new': ( 'EC_POINT', 1 ),
+    'EC_POINT_dup': ( 'EC_POINT', 1 ),
+    'EC_POINT_free': ( 'EC_POINT', -1 ),
+    'EC_POINT_clear_free': ( 'EC_POINT', -1 ),
+    'EC_KEY_new': ( 'EC_KEY', 1 ),
+    'EC_KEY_new_by_curve_name': ( 'EC_KEY', 1 ),
+    'EC_KEY_free': ( 'EC_KEY', -1 ),
+    'EC_GROUP_new_by_curve_name': ( 'EC_GROUP', 1 ),
+    'EC_GROUP_free': ( 'EC_GROUP', -1 ),
+}
+
+# Classes whose live instances are counted
+CLASSES = [ ec_point.Point, ec_bignum.BigNum, ec_keypair.KeyPair ]
+
+timer = timeit.default_timer
+
+_lock = threading.Lock()
+_originals = {}
+_constructors = {}
+# name -> [ count, total seconds, histogram ]
+_calls = {}
+_native = {}
+_created = {}
+_destroyed = {}
+# id( weakref ) -> weakref of every counted instance
+_refs = {}
+
+def is_enabled():
+    return bool( _originals )
+
+def enable():
+    """
+    Starts instrumenting. Counters keep their values; see reset.
+    """
+    with _lock:
+        if _originals:
+            return
+        # Functions are bound on first use, so bind them all now
+        OpenSSL.bind_all()
+        for name, fn in vars( OpenSSL ).items():
+            if isinstance( fn, ctypes._CFuncPtr ):
+                _originals[name] = fn
+                setattr( OpenSSL, name, _wrap( name, fn ) )
+        for cls in CLASSES:
+            _constructors[cls] = cls.__dict__['__init__']
+            cls.__init__ = _wrap_constructor( cls, cls.__dict__['__init__'] )
+
+def disable():
+    """
+    Stops instrumenting and restores the original functions.
+    """
+    with _lock:
+        for name, fn in _originals.items():
+            setattr( OpenSSL, name, fn )
+        _originals.clear()
+        for cls, init in _constructors.items():
+            cls.__init__ = init
+        _constructors.clear()
+
+def reset():
+    """
+    Clears the call counters and live-object counts.
+    """
+    with _lock:
+        _calls.clear()
+        _native.clear()
+        _created.clear()
+        _destroyed.clear()
+        _refs.clear()
+
+def _wrap(name, fn):
+    allocation = ALLOCATIONS.get( name )
+    def wrapper(*args):
+        t_start = timer()
+        result = fn( *args )
+        elapsed = timer() - t_start
+        bucket = min( int( elapsed * 1e6 ).bit_length(), HISTOGRAM_BUCKETS - 1 )
+        with _lock:
+            call = _calls.get( name )
+            if call is None:
+                call = _calls[name] = [ 0, 0.0, [ 0 ] * HISTOGRAM_BUCKETS ]
+            call[0] += 1
+            call[1] += elapsed
+            call[2][bucket] += 1
+            if allocation is not None and ( result or allocation[1] < 0 ):
+                _native[allocation[0]] = _native.get( allocation[0], 0 ) + allocation[1]
+        return result
+    wrapper.__name__ = name
+    return wrapper
+
+def _wrap_constructor(cls, init):
+    name = cls.__name__
+    def finalized(ref):
+        with _lock:
+            if _refs.pop( id( ref ), None ) is not None:
+                _destroyed[name] = _destroyed.get( name, 0 ) + 1
+    def __init__(self, *args, **kwargs):
+        init( self, *args, **kwargs )
+        with _lock:
+            _created[name] = _created.get( name, 0 ) + 1
+            ref = weakref.ref( self, finalized )
+            _refs[id( ref )] = ref
+    __init__.__doc__ = init.__doc__
+    return __init__
+
+def stats():
+    """
+    Returns a snapshot of the counters:
+
+    calls: OpenSSL function name -> { count, total (seconds), histogram }
+    native: native object type -> allocations minus frees
+    objects: class name -> { created, live }
+    """
+    with _lock:
+        return {
+            'enabled': bool( _originals ),
+            'calls': dict( ( name, { 'count': c[0], 'total': c[1], 'histogram': list( c[2] ) } )
+                           for name, c in _calls.items() ),
+            'native': dict( _native ),
+            'objects': dict( ( name, { 'created': created, 'live': created - _destroyed.get( name, 0 ) } )
+                             for name, created in _created.items() ),
+        }
+
+def difference(after, before):
+    """
+    Returns the change in counters between two stats() snapshots.
+    """
+    calls = {}
+    for name, c in after['calls'].items():
+        b = before['calls'].get( name, { 'count': 0, 'total': 0.0, 'histogram': [ 0 ] * HISTOGRAM_BUCKETS } )
+        if c['count'] != b['count']:
+            calls[name] = { 'count': c['count'] - b['count'],
+                            'total': c['total'] - b['total'],
+                            'histogram': [ x - y for x, y in zip( c['histogram'], b['histogram'] ) ] }
+    native = dict( ( kind, n - before['native'].get( kind, 0 ) ) for kind, n in after['native'].items() )
+    objects = {}
+    for name, o in after['objects'].items():
+        b = before['objects'].get( name, { 'created': 0, 'live': 0 } )
+        objects[name] = { 'created': o['created'] - b['created'], 'live': o['live'] - b['live'] }
+    return { 'enabled': after['enabled'], 'calls': calls, 'native': native, 'objects': objects }
+
+class profile:
+    '''
+    Context manager that instruments the code in its block.
+
+    On exit, the stats attribute holds the difference between the
+    counters at the end and the start of the block: the OpenSSL calls
+    made, the native objects allocated but not freed and the Point,
+    BigNum and KeyPair instances created and still alive. Calls made
+    by other threads in the meantime are included.
+    '''
+
+    def __init__(self):
+        self.stats = None
+        self.__was_enabled = False
+        self.__before = None
+
+    def __enter__(self):
+        self.__was_enabled = is_enabled()
+        enable()
+        self.__before = stats()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stats = difference( stats(), self.__before )
+        if not self.__was_enabled:
+            disable()
+        return False
+
+    def report(self, limit=20):
+        """
+        Returns the calls that took the most time as a
+        printable table.
+        """
+        calls = sorted( self.stats['calls'].items(), key=lambda item: -item[1]['total'] )
+        lines = [ "%-40s %10s %12s %10s" % ( "function", "calls", "total ms", "us/call" ) ]
+        for name, c in calls[:limit]:
+            lines.append( "%-40s %10d %12.3f %10.2f" % ( name, c['count'], 1000 * c['total'], 1e6 * c['total'] / c['count'] ) )
+        for kind, n in sorted( self.stats['native'].items() ):
+            lines.append( "live %s: %+d" % ( kind, n ) )
+        for name, o in sorted( self.stats['objects'].items() ):
+            lines.append( "%s: %d created, %+d live" % ( name, o['created'], o['live'] ) )
+        return "\n".join( lines )
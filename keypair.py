@@ -26,17 +26,37 @@ from pyelliptic.openssl import OpenSSL
 import curve as ec_curve
 import point as ec_point
 import bignum as ec_bignum
+import aio as ec_aio
+import executor as ec_executor
+import pointarray as ec_pointarray
+import backend as ec_backend
 
-class KeyPair:
+class KeyPair(object):
     '''
     classdocs
     '''
 
+    # Key pairs have no __dict__, and only hold the private key
+    # until the public key or a native key is used
+    __slots__ = ( 'curve', 'os_group', 'os_key', 'os_pkey', 'private_key', 'public_key',
+                  '__created_key', '__created_pkey', '__weakref__' )
 
-    def __init__(self, curve, os_key=None, private_key=None):
+    # Key pairs compare by value, but are mutable
+    __hash__ = None
+
+    def __init__(self, curve, os_key=None, private_key=None, public_key=None):
         '''
         Constructor
+
+        Without os_key or private_key, a random private key is taken
+        from curve.scalars. public_key (which may also be given, and
+        must be private_key * curve.G) is only computed when it is
+        first used, and the EC_KEY (or EVP_PKEY, see backend) only
+        created when os_key (os_pkey) is first used. The keys of an
+        EC_KEY given as os_key are read at once.
         '''
+        self.__created_key = False
+        self.__created_pkey = False
         if not isinstance( curve, ec_curve.Curve ):
             raise Exception( 'Provided curve is not a Curve object' )
         
@@ -45,23 +65,149 @@ class KeyPair:
 
         if os_key is not None:
             self.os_key = os_key
+            # The caller owns the EC_KEY, so do not keep reading from it
+            self.__read_keys()
         else:
-            self.os_key = OpenSSL.EC_KEY_new()
-            OpenSSL.EC_KEY_set_group( self.os_key, self.os_group )
-            if private_key is not None:
-                privk = ec_bignum.BigNum( decval=private_key )
-                pubk = private_key * curve.G
-                OpenSSL.EC_KEY_set_private_key( self.os_key, privk.bn )
-                OpenSSL.EC_KEY_set_public_key( self.os_key, pubk.os_point )
-            else:
-                OpenSSL.EC_KEY_generate_key( self.os_key )
+            self.private_key = private_key if private_key is not None else curve.scalars.next()
+            if public_key is not None:
+                self.public_key = public_key
 
+    def __read_keys(self):
         try:
             priv_key = ec_bignum.BigNum( OpenSSL.EC_KEY_get0_private_key( self.os_key ) )
             self.private_key = priv_key.get_value()
-            self.public_key = ec_point.Point( self.curve, openssl_point=OpenSSL.EC_KEY_get0_public_key( self.os_key ) )
+            # Copy the public key so that it outlives the EC_KEY
+            pubk = OpenSSL.EC_POINT_dup( OpenSSL.EC_KEY_get0_public_key( self.os_key ), self.os_group )
+            self.public_key = ec_point.Point( self.curve, openssl_point=pubk, owned=True )
         finally:
             del priv_key
+
+    def __getattr__(self, name):
+        if name == 'public_key':
+            self.public_key = self.private_key * self.curve.G
+            return self.public_key
+        elif name == 'os_key':
+            os_key = OpenSSL.EC_KEY_new()
+            OpenSSL.EC_KEY_set_group( os_key, self.os_group )
+            try:
+                privk = ec_bignum.BigNum( decval=self.private_key )
+                OpenSSL.EC_KEY_set_private_key( os_key, privk.bn )
+                OpenSSL.EC_KEY_set_public_key( os_key, self.public_key.os_point )
+            except:
+                OpenSSL.EC_KEY_free( os_key )
+                raise
+            self.os_key = os_key
+            self.__created_key = True
+            return os_key
+        elif name == 'os_pkey':
+            self.os_pkey = ec_backend.new_pkey( self.curve, self.private_key, self.public_key )
+            self.__created_pkey = True
+            return self.os_pkey
+        raise AttributeError( name )
+
+    def __getstate__(self):
+        # Keys are pickled as the fixed-width private scalar
+        # and the compressed public key
+        width = ( self.curve.order.bit_length() + 7 ) // 8
+        return { 'curve': self.curve,
+                 'private': ( "%0*x" % ( 2 * width, self.private_key ) ).decode( "hex" ),
+                 'public': self.public_key.to_bytes() }
+
+    def __setstate__(self, state):
+        curve = state['curve']
+        self.__init__( curve, private_key=int( state['private'].encode( "hex" ), 16 ),
+                       public_key=ec_point.Point( curve, encoded=state['public'] ) )
+
+    @classmethod
+    def generate_many(cls, curve, n, workers=None, compact=False):
+        """
+        Generates n random key pairs.
+
+        The private keys are taken from curve.scalars in one call
+        and the public keys computed with Curve.mul_base_many, in
+        chunks on a pool of workers threads if workers is given.
+        Returns a list of KeyPairs, or with compact a list of the
+        private keys and a PointArray of the public keys.
+        """
+        scalars = curve.scalars.take( n )
+        if workers is None:
+            points = curve.mul_base_many( scalars )
+        else:
+            executor = ec_executor.get_executor( workers )
+            size = max( 1, n // ( 4 * executor.workers ) )
+            chunks = [ scalars[i:i + size] for i in range( 0, n, size ) ]
+            points = [ point for chunk in executor.map( curve.mul_base_many, chunks, chunksize=1 ) for point in chunk ]
+        if compact:
+            return scalars, ec_pointarray.PointArray.from_points( curve, points )
+        return [ cls( curve, private_key=k, public_key=point ) for k, point in zip( scalars, points ) ]
+
+    @classmethod
+    def generate(cls, curve, backend=None):
+        """
+        Generates a random key pair with OpenSSL, through
+        backend (see the backend module) or the one in use,
+        keeping the native key it creates.
+        """
+        backend = backend or ec_backend.get()
+        private_key, public_key, native = backend.generate( curve )
+        keypair = cls( curve, private_key=private_key, public_key=public_key )
+        setattr( keypair, backend.attribute, native )
+        if backend.attribute == 'os_key':
+            keypair.__created_key = True
+        else:
+            keypair.__created_pkey = True
+        return keypair
+
+    @classmethod
+    def agenerate(cls, curve):
+        """
+        Awaitable version of KeyPair( curve ), generating
+        the key pair on the asynchronous executor.
+        """
+        def generate():
+            keypair = cls( curve )
+            keypair.public_key
+            return keypair
+        return ec_aio.run( generate )
+
+    def ecdh(self, public_key, backend=None):
+        """
+        Returns the ECDH shared secret with public_key (a Point or
+        a KeyPair): the x coordinate of private_key * public_key,
+        curve.field_bytes long.
+        """
+        return ( backend or ec_backend.get() ).ecdh( self, public_key )
+
+    def ecdsa_sign(self, digest, backend=None):
+        """
+        Returns the DER-encoded ECDSA signature of digest.
+        """
+        return ( backend or ec_backend.get() ).sign( self, digest )
+
+    def ecdsa_verify(self, digest, signature, backend=None):
+        """
+        Returns whether signature is a valid ECDSA
+        signature of digest by this key pair.
+        """
+        return ( backend or ec_backend.get() ).verify( self.curve, self, digest, signature )
+
+    def free(self):
+        """
+        Frees the underlying EC_KEY and EVP_PKEY
+        if this key pair created them.
+        """
+        if self.__created_key:
+            self.__created_key = False
+            OpenSSL.EC_KEY_free( self.os_key )
+            self.os_key = None
+        if self.__created_pkey:
+            self.__created_pkey = False
+            OpenSSL.EVP_PKEY_free( self.os_pkey )
+            self.os_pkey = None
+
+    def __del__(self):
+        if getattr( self, '_KeyPair__created_key', False ) or getattr( self, '_KeyPair__created_pkey', False ):
+            self.free()
             
     def __eq__(self, other):
         if type(other) is type(self):
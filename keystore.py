@@ -0,0 +1,321 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Files holding many key pairs, for rings that are generated once and
+reused.
+
+A file consists of a fixed-size header, one fixed-width record per
+key and an index of the records sorted by public key:
+
+    magic             8 bytes   "PYECKEY\\0"
+    version           2 bytes
+    private width     2 bytes   0 if the file only has public keys
+    public width      2 bytes   Curve.point_size( True )
+    count             4 bytes
+    curve digest     32 bytes   Curve.parameters_digest()
+    records           count * ( private width + public width ) bytes:
+                      the private scalar followed by the compressed
+                      SEC 1 encoding of the public key
+    index             count * 4 bytes, the record numbers ordered by
+                      the public key encodings
+
+Integers are big-endian. Files are opened with a read-only mmap, so
+opening one takes the same time whatever its size, and keys are only
+decoded when they are used.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+
+from keypair import KeyPair
+import point as ec_point
+
+MAGIC = "PYECKEY\0"
+VERSION = 1
+HEADER = struct.Struct( ">8sHHHI32s" )
+INDEX_ENTRY = struct.Struct( ">I" )
+
+# Number of keys generated and written at a time by generate
+CHUNK = 4096
+
+def _scalar_width(curve):
+    return ( curve.order.bit_length() + 7 ) // 8
+
+def _encode_scalar(k, width):
+    return ( "%0*X" % ( 2 * width, k ) ).decode( "hex" )
+
+def _write(curve, path, records, private):
+    """
+    Writes the records (pairs of private key and encoded public key)
+    to path under a temporary name, then renames it into place.
+    """
+    private_width = _scalar_width( curve ) if private else 0
+    public_width = curve.point_size( True )
+    directory = os.path.dirname( os.path.abspath( path ) )
+    fd, tmp_path = tempfile.mkstemp( dir=directory, prefix=".keystore-" )
+    try:
+        with os.fdopen( fd, "wb" ) as f:
+            f.write( HEADER.pack( MAGIC, VERSION, private_width, public_width, 0, curve.parameters_digest() ) )
+            public_keys = []
+            for private_key, public_key in records:
+                if private:
+                    f.write( _encode_scalar( private_key, private_width ) )
+                f.write( public_key )
+                public_keys.append( public_key )
+            count = len( public_keys )
+            order = sorted( xrange( count ), key=public_keys.__getitem__ )
+            del public_keys
+            f.write( struct.pack( ">%dI" % count, *order ) )
+            f.seek( 0 )
+            f.write( HEADER.pack( MAGIC, VERSION, private_width, public_width, count, curve.parameters_digest() ) )
+        os.rename( tmp_path, path )
+    except:
+        os.unlink( tmp_path )
+        raise
+
+def save(curve, path, keys, private=True):
+    """
+    Writes keys (KeyPair or StoredKey objects) to path. With private
+    False, only the public keys are written.
+    """
+    _write( curve, path, ( ( key.private_key if private else None, key.public_key.to_bytes( True ) )
+                           for key in keys ), private )
+
+def generate(curve, path, count, workers=None):
+    """
+    Generates count random key pairs with KeyPair.generate_many
+    and writes them to path.
+    """
+    def records():
+        for start in xrange( 0, count, CHUNK ):
+            scalars, points = KeyPair.generate_many( curve, min( CHUNK, count - start ),
+                                                     workers=workers, compact=True )
+            for i, k in enumerate( scalars ):
+                yield k, points.record( i )
+    _write( curve, path, records(), True )
+
+def load(curve, path):
+    """
+    Maps the key store in path and returns it as a KeyStore.
+
+    Raises an exception if the file was not written by this
+    version or is for another curve.
+    """
+    with open( path, "rb" ) as f:
+        mapped = mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ )
+    try:
+        magic, version, private_width, public_width, count, digest = HEADER.unpack_from( mapped, 0 )
+        if magic != MAGIC:
+            raise Exception( '%s is not a key store' % path )
+        if version != VERSION:
+            raise Exception( '%s has key store version %d, expected %d' % ( path, version, VERSION ) )
+        if digest != curve.parameters_digest() or public_width != curve.point_size( True ) or \
+                private_width not in ( 0, _scalar_width( curve ) ):
+            raise Exception( '%s was written for different curve parameters' % path )
+        if len( mapped ) != HEADER.size + count * ( private_width + public_width + INDEX_ENTRY.size ):
+            raise Exception( '%s has the wrong size' % path )
+        return KeyStore( curve, mapped, private_width, public_width, count )
+    except:
+        mapped.close()
+        raise
+
+def load_or_generate(curve, path, count, workers=None):
+    """
+    Loads the key store in path, generating count keys into it first
+    if it is missing, stale or holds fewer than count keys.
+    """
+    try:
+        store = load( curve, path )
+        if len( store ) >= count:
+            return store[:count]
+        store.close()
+    except Exception:
+        pass
+    generate( curve, path, count, workers )
+    return load( curve, path )
+
+class KeyStore:
+    '''
+    The keys of a key store file, or a contiguous range of them.
+
+    Indexing gives StoredKey views, and slicing with step 1 gives a
+    KeyStore over the same mapping, so ring slices such as
+    keys[0:i] are not copied. The mapping belongs to owner, the
+    store returned by load.
+    '''
+
+    def __init__(self, curve, mapping, private_width, public_width, count, start=0, stop=None, owner=None):
+        '''
+        Constructor
+        '''
+        self.curve = curve
+        self.mapping = mapping
+        self.owner = self if owner is None else owner
+        self.private_width = private_width
+        self.public_width = public_width
+        self.width = private_width + public_width
+        self.count = count
+        self.start = start
+        self.stop = count if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def has_private_keys(self):
+        return self.private_width > 0
+
+    def __offset(self, index):
+        if index < 0:
+            index += len( self )
+        if not 0 <= index < len( self ):
+            raise IndexError( 'key index out of range' )
+        return HEADER.size + ( self.start + index ) * self.width
+
+    def record(self, index):
+        """
+        Returns the raw record of key index.
+        """
+        offset = self.__offset( index )
+        return self.mapping[offset:offset + self.width]
+
+    def private_key(self, index):
+        if not self.private_width:
+            raise Exception( 'Key store has no private keys' )
+        offset = self.__offset( index )
+        return int( self.mapping[offset:offset + self.private_width].encode( "hex" ), 16 )
+
+    def public_key_bytes(self, index):
+        offset = self.__offset( index ) + self.private_width
+        return self.mapping[offset:offset + self.public_width]
+
+    def public_key(self, index):
+        return ec_point.Point.from_bytes( self.curve, self.public_key_bytes( index ) )
+
+    def __getitem__(self, index):
+        if isinstance( index, slice ):
+            start, stop, step = index.indices( len( self ) )
+            if step != 1:
+                return [ self[i] for i in range( start, stop, step ) ]
+            stop = max( start, stop )
+            return KeyStore( self.curve, self.mapping, self.private_width, self.public_width,
+                             self.count, self.start + start, self.start + stop, self.owner )
+        self.__offset( index )
+        return StoredKey( self, index if index >= 0 else index + len( self ) )
+
+    def __iter__(self):
+        for i in xrange( len( self ) ):
+            yield StoredKey( self, i )
+
+    def index(self, public_key):
+        """
+        Returns the index of the key with the given public key (a
+        Point or its compressed encoding), searching the file's
+        index. Raises ValueError if it is not in this range.
+        """
+        if isinstance( public_key, ec_point.Point ):
+            public_key = public_key.to_bytes( True )
+        index_offset = HEADER.size + self.count * self.width
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = ( lo + hi ) // 2
+            record = INDEX_ENTRY.unpack_from( self.mapping, index_offset + mid * INDEX_ENTRY.size )[0]
+            offset = HEADER.size + record * self.width + self.private_width
+            if self.mapping[offset:offset + self.public_width] < public_key:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Equal public keys are adjacent in the index
+        while lo < self.count:
+            record = INDEX_ENTRY.unpack_from( self.mapping, index_offset + lo * INDEX_ENTRY.size )[0]
+            offset = HEADER.size + record * self.width + self.private_width
+            if self.mapping[offset:offset + self.public_width] != public_key:
+                break
+            if self.start <= record < self.stop:
+                return record - self.start
+            lo += 1
+        raise ValueError( 'public key is not in the key store' )
+
+    def close(self):
+        """
+        Unmaps the file, if this store owns the mapping. Slices
+        share the mapping of their owner, so closing them does
+        nothing. Keys already decoded stay usable.
+        """
+        if self.owner is self:
+            self.mapping.close()
+
+    def __str__(self):
+        return "KeyStore<%s, keys %d-%d of %d>" % ( self.curve, self.start, self.stop, self.count )
+
+    __repr__ = __str__
+
+class StoredKey:
+    '''
+    A key pair in a KeyStore. Its private_key and public_key
+    attributes are decoded when they are first used; keypair()
+    makes a KeyPair with an OpenSSL EC_KEY.
+    '''
+
+    def __init__(self, store, index):
+        '''
+        Constructor
+        '''
+        self.curve = store.curve
+        self.store = store
+        self.index = index
+
+    def __getattr__(self, name):
+        if name == 'private_key':
+            if not self.store.has_private_keys():
+                raise AttributeError( 'Key store has no private keys' )
+            value = self.store.private_key( self.index )
+        elif name == 'public_key':
+            value = self.store.public_key( self.index )
+        else:
+            raise AttributeError( name )
+        setattr( self, name, value )
+        return value
+
+    def keypair(self):
+        return KeyPair( self.curve, private_key=self.private_key )
+
+    def __eq__(self, other):
+        if isinstance( other, KeyPair ) or ( isinstance( other, StoredKey ) and other.store.has_private_keys() ):
+            if self.store.has_private_keys() and self.private_key != other.private_key:
+                return False
+            return self.public_key == other.public_key
+        if isinstance( other, StoredKey ):
+            return self.public_key == other.public_key
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __str__(self):
+        return "StoredKey<%d, Public:%s>" % ( self.store.start + self.index, self.public_key )
+
+    __repr__ = __str__
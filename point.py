@@ -23,21 +23,36 @@
 # DEALINGS IN THE SOFTWARE.
 
 import ctypes
+from pyelliptic import openssl
 from pyelliptic.openssl import OpenSSL
 from echelper import ECHelper
 import curve as ec_curve
 import bignum as ec_bignum
 
-class Point:
+class Point(object):
     '''
     classdocs
     '''
 
+    # Points are created by the million (rings, key stores), so they
+    # have no __dict__. Subclasses may add one.
+    __slots__ = ( 'curve', 'os_group', 'os_point', 'x', 'y', '__owns_point', '__encoded', '__weakref__' )
 
-    def __init__(self, curve, openssl_point=None, x=None, y=None):
+    # Points compare by value, but are mutable
+    __hash__ = None
+
+    def __init__(self, curve, openssl_point=None, x=None, y=None, owned=False, validate=False, encoded=None):
         '''
         Constructor
+
+        If owned is True, the point takes ownership of
+        openssl_point and frees it when it is no longer used.
+        If validate is True, an exception is raised unless the
+        point passes is_valid, as untrusted points must.
+        A point given as encoded (see to_bytes) is only decoded
+        when its coordinates or EC_POINT are first used.
         '''
+        self.__owns_point = False
         if not isinstance( curve, ec_curve.Curve ):
             raise Exception( 'Provided curve is not a Curve object' )
         
@@ -45,24 +60,53 @@ class Point:
         self.os_group = curve.os_group
         
         if openssl_point is not None:
+            self.__owns_point = owned
             self.__set_to_openssl_point( openssl_point )
         elif x is not None and y is not None:
             self.__set_to_coordinates( x, y )
+        elif encoded is not None:
+            self.__encoded = encoded
         else:
             raise Exception( 'No point given' )
+        if validate and not self.is_valid():
+            raise Exception( 'Point is not in the group generated by G' )
 
     def __set_to_openssl_point(self, point):
         try:
             x, y = ec_bignum.BigNum(), ec_bignum.BigNum()
 
             # Put X and Y coordinates of public key into x and y vars
-            OpenSSL.EC_POINT_get_affine_coordinates_GFp( self.os_group, point, x.bn, y.bn, None )
+            if self.curve.field_type == 'prime':
+                OpenSSL.EC_POINT_get_affine_coordinates_GFp( self.os_group, point, x.bn, y.bn, ec_bignum.BigNumContext.get().ctx )
+            elif self.curve.field_type == 'power-of-two':
+                OpenSSL.EC_POINT_get_affine_coordinates_GF2m( self.os_group, point, x.bn, y.bn, ec_bignum.BigNumContext.get().ctx )
 
             self.x, self.y = x.get_value(), y.get_value()
             self.os_point = point
         finally:
             del x, y
             
+    def __getattr__(self, name):
+        if name in ( 'x', 'y', 'os_point' ) and hasattr( self, '_Point__encoded' ):
+            data = self.__encoded
+            del self.__encoded
+            if data[:1] == '\x00':
+                data = data[:1]
+            point = OpenSSL.EC_POINT_new( self.os_group )
+            if OpenSSL.EC_POINT_oct2point( self.os_group, point, data, len( data ), ec_bignum.BigNumContext.get().ctx ) != 1:
+                OpenSSL.EC_POINT_free( point )
+                raise Exception( 'Invalid point encoding' )
+            self.__owns_point = True
+            self.__set_to_openssl_point( point )
+            return getattr( self, name )
+        raise AttributeError( name )
+
+    def __getstate__(self):
+        return { 'curve': self.curve, 'encoded': self.to_bytes() }
+
+    def __setstate__(self, state):
+        self.__init__( state['curve'], encoded=state['encoded'] )
+
     def __set_to_coordinates(self, x_val, y_val):
         try:
             point= OpenSSL.EC_POINT_new( self.os_group )
@@ -70,16 +114,96 @@ class Point:
             
             if self.curve.field_type == 'prime':
                 OpenSSL.EC_POINT_set_affine_coordinates_GFp( self.os_group, point, x.bn, y.bn, None )
-            elif self.curve.field_type == 'characteristic-two':
+            elif self.curve.field_type == 'power-of-two':
                 OpenSSL.EC_POINT_set_affine_coordinates_GF2m( self.os_group, point, x.bn, y.bn, None )
                 
             self.x, self.y = x_val, y_val
             self.os_point = point
+            self.__owns_point = True
         finally:
             del x, y
+
+    @staticmethod
+    def infinity(curve):
+        """
+        Returns the point at infinity of a curve.
+        """
+        point = OpenSSL.EC_POINT_new( curve.os_group )
+        OpenSSL.EC_POINT_set_to_infinity( curve.os_group, point )
+        return Point( curve, openssl_point=point, owned=True )
+
+    @staticmethod
+    def from_bytes(curve, data):
+        """
+        Decodes a point encoded by to_bytes. The encoding may be
+        padded with zero bytes (the point at infinity is a single
+        zero byte).
+        """
+        if data[:1] == '\x00':
+            data = data[:1]
+        point = OpenSSL.EC_POINT_new( curve.os_group )
+        if OpenSSL.EC_POINT_oct2point( curve.os_group, point, data, len( data ), ec_bignum.BigNumContext.get().ctx ) != 1:
+            OpenSSL.EC_POINT_free( point )
+            raise Exception( 'Invalid point encoding' )
+        return Point( curve, openssl_point=point, owned=True )
+
+    def to_bytes(self, compressed=True):
+        """
+        Returns the SEC 1 octet encoding of the point,
+        curve.point_size( compressed ) bytes long.
+        """
+        size = self.curve.point_size( compressed )
+        encoded = getattr( self, '_Point__encoded', None )
+        if compressed and encoded is not None and len( encoded ) == size:
+            return encoded
+        form = openssl.POINT_CONVERSION_COMPRESSED if compressed else openssl.POINT_CONVERSION_UNCOMPRESSED
+        buf = OpenSSL.malloc( 0, size )
+        OpenSSL.EC_POINT_point2oct( self.os_group, self.os_point, form, buf, size, ec_bignum.BigNumContext.get().ctx )
+        return buf.raw
+
+    def is_infinity(self):
+        return OpenSSL.EC_POINT_is_at_infinity( self.os_group, self.os_point ) == 1
+
+    def is_valid(self):
+        """
+        Returns whether the point is on the curve, is not the point
+        at infinity and, on curves with a cofactor, lies in the
+        subgroup of order curve.order. Curve.validate_many checks
+        many points at once.
+        """
+        if not ( in_field( self.curve, self.x ) and in_field( self.curve, self.y ) ):
+            return False
+        order = ec_bignum.BigNum( decval=self.curve.order )
+        tmp = OpenSSL.EC_POINT_new( self.os_group )
+        try:
+            return is_valid_point( self.curve, self.os_point, order, tmp, ec_bignum.BigNumContext.get().ctx )
+        finally:
+            OpenSSL.EC_POINT_free( tmp )
+            del order
+
+    def precompute(self, window=4):
+        """
+        Returns a FixedBasePoint equal to this point, with a
+        table of 2^window - 1 multiples per window-bit digit
+        of the scalar that speeds up multiplication.
+        """
+        return ec_fixedbase.FixedBasePoint( self, window )
+
+    def free(self):
+        """
+        Frees the underlying EC_POINT if this point owns it.
+        The point cannot be used in arithmetic afterwards.
+        """
+        if self.__owns_point:
+            self.__owns_point = False
+            OpenSSL.EC_POINT_free( self.os_point )
+            self.os_point = None
+
+    def __del__(self):
+        self.free()
             
     def __eq__(self, other):
-        if type(other) is type(self):
+        if isinstance( other, Point ):
             return self.x == other.x and self.y == other.y
         return False
     def __ne__(self, other):
@@ -91,8 +215,8 @@ class Point:
         """
         if isinstance( other, Point ):
             result = OpenSSL.EC_POINT_new( self.os_group )
-            OpenSSL.EC_POINT_add( self.os_group, result, self.os_point, other.os_point, 0 )
-            return Point( self.curve, openssl_point=result )
+            OpenSSL.EC_POINT_add( self.os_group, result, self.os_point, other.os_point, ec_bignum.BigNumContext.get().ctx )
+            return Point( self.curve, openssl_point=result, owned=True )
         else:
             return NotImplemented
             
@@ -102,19 +226,178 @@ class Point:
         and returns the multiplication result
         """
         if isinstance( other, int ) or isinstance( other, long ):
+            if self is self.curve.G:
+                # The EC_METHOD may multiply the generator faster
+                return self.curve.mul_base( other )
             try:
                 o = ec_bignum.BigNum( decval=other )
                 result = OpenSSL.EC_POINT_new( self.os_group )
-                OpenSSL.EC_POINT_mul( self.os_group, result, 0, self.os_point, o.bn, 0 )
-                return Point( self.curve, openssl_point=result )
+                OpenSSL.EC_POINT_mul( self.os_group, result, 0, self.os_point, o.bn, ec_bignum.BigNumContext.get().ctx )
+                return Point( self.curve, openssl_point=result, owned=True )
             finally:
                 del o
         else:
             return NotImplemented
             
     __rmul__ = __mul__
+
+    def mul_public(self, k):
+        """
+        Returns k times the point, for scalars that are not secret,
+        such as those of a signature being verified. Points that are
+        multiplied often this way get a table of multiples from
+        fixedbase.cache. The table is walked in time depending on k,
+        so secret scalars (private keys, nonces) must use * instead.
+        """
+        fixed = ec_fixedbase.cache.lookup( self )
+        if fixed is not None:
+            return fixed * k
+        return self * k
             
     def __str__(self):
         return "Point<0x%X, 0x%X>" % ( self.x, self.y )
 
     __repr__ = __str__
+
+def in_field(curve, value):
+    """
+    Returns whether value is the canonical representation
+    of an element of the field of curve.
+    """
+    if curve.field_type == 'prime':
+        return 0 <= value < curve.p
+    return 0 <= value and value.bit_length() <= curve.m
+
+def is_valid_point(curve, os_point, order, tmp, ctx):
+    """
+    Returns whether the EC_POINT os_point is a point of the subgroup
+    of order curve.order other than the point at infinity. order is
+    a BigNum of curve.order and tmp an EC_POINT to compute in.
+    """
+    group = curve.os_group
+    if OpenSSL.EC_POINT_is_at_infinity( group, os_point ) == 1:
+        return False
+    if OpenSSL.EC_POINT_is_on_curve( group, os_point, ctx ) != 1:
+        return False
+    if curve.h != 1:
+        # Points of order dividing h are on the curve, but outside the subgroup
+        OpenSSL.EC_POINT_mul( group, tmp, 0, os_point, order.bn, ctx )
+        return OpenSSL.EC_POINT_is_at_infinity( group, tmp ) == 1
+    return True
+
+class PointAccumulator:
+    '''
+    A mutable running sum of points on a curve.
+
+    All additions go into one EC_POINT using one BN_CTX, so no
+    intermediate Point objects or affine conversions are made.
+    The sum is converted to affine coordinates only when it is
+    read through value().
+    '''
+
+    def __init__(self, curve, start=None):
+        '''
+        Constructor
+        '''
+        if not isinstance( curve, ec_curve.Curve ):
+            raise Exception( 'Provided curve is not a Curve object' )
+
+        self.curve = curve
+        self.os_group = curve.os_group
+        self.context = ec_bignum.BigNumContext()
+        self.os_point = OpenSSL.EC_POINT_new( self.os_group )
+        self.__tmp_point = OpenSSL.EC_POINT_new( self.os_group )
+        self.count = 0
+        if start is not None:
+            OpenSSL.EC_POINT_copy( self.os_point, start.os_point )
+        else:
+            OpenSSL.EC_POINT_set_to_infinity( self.os_group, self.os_point )
+
+    def add(self, point):
+        """
+        Adds a point to the sum in place.
+        """
+        OpenSSL.EC_POINT_add( self.os_group, self.os_point, self.os_point, point.os_point, self.context.ctx )
+        self.count += 1
+        return self
+
+    def add_many(self, points):
+        """
+        Adds every point of an iterable to the sum in place.
+        """
+        for point in points:
+            OpenSSL.EC_POINT_add( self.os_group, self.os_point, self.os_point, point.os_point, self.context.ctx )
+            self.count += 1
+        return self
+
+    def add_mul(self, k, point):
+        """
+        Adds k * point to the sum in place.
+        """
+        try:
+            o = ec_bignum.BigNum( decval=k )
+            OpenSSL.EC_POINT_mul( self.os_group, self.__tmp_point, 0, point.os_point, o.bn, self.context.ctx )
+            OpenSSL.EC_POINT_add( self.os_group, self.os_point, self.os_point, self.__tmp_point, self.context.ctx )
+            self.count += 1
+            return self
+        finally:
+            del o
+
+    def mul(self, k):
+        """
+        Multiplies the sum by the scalar k in place.
+        """
+        try:
+            o = ec_bignum.BigNum( decval=k )
+            OpenSSL.EC_POINT_mul( self.os_group, self.__tmp_point, 0, self.os_point, o.bn, self.context.ctx )
+            self.os_point, self.__tmp_point = self.__tmp_point, self.os_point
+            return self
+        finally:
+            del o
+
+    def __iadd__(self, other):
+        if isinstance( other, Point ):
+            return self.add( other )
+        return NotImplemented
+
+    def __imul__(self, other):
+        if isinstance( other, int ) or isinstance( other, long ):
+            return self.mul( other )
+        return NotImplemented
+
+    def is_infinity(self):
+        return OpenSSL.EC_POINT_is_at_infinity( self.os_group, self.os_point ) == 1
+
+    def value(self):
+        """
+        Returns the current sum as a new Point.
+        """
+        return Point( self.curve, openssl_point=OpenSSL.EC_POINT_dup( self.os_point, self.os_group ), owned=True )
+
+    def reset(self):
+        """
+        Sets the sum back to the point at infinity.
+        """
+        OpenSSL.EC_POINT_set_to_infinity( self.os_group, self.os_point )
+        self.count = 0
+
+    def free(self):
+        """
+        Frees the underlying EC_POINTs.
+        """
+        if self.os_point is not None:
+            OpenSSL.EC_POINT_free( self.os_point )
+            OpenSSL.EC_POINT_free( self.__tmp_point )
+            self.os_point = self.__tmp_point = None
+
+    def __del__(self):
+        if hasattr( self, 'os_point' ):
+            self.free()
+
+    def __str__(self):
+        return "PointAccumulator<%d terms>" % self.count
+
+    __repr__ = __str__
+
+# Imported last, as FixedBasePoint subclasses Point
+import fixedbase as ec_fixedbase
@@ -0,0 +1,323 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import ctypes
+import mmap
+import os
+import tempfile
+import threading
+
+from pyelliptic import openssl
+from pyelliptic.openssl import OpenSSL
+import curve as ec_curve
+import point as ec_point
+import bignum as ec_bignum
+import executor as ec_executor
+
+class PointArray:
+    '''
+    A sequence of points on one curve, stored as fixed-width
+    encodings (see Point.to_bytes) in one contiguous buffer.
+
+    A compressed secp256k1 point takes 33 bytes, compared to several
+    hundred for a Point object and its native EC_POINT. Slices share
+    the buffer of the array they were taken from, and the vectorized
+    operations decode and encode straight from and to the buffer
+    without creating Point objects.
+
+    Arrays are pickled with their encoded points, except for arrays
+    returned by share() and slices of them, which are pickled as the
+    name of their file, so that other processes map the same memory.
+    '''
+
+    def __init__(self, curve, buf, compressed=True):
+        '''
+        Constructor
+
+        buf may be anything supporting the buffer protocol, e.g. a
+        bytearray, an mmap or a str. It is not copied.
+        '''
+        if not isinstance( curve, ec_curve.Curve ):
+            raise Exception( 'Provided curve is not a Curve object' )
+
+        self.curve = curve
+        self.os_group = curve.os_group
+        self.compressed = compressed
+        self.width = curve.point_size( compressed )
+        self.buffer = memoryview( buf )
+        if len( self.buffer ) % self.width != 0:
+            raise Exception( 'Buffer length is not a multiple of %d' % self.width )
+        self.__os_points = None
+        # ( path, first record ) if the buffer is a shared mapping
+        self.shared = None
+
+    def __getstate__(self):
+        state = { 'curve': self.curve, 'compressed': self.compressed }
+        if self.shared is not None:
+            state['shared'] = self.shared + ( len( self ), )
+        else:
+            state['data'] = self.to_bytes()
+        return state
+
+    def __setstate__(self, state):
+        if 'shared' in state:
+            path, start, count = state['shared']
+            width = state['curve'].point_size( state['compressed'] )
+            self.__init__( state['curve'], _map_shared( path )[start*width:(start+count)*width], state['compressed'] )
+            self.shared = ( path, start )
+        else:
+            self.__init__( state['curve'], bytearray( state['data'] ), state['compressed'] )
+
+    def share(self, path=None):
+        """
+        Returns a copy of the array in a file mapped into memory as
+        shared, by default a new file in /dev/shm. The copy and its
+        slices can be sent to other processes, e.g. multiprocessing
+        workers, which map the file instead of copying the points,
+        and see each other's writes to the array.
+
+        The file is kept until unlink() is called.
+        """
+        if len( self ) == 0:
+            raise Exception( 'Cannot share an empty array' )
+        if path is None:
+            fd, path = tempfile.mkstemp( prefix="pyec-", suffix=".points",
+                                         dir="/dev/shm" if os.path.isdir( "/dev/shm" ) else None )
+            os.close( fd )
+        with open( path, "wb" ) as f:
+            f.write( self.to_bytes() )
+        array = PointArray( self.curve, _map_shared( path ), self.compressed )
+        array.shared = ( path, 0 )
+        return array
+
+    def unlink(self):
+        """
+        Removes the file of an array returned by share(). Processes
+        that have already mapped it can still use the array.
+        """
+        if self.shared is not None:
+            path = self.shared[0]
+            with _shared_lock:
+                _shared.pop( path, None )
+            if os.path.exists( path ):
+                os.unlink( path )
+
+    @staticmethod
+    def from_points(curve, points, compressed=True):
+        """
+        Encodes a sequence of points into a new array.
+        """
+        return PointArray( curve, bytearray( "".join( [ p.to_bytes( compressed ) for p in points ] ) ), compressed )
+
+    @staticmethod
+    def from_bytes(curve, data, compressed=True):
+        """
+        Returns an array over encoded points, without copying them.
+        """
+        return PointArray( curve, data, compressed )
+
+    @staticmethod
+    def zeros(curve, count, compressed=True):
+        """
+        Returns a new array of count points at infinity.
+        """
+        return PointArray( curve, bytearray( count * curve.point_size( compressed ) ), compressed )
+
+    def to_bytes(self):
+        return self.buffer.tobytes()
+
+    def record(self, i):
+        """
+        Returns the encoding of the i'th point.
+        """
+        return self.buffer[i*self.width:(i+1)*self.width].tobytes()
+
+    def __len__(self):
+        return len( self.buffer ) // self.width
+
+    def __getitem__(self, index):
+        if isinstance( index, slice ):
+            start, stop, step = index.indices( len( self ) )
+            if step == 1:
+                array = PointArray( self.curve, self.buffer[start*self.width:max( start, stop )*self.width], self.compressed )
+                if self.shared is not None:
+                    array.shared = ( self.shared[0], self.shared[1] + start )
+                return array
+            return PointArray.from_bytes( self.curve, bytearray( "".join( [ self.record( i ) for i in range( start, stop, step ) ] ) ), self.compressed )
+        if index < 0:
+            index += len( self )
+        if not 0 <= index < len( self ):
+            raise IndexError( 'PointArray index out of range' )
+        return ec_point.Point.from_bytes( self.curve, self.record( index ) )
+
+    def __iter__(self):
+        for i in range( len( self ) ):
+            yield self[i]
+
+    def os_points(self):
+        """
+        Returns a ctypes array with an EC_POINT for each point,
+        decoded on first call and kept until the array is freed.
+        """
+        if self.__os_points is None:
+            n = len( self )
+            ctx = ec_bignum.BigNumContext.get().ctx
+            os_points = ( ctypes.c_void_p * n )()
+            for i in range( n ):
+                os_points[i] = OpenSSL.EC_POINT_new( self.os_group )
+                self.__decode( self.record( i ), os_points[i], ctx )
+            self.__os_points = os_points
+        return self.__os_points
+
+    def mul(self, scalars, workers=None):
+        """
+        Multiplies every point by the matching scalar (or all of them
+        by one scalar) and returns the products as a new array.
+        """
+        if isinstance( scalars, int ) or isinstance( scalars, long ):
+            scalars = [ scalars ] * len( self )
+        elif len( scalars ) != len( self ):
+            raise Exception( 'Expected %d scalars, got %d' % ( len( self ), len( scalars ) ) )
+        return self.__map( self.__mul_range, scalars, workers )
+
+    def add(self, other, workers=None):
+        """
+        Adds the points of another array of the same length (or one
+        Point to all of them) and returns the sums as a new array.
+        """
+        if isinstance( other, ec_point.Point ):
+            other = [ other.to_bytes( self.compressed ) ] * len( self )
+        elif len( other ) != len( self ):
+            raise Exception( 'Expected %d points, got %d' % ( len( self ), len( other ) ) )
+        else:
+            other = [ other.record( i ) for i in range( len( other ) ) ]
+        return self.__map( self.__add_range, other, workers )
+
+    def eq_mask(self, other):
+        """
+        Returns a list of booleans telling which points are equal to
+        the matching point of another array (or to one Point).
+        """
+        if isinstance( other, ec_point.Point ):
+            record = other.to_bytes( self.compressed )
+            return [ self.record( i ) == record for i in range( len( self ) ) ]
+        if len( other ) != len( self ):
+            raise Exception( 'Expected %d points, got %d' % ( len( self ), len( other ) ) )
+        if other.compressed != self.compressed:
+            return [ p == q for p, q in zip( self, other ) ]
+        return [ self.record( i ) == other.record( i ) for i in range( len( self ) ) ]
+
+    def __map(self, fn, operands, workers):
+        n = len( self )
+        buf = bytearray( n * self.width )
+        out = ( ctypes.c_char * len( buf ) ).from_buffer( buf )
+        address = ctypes.addressof( out )
+        if workers is None or workers <= 1 or n < 2:
+            fn( address, 0, n, operands )
+        else:
+            step = ( n + workers - 1 ) // workers
+            ranges = [ ( i, min( n, i + step ) ) for i in range( 0, n, step ) ]
+            ec_executor.get_executor( workers ).map(
+                lambda r: fn( address, r[0], r[1], operands ), ranges, chunksize=1 )
+        return PointArray( self.curve, buf, self.compressed )
+
+    def __mul_range(self, out, start, stop, scalars):
+        ctx = ec_bignum.BigNumContext.get().ctx
+        form = self.__form()
+        point = OpenSSL.EC_POINT_new( self.os_group )
+        product = OpenSSL.EC_POINT_new( self.os_group )
+        try:
+            for i in range( start, stop ):
+                self.__decode( self.record( i ), point, ctx )
+                k = ec_bignum.BigNum( decval=scalars[i] )
+                OpenSSL.EC_POINT_mul( self.os_group, product, 0, point, k.bn, ctx )
+                self.__encode( product, form, out + i * self.width, ctx )
+        finally:
+            OpenSSL.EC_POINT_free( point )
+            OpenSSL.EC_POINT_free( product )
+
+    def __add_range(self, out, start, stop, records):
+        ctx = ec_bignum.BigNumContext.get().ctx
+        form = self.__form()
+        point = OpenSSL.EC_POINT_new( self.os_group )
+        other = OpenSSL.EC_POINT_new( self.os_group )
+        try:
+            for i in range( start, stop ):
+                self.__decode( self.record( i ), point, ctx )
+                self.__decode( records[i], other, ctx )
+                OpenSSL.EC_POINT_add( self.os_group, point, point, other, ctx )
+                self.__encode( point, form, out + i * self.width, ctx )
+        finally:
+            OpenSSL.EC_POINT_free( point )
+            OpenSSL.EC_POINT_free( other )
+
+    def __form(self):
+        if self.compressed:
+            return openssl.POINT_CONVERSION_COMPRESSED
+        return openssl.POINT_CONVERSION_UNCOMPRESSED
+
+    def __decode(self, record, os_point, ctx):
+        if record[:1] == '\x00':
+            record = record[:1]
+        if OpenSSL.EC_POINT_oct2point( self.os_group, os_point, record, len( record ), ctx ) != 1:
+            raise Exception( 'Invalid point encoding' )
+
+    def __encode(self, os_point, form, address, ctx):
+        OpenSSL.EC_POINT_point2oct( self.os_group, os_point, form, address, self.width, ctx )
+
+    def free(self):
+        """
+        Frees the EC_POINTs made by os_points.
+        """
+        if self.__os_points is not None:
+            for os_point in self.__os_points:
+                OpenSSL.EC_POINT_free( os_point )
+            self.__os_points = None
+
+    def __del__(self):
+        if hasattr( self, 'buffer' ):
+            self.free()
+
+    def __str__(self):
+        return "PointArray<%d points, %d bytes each>" % ( len( self ), self.width )
+
+    __repr__ = __str__
+
+# Shared mappings by path, each mapped once per process
+_shared = {}
+_shared_lock = threading.Lock()
+
+def _map_shared(path):
+    """
+    Maps the file in path as shared and writable, and returns
+    a memoryview of it.
+    """
+    with _shared_lock:
+        if path not in _shared:
+            with open( path, "r+b" ) as f:
+                mapped = mmap.mmap( f.fileno(), 0 )
+            # Python 2 mmaps only have the old buffer interface, so
+            # view them through a ctypes array to keep them writable
+            _shared[path] = memoryview( ( ctypes.c_char * len( mapped ) ).from_buffer( mapped ) )
+        return _shared[path]
@@ -0,0 +1,138 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Files holding FixedBasePoint tables, so that worker processes can
+map a table from disk instead of computing it.
+
+A file consists of a fixed-size header followed by the base point
+and the table entries, all uncompressed SEC 1 point encodings of
+the same width:
+
+    magic             8 bytes   "PYECTBL\\0"
+    version           2 bytes
+    window            2 bytes
+    point width       2 bytes
+    rows              4 bytes
+    columns           4 bytes
+    curve digest     32 bytes   Curve.parameters_digest()
+    base point        width bytes
+    entries           rows * columns * width bytes, row by row
+
+Integers are big-endian. Files are opened with a read-only mmap, so
+all processes using the same file share its pages.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+
+import point as ec_point
+import fixedbase as ec_fixedbase
+
+MAGIC = "PYECTBL\0"
+VERSION = 1
+HEADER = struct.Struct( ">8sHHHII32s" )
+
+def save(fixed, path):
+    """
+    Writes the table of a FixedBasePoint to path. The file is
+    written under a temporary name and renamed into place, so
+    readers never see a partial file.
+    """
+    width = fixed.curve.point_size( False )
+    directory = os.path.dirname( os.path.abspath( path ) )
+    fd, tmp_path = tempfile.mkstemp( dir=directory, prefix=".precomp-" )
+    try:
+        with os.fdopen( fd, "wb" ) as f:
+            f.write( HEADER.pack( MAGIC, VERSION, fixed.window, width, fixed.rows, fixed.columns,
+                                  fixed.curve.parameters_digest() ) )
+            f.write( fixed.to_bytes( False ) )
+            for record in fixed.table_records():
+                f.write( record )
+        os.rename( tmp_path, path )
+    except:
+        os.unlink( tmp_path )
+        raise
+
+def load(curve, path, point=None):
+    """
+    Maps the table in path and returns its FixedBasePoint.
+
+    Raises an exception if the file was not written by this
+    version, is for another curve, or (if point is given) is
+    not a table for point.
+    """
+    with open( path, "rb" ) as f:
+        mapped = mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ )
+    try:
+        magic, version, window, width, rows, columns, digest = HEADER.unpack_from( mapped, 0 )
+        if magic != MAGIC:
+            raise Exception( '%s is not a precomputation table' % path )
+        if version != VERSION:
+            raise Exception( '%s has table version %d, expected %d' % ( path, version, VERSION ) )
+        if digest != curve.parameters_digest() or width != curve.point_size( False ):
+            raise Exception( '%s was computed for different curve parameters' % path )
+        if len( mapped ) != HEADER.size + ( 1 + rows * columns ) * width:
+            raise Exception( '%s has the wrong size' % path )
+
+        base = ec_point.Point.from_bytes( curve, mapped[HEADER.size:HEADER.size + width] )
+        if point is not None and base != point:
+            raise Exception( '%s is a table for another point' % path )
+
+        try:
+            source = memoryview( mapped )[HEADER.size + width:]
+        except TypeError:
+            # Python 2 mmaps only have the old buffer interface
+            source = memoryview( buffer( mapped, HEADER.size + width ) )
+        fixed = ec_fixedbase.FixedBasePoint( base, window, source=source )
+        if fixed.rows != rows or fixed.columns != columns:
+            raise Exception( '%s has an unexpected table shape' % path )
+        # Keep the mapping open for as long as the table is used
+        fixed.mapping = mapped
+        return fixed
+    except:
+        mapped.close()
+        raise
+
+def load_or_build(curve, path, point=None, window=4, cache=True):
+    """
+    Loads the table for point (default: G) from path, computing
+    and saving it first if the file is missing or stale. If cache
+    is True, the table is added to fixedbase.cache, so that
+    Point.mul_public of the point uses it.
+    """
+    if point is None:
+        point = curve.G
+    try:
+        fixed = load( curve, path, point )
+        if fixed.window != window:
+            raise Exception( '%s has window %d, expected %d' % ( path, fixed.window, window ) )
+    except Exception:
+        save( ec_fixedbase.FixedBasePoint( point, window ), path )
+        fixed = load( curve, path, point )
+    if cache:
+        ec_fixedbase.cache.add( fixed )
+    return fixed
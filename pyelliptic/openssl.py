@@ -10,12 +10,38 @@
 #  * Added EC_GROUP_get0_generator, EC_GROUP_get_order,
 #          EC_GROUP_new_by_curve_name, EC_POINT_add, 
 #          i2d_ECPKParameters, EC_POINT_set_affine_coordinates_GF2m,
-#          EC_KEY_new
-
+#          EC_KEY_new, EC_POINT_dup, EC_POINT_copy,
+#          EC_POINT_set_to_infinity, EC_POINT_is_at_infinity,
+#          EC_POINT_point2oct, EC_POINT_oct2point,
+#          EC_POINT_get_affine_coordinates_GF2m, EC_POINTs_make_affine,
+#          EC_POINTs_mul, EC_GROUP_dup, EC_GROUP_free, EC_GROUP_set_asn1_flag
+#  * The library is loaded and symbols are bound on first use
+
+import os
 import sys
 import ctypes
+import threading
+
+
+POINT_CONVERSION_COMPRESSED = 2
+POINT_CONVERSION_UNCOMPRESSED = 4
+
+OPENSSL_EC_EXPLICIT_CURVE = 0
+OPENSSL_EC_NAMED_CURVE = 1
+
+# SEC 2 names of curves OpenSSL knows by their X9.62 names
+CURVE_ALIASES = {
+    'secp192r1': 'prime192v1',
+    'secp256r1': 'prime256v1',
+}
 
-OpenSSL = None
+# EVP_PKEY_fromdata selections
+EVP_PKEY_PUBLIC_KEY = 0x86
+EVP_PKEY_KEYPAIR = 0x87
+
+
+class BuiltinCurve(ctypes.Structure):
+    _fields_ = [('nid', ctypes.c_int), ('comment', ctypes.c_char_p)]
 
 
 class CipherName:
@@ -37,357 +63,316 @@ class CipherName:
         return self._blocksize
 
 
+# Signatures of the functions used, bound on first use:
+# name -> ( restype, argtypes[, alternative symbol names] )
+_p = ctypes.c_void_p
+_int = ctypes.c_int
+_size = ctypes.c_size_t
+_ulong = ctypes.c_ulong
+_str = ctypes.c_char_p
+SIGNATURES = {
+    'OpenSSL_version_num': ( _ulong, [], 'SSLeay' ),
+    'OBJ_nid2sn': ( _str, [_int] ),
+
+    'BN_new': ( _p, [] ),
+    'BN_free': ( None, [_p] ),
+    'BN_num_bits': ( _int, [_p] ),
+    'BN_bn2bin': ( _int, [_p, _p] ),
+    'BN_bin2bn': ( _p, [_p, _int, _p] ),
+    'BN_CTX_new': ( _p, [] ),
+    'BN_CTX_free': ( None, [_p] ),
+
+    'EC_GROUP_new_by_curve_name': ( _p, [_int] ),
+    'EC_GROUP_dup': ( _p, [_p] ),
+    'EC_GROUP_free': ( None, [_p] ),
+    'EC_GROUP_get0_generator': ( _p, [_p] ),
+    'EC_GROUP_get_curve_name': ( _int, [_p] ),
+    'EC_GROUP_get_order': ( _int, [_p, _p, _p] ),
+    'EC_GROUP_set_asn1_flag': ( None, [_p, _int] ),
+    'EC_GROUP_check_named_curve': ( _int, [_p, _int, _p] ),
+    'EC_GROUP_method_of': ( _p, [_p] ),
+    'EC_get_builtin_curves': ( _size, [_p, _size] ),
+    'EC_curve_nid2nist': ( _str, [_int] ),
+
+    'EC_GFp_simple_method': ( _p, [] ),
+    'EC_GFp_mont_method': ( _p, [] ),
+    'EC_GFp_nist_method': ( _p, [] ),
+    'EC_GFp_nistp224_method': ( _p, [] ),
+    'EC_GFp_nistp256_method': ( _p, [] ),
+    'EC_GFp_nistp521_method': ( _p, [] ),
+    'EC_GF2m_simple_method': ( _p, [] ),
+
+    'EC_KEY_new': ( _p, [] ),
+    'EC_KEY_new_by_curve_name': ( _p, [_int] ),
+    'EC_KEY_free': ( None, [_p] ),
+    'EC_KEY_generate_key': ( _int, [_p] ),
+    'EC_KEY_check_key': ( _int, [_p] ),
+    'EC_KEY_get0_private_key': ( _p, [_p] ),
+    'EC_KEY_get0_public_key': ( _p, [_p] ),
+    'EC_KEY_get0_group': ( _p, [_p] ),
+    'EC_KEY_set_private_key': ( _int, [_p, _p] ),
+    'EC_KEY_set_public_key': ( _int, [_p, _p] ),
+    'EC_KEY_set_group': ( _int, [_p, _p] ),
+
+    'EC_POINT_new': ( _p, [_p] ),
+    'EC_POINT_free': ( None, [_p] ),
+    'EC_POINT_dup': ( _p, [_p, _p] ),
+    'EC_POINT_copy': ( _int, [_p, _p] ),
+    'EC_POINT_set_to_infinity': ( _int, [_p, _p] ),
+    'EC_POINT_is_at_infinity': ( _int, [_p, _p] ),
+    'EC_POINT_is_on_curve': ( _int, [_p, _p, _p] ),
+    'EC_POINT_get_affine_coordinates_GFp': ( _int, [_p, _p, _p, _p, _p] ),
+    'EC_POINT_get_affine_coordinates_GF2m': ( _int, [_p, _p, _p, _p, _p] ),
+    'EC_POINT_set_affine_coordinates_GFp': ( _int, [_p, _p, _p, _p, _p] ),
+    'EC_POINT_set_affine_coordinates_GF2m': ( _int, [_p, _p, _p, _p, _p] ),
+    'EC_POINT_set_Jprojective_coordinates_GFp': ( _int, [_p, _p, _p, _p, _p, _p] ),
+    'EC_POINT_point2oct': ( _size, [_p, _p, _int, _p, _size, _p] ),
+    'EC_POINT_oct2point': ( _int, [_p, _p, _p, _size, _p] ),
+    'EC_POINT_add': ( _int, [_p, _p, _p, _p, _p] ),
+    'EC_POINT_mul': ( _int, [_p, _p, _p, _p, _p, _p] ),
+    'EC_POINTs_make_affine': ( _int, [_p, _size, _p, _p] ),
+    'EC_POINTs_mul': ( _int, [_p, _p, _p, _size, _p, _p, _p] ),
+
+    'ECDH_OpenSSL': ( _p, [] ),
+    'ECDH_set_method': ( _int, [_p, _p] ),
+    'ECDH_compute_key': ( _int, [_p, _int, _p, _p] ),
+    'ECDSA_sign': ( _int, [_int, _p, _int, _p, _p, _p] ),
+    'ECDSA_verify': ( _int, [_int, _p, _int, _p, _int, _p] ),
+    'ECDSA_size': ( _int, [_p] ),
+    'i2o_ECPublicKey': ( _int, [_p, _p] ),
+    'i2d_ECPKParameters': ( _int, [_p, _p] ),
+
+    'EVP_CipherInit_ex': ( _int, [_p, _p, _p] ),
+    'EVP_CIPHER_CTX_new': ( _p, [] ),
+    'EVP_CIPHER_CTX_cleanup': ( _int, [_p], 'EVP_CIPHER_CTX_reset' ),
+    'EVP_CIPHER_CTX_free': ( None, [_p] ),
+    'EVP_CipherUpdate': ( _int, [_p, _p, _p, _p, _int] ),
+    'EVP_CipherFinal_ex': ( _int, [_p, _p, _p] ),
+    'EVP_aes_128_cfb128': ( _p, [] ),
+    'EVP_aes_256_cfb128': ( _p, [] ),
+    'EVP_aes_128_cbc': ( _p, [] ),
+    'EVP_aes_256_cbc': ( _p, [] ),
+    'EVP_aes_128_ofb': ( _p, [] ),
+    'EVP_aes_256_ofb': ( _p, [] ),
+    'EVP_bf_cbc': ( _p, [] ),
+    'EVP_bf_cfb64': ( _p, [] ),
+    'EVP_rc4': ( _p, [] ),
+
+    'EVP_MD_CTX_create': ( _p, [], 'EVP_MD_CTX_new' ),
+    'EVP_MD_CTX_init': ( None, [_p] ),
+    'EVP_MD_CTX_destroy': ( None, [_p], 'EVP_MD_CTX_free' ),
+    'EVP_DigestInit': ( _int, [_p, _p] ),
+    'EVP_DigestUpdate': ( _int, [_p, _p, _int] ),
+    'EVP_DigestFinal': ( _int, [_p, _p, _p] ),
+    'EVP_ecdsa': ( _p, [] ),
+    'EVP_sha256': ( _p, [] ),
+    'EVP_sha512': ( _p, [] ),
+
+    # OpenSSL 3 key management, see the backend module
+    'EVP_PKEY_free': ( None, [_p] ),
+    'EVP_PKEY_CTX_new': ( _p, [_p, _p] ),
+    'EVP_PKEY_CTX_new_from_name': ( _p, [_p, _p, _p] ),
+    'EVP_PKEY_CTX_free': ( None, [_p] ),
+    'EVP_PKEY_CTX_set_group_name': ( _int, [_p, _p] ),
+    'EVP_PKEY_keygen_init': ( _int, [_p] ),
+    'EVP_PKEY_generate': ( _int, [_p, _p], 'EVP_PKEY_keygen' ),
+    'EVP_PKEY_get_bn_param': ( _int, [_p, _p, _p] ),
+    'EVP_PKEY_get_octet_string_param': ( _int, [_p, _p, _p, _size, _p] ),
+    'EVP_PKEY_fromdata_init': ( _int, [_p] ),
+    'EVP_PKEY_fromdata': ( _int, [_p, _p, _int, _p] ),
+    'EVP_PKEY_derive_init': ( _int, [_p] ),
+    'EVP_PKEY_derive_set_peer_ex': ( _int, [_p, _p, _int] ),
+    'EVP_PKEY_derive': ( _int, [_p, _p, _p] ),
+    'EVP_PKEY_sign_init': ( _int, [_p] ),
+    'EVP_PKEY_sign': ( _int, [_p, _p, _p, _p, _size] ),
+    'EVP_PKEY_verify_init': ( _int, [_p] ),
+    'EVP_PKEY_verify': ( _int, [_p, _p, _size, _p, _size] ),
+    'OSSL_PARAM_BLD_new': ( _p, [] ),
+    'OSSL_PARAM_BLD_free': ( None, [_p] ),
+    'OSSL_PARAM_BLD_push_utf8_string': ( _int, [_p, _p, _p, _size] ),
+    'OSSL_PARAM_BLD_push_BN': ( _int, [_p, _p, _p] ),
+    'OSSL_PARAM_BLD_push_octet_string': ( _int, [_p, _p, _p, _size] ),
+    'OSSL_PARAM_BLD_to_param': ( _p, [_p] ),
+    'OSSL_PARAM_free': ( None, [_p] ),
+    'HMAC': ( _p, [_p, _p, _int, _p, _int, _p, _p] ),
+    # PKCS5_PBKDF2_HMAC is not available in all versions of OSX
+    'PKCS5_PBKDF2_HMAC': ( _int, [_p, _int, _p, _int, _int, _p, _int, _p], 'PKCS5_PBKDF2_HMAC_SHA1' ),
+
+    'RAND_bytes': ( _int, [_p, _int] ),
+    'RAND_poll': ( _int, [] ),
+}
+del _p, _int, _size, _ulong, _str
+
+
+def library_candidates():
+    """
+    returns the library names tried, in order, when none is given:
+    the PYEC_OPENSSL_LIB environment variable if set, otherwise the
+    usual names on Linux, Windows and OSX
+    """
+    if os.environ.get('PYEC_OPENSSL_LIB'):
+        return [os.environ['PYEC_OPENSSL_LIB']]
+    candidates = ['libcrypto.so', 'libcrypto.so.3', 'libcrypto.so.1.1', 'libcrypto.so.1.0.0',
+                  'libeay32.dll', 'libcrypto.dylib',
+                  # homebrew installation
+                  '/usr/local/opt/openssl/lib/libcrypto.dylib',
+                  # from an Bitmessage.app on OSX
+                  './../Frameworks/libcrypto.dylib']
+    if hasattr(sys, '_MEIPASS'):
+        candidates.append(os.path.join(sys._MEIPASS, 'libeay32.dll'))
+    if 'linux' in sys.platform or 'darwin' in sys.platform or 'freebsd' in sys.platform:
+        from ctypes.util import find_library
+        candidates.extend(name for name in (find_library('crypto'), find_library('ssl')) if name)
+    return candidates
+
+_library_cache = {}
+
+def find_library(candidates=None):
+    """
+    returns the name of the first candidate library that loads and
+    exports the EC functions, caching the result for the process
+    """
+    candidates = tuple(candidates or library_candidates())
+    if candidates not in _library_cache:
+        for name in candidates:
+            try:
+                lib = ctypes.CDLL(name)
+                lib.EC_GROUP_new_by_curve_name
+            except (OSError, AttributeError):
+                continue
+            _library_cache[candidates] = name
+            break
+        else:
+            raise Exception("Couldn't find and load the OpenSSL library (tried %s). You must install it, "
+                            "or set PYEC_OPENSSL_LIB to its path." % ", ".join(candidates))
+    return _library_cache[candidates]
+
+
 class _OpenSSL:
     """
     Wrapper for OpenSSL using ctypes
+
+    The library is only loaded when the first function is used, and
+    each function is bound (looked up, with its restype and argtypes
+    set from SIGNATURES) the first time it is accessed. Functions
+    missing from the loaded version only fail when they are used.
+    The table of curves is likewise built when first used.
     """
-    def __init__(self, library):
+    def __init__(self, library=None):
         """
-        Build the wrapper
+        Build the wrapper; library is the name or path of the
+        library to load, found with find_library if None
         """
-        self._lib = ctypes.CDLL(library)
+        self._library = library
+        self._load_lock = threading.Lock()
+        self.library = None
 
         self.pointer = ctypes.pointer
         self.c_int = ctypes.c_int
         self.byref = ctypes.byref
         self.create_string_buffer = ctypes.create_string_buffer
 
-        self.BN_new = self._lib.BN_new
-        self.BN_new.restype = ctypes.c_void_p
-        self.BN_new.argtypes = []
-
-        self.BN_free = self._lib.BN_free
-        self.BN_free.restype = None
-        self.BN_free.argtypes = [ctypes.c_void_p]
-
-        self.BN_num_bits = self._lib.BN_num_bits
-        self.BN_num_bits.restype = ctypes.c_int
-        self.BN_num_bits.argtypes = [ctypes.c_void_p]
-
-        self.BN_bn2bin = self._lib.BN_bn2bin
-        self.BN_bn2bin.restype = ctypes.c_int
-        self.BN_bn2bin.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
-
-        self.BN_bin2bn = self._lib.BN_bin2bn
-        self.BN_bin2bn.restype = ctypes.c_void_p
-        self.BN_bin2bn.argtypes = [ctypes.c_void_p, ctypes.c_int,
-                                   ctypes.c_void_p]
-
-        self.EC_GROUP_get0_generator = self._lib.EC_GROUP_get0_generator
-        self.EC_GROUP_get0_generator.restype = ctypes.c_int
-        self.EC_GROUP_get0_generator.argtypes = [ctypes.c_void_p]
-
-        self.EC_GROUP_get_order = self._lib.EC_GROUP_get_order
-        self.EC_GROUP_get_order.restype = ctypes.c_int
-        self.EC_GROUP_get_order.argtypes = [ctypes.c_void_p, ctypes.c_void_p,
-                                            ctypes.c_void_p]
-
-        self.EC_GROUP_new_by_curve_name = self._lib.EC_GROUP_new_by_curve_name
-        self.EC_GROUP_new_by_curve_name.restype = ctypes.c_void_p
-        self.EC_GROUP_new_by_curve_name.argtypes = [ctypes.c_int]
+        self._set_ciphers()
 
-        self.EC_KEY_free = self._lib.EC_KEY_free
-        self.EC_KEY_free.restype = None
-        self.EC_KEY_free.argtypes = [ctypes.c_void_p]
-
-        self.EC_KEY_new = self._lib.EC_KEY_new
-        self.EC_KEY_new.restype = ctypes.c_void_p
-        self.EC_KEY_new.argtypes = []
-
-        self.EC_KEY_new_by_curve_name = self._lib.EC_KEY_new_by_curve_name
-        self.EC_KEY_new_by_curve_name.restype = ctypes.c_void_p
-        self.EC_KEY_new_by_curve_name.argtypes = [ctypes.c_int]
-
-        self.EC_KEY_generate_key = self._lib.EC_KEY_generate_key
-        self.EC_KEY_generate_key.restype = ctypes.c_int
-        self.EC_KEY_generate_key.argtypes = [ctypes.c_void_p]
-
-        self.EC_KEY_check_key = self._lib.EC_KEY_check_key
-        self.EC_KEY_check_key.restype = ctypes.c_int
-        self.EC_KEY_check_key.argtypes = [ctypes.c_void_p]
-
-        self.EC_KEY_get0_private_key = self._lib.EC_KEY_get0_private_key
-        self.EC_KEY_get0_private_key.restype = ctypes.c_void_p
-        self.EC_KEY_get0_private_key.argtypes = [ctypes.c_void_p]
-
-        self.EC_KEY_get0_public_key = self._lib.EC_KEY_get0_public_key
-        self.EC_KEY_get0_public_key.restype = ctypes.c_void_p
-        self.EC_KEY_get0_public_key.argtypes = [ctypes.c_void_p]
-
-        self.EC_KEY_get0_group = self._lib.EC_KEY_get0_group
-        self.EC_KEY_get0_group.restype = ctypes.c_void_p
-        self.EC_KEY_get0_group.argtypes = [ctypes.c_void_p]
-
-        self.EC_POINT_get_affine_coordinates_GFp = self._lib.EC_POINT_get_affine_coordinates_GFp
-        self.EC_POINT_get_affine_coordinates_GFp.restype = ctypes.c_int
-        self.EC_POINT_get_affine_coordinates_GFp.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EC_KEY_set_private_key = self._lib.EC_KEY_set_private_key
-        self.EC_KEY_set_private_key.restype = ctypes.c_int
-        self.EC_KEY_set_private_key.argtypes = [ctypes.c_void_p,
-                                                ctypes.c_void_p]
-
-        self.EC_KEY_set_public_key = self._lib.EC_KEY_set_public_key
-        self.EC_KEY_set_public_key.restype = ctypes.c_int
-        self.EC_KEY_set_public_key.argtypes = [ctypes.c_void_p,
-                                               ctypes.c_void_p]
-
-        self.EC_KEY_set_group = self._lib.EC_KEY_set_group
-        self.EC_KEY_set_group.restype = ctypes.c_int
-        self.EC_KEY_set_group.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EC_POINT_set_affine_coordinates_GFp = self._lib.EC_POINT_set_affine_coordinates_GFp
-        self.EC_POINT_set_affine_coordinates_GFp.restype = ctypes.c_int
-        self.EC_POINT_set_affine_coordinates_GFp.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EC_POINT_set_affine_coordinates_GF2m = self._lib.EC_POINT_set_affine_coordinates_GF2m
-        self.EC_POINT_set_affine_coordinates_GF2m.restype = ctypes.c_int
-        self.EC_POINT_set_affine_coordinates_GF2m.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EC_POINT_new = self._lib.EC_POINT_new
-        self.EC_POINT_new.restype = ctypes.c_void_p
-        self.EC_POINT_new.argtypes = [ctypes.c_void_p]
-
-        self.EC_POINT_free = self._lib.EC_POINT_free
-        self.EC_POINT_free.restype = None
-        self.EC_POINT_free.argtypes = [ctypes.c_void_p]
-
-        self.BN_CTX_free = self._lib.BN_CTX_free
-        self.BN_CTX_free.restype = None
-        self.BN_CTX_free.argtypes = [ctypes.c_void_p]
-
-        self.EC_POINT_mul = self._lib.EC_POINT_mul
-        self.EC_POINT_mul.restype = None
-        self.EC_POINT_mul.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EC_POINT_add = self._lib.EC_POINT_add
-        self.EC_POINT_add.resType = None
-        self.EC_POINT_add.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EC_KEY_set_private_key = self._lib.EC_KEY_set_private_key
-        self.EC_KEY_set_private_key.restype = ctypes.c_int
-        self.EC_KEY_set_private_key.argtypes = [ctypes.c_void_p,
-                                                ctypes.c_void_p]
-
-        self.ECDH_OpenSSL = self._lib.ECDH_OpenSSL
-        self._lib.ECDH_OpenSSL.restype = ctypes.c_void_p
-        self._lib.ECDH_OpenSSL.argtypes = []
-
-        self.BN_CTX_new = self._lib.BN_CTX_new
-        self._lib.BN_CTX_new.restype = ctypes.c_void_p
-        self._lib.BN_CTX_new.argtypes = []
-
-        self.ECDH_set_method = self._lib.ECDH_set_method
-        self._lib.ECDH_set_method.restype = ctypes.c_int
-        self._lib.ECDH_set_method.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
-
-        self.ECDH_compute_key = self._lib.ECDH_compute_key
-        self.ECDH_compute_key.restype = ctypes.c_int
-        self.ECDH_compute_key.argtypes = [ctypes.c_void_p,
-                                          ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EVP_CipherInit_ex = self._lib.EVP_CipherInit_ex
-        self.EVP_CipherInit_ex.restype = ctypes.c_int
-        self.EVP_CipherInit_ex.argtypes = [ctypes.c_void_p,
-                                           ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EVP_CIPHER_CTX_new = self._lib.EVP_CIPHER_CTX_new
-        self.EVP_CIPHER_CTX_new.restype = ctypes.c_void_p
-        self.EVP_CIPHER_CTX_new.argtypes = []
-
-        # Cipher
-        self.EVP_aes_128_cfb128 = self._lib.EVP_aes_128_cfb128
-        self.EVP_aes_128_cfb128.restype = ctypes.c_void_p
-        self.EVP_aes_128_cfb128.argtypes = []
-
-        self.EVP_aes_256_cfb128 = self._lib.EVP_aes_256_cfb128
-        self.EVP_aes_256_cfb128.restype = ctypes.c_void_p
-        self.EVP_aes_256_cfb128.argtypes = []
-
-        self.EVP_aes_128_cbc = self._lib.EVP_aes_128_cbc
-        self.EVP_aes_128_cbc.restype = ctypes.c_void_p
-        self.EVP_aes_128_cbc.argtypes = []
-
-        self.EVP_aes_256_cbc = self._lib.EVP_aes_256_cbc
-        self.EVP_aes_256_cbc.restype = ctypes.c_void_p
-        self.EVP_aes_256_cbc.argtypes = []
-
-        #self.EVP_aes_128_ctr = self._lib.EVP_aes_128_ctr
-        #self.EVP_aes_128_ctr.restype = ctypes.c_void_p
-        #self.EVP_aes_128_ctr.argtypes = []
-
-        #self.EVP_aes_256_ctr = self._lib.EVP_aes_256_ctr
-        #self.EVP_aes_256_ctr.restype = ctypes.c_void_p
-        #self.EVP_aes_256_ctr.argtypes = []
-
-        self.EVP_aes_128_ofb = self._lib.EVP_aes_128_ofb
-        self.EVP_aes_128_ofb.restype = ctypes.c_void_p
-        self.EVP_aes_128_ofb.argtypes = []
-
-        self.EVP_aes_256_ofb = self._lib.EVP_aes_256_ofb
-        self.EVP_aes_256_ofb.restype = ctypes.c_void_p
-        self.EVP_aes_256_ofb.argtypes = []
-
-        self.EVP_bf_cbc = self._lib.EVP_bf_cbc
-        self.EVP_bf_cbc.restype = ctypes.c_void_p
-        self.EVP_bf_cbc.argtypes = []
-
-        self.EVP_bf_cfb64 = self._lib.EVP_bf_cfb64
-        self.EVP_bf_cfb64.restype = ctypes.c_void_p
-        self.EVP_bf_cfb64.argtypes = []
-
-        self.EVP_rc4 = self._lib.EVP_rc4
-        self.EVP_rc4.restype = ctypes.c_void_p
-        self.EVP_rc4.argtypes = []
-
-        self.EVP_CIPHER_CTX_cleanup = self._lib.EVP_CIPHER_CTX_cleanup
-        self.EVP_CIPHER_CTX_cleanup.restype = ctypes.c_int
-        self.EVP_CIPHER_CTX_cleanup.argtypes = [ctypes.c_void_p]
-
-        self.EVP_CIPHER_CTX_free = self._lib.EVP_CIPHER_CTX_free
-        self.EVP_CIPHER_CTX_free.restype = None
-        self.EVP_CIPHER_CTX_free.argtypes = [ctypes.c_void_p]
-
-        self.EVP_CipherUpdate = self._lib.EVP_CipherUpdate
-        self.EVP_CipherUpdate.restype = ctypes.c_int
-        self.EVP_CipherUpdate.argtypes = [ctypes.c_void_p,
-                                          ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
-
-        self.EVP_CipherFinal_ex = self._lib.EVP_CipherFinal_ex
-        self.EVP_CipherFinal_ex.restype = ctypes.c_int
-        self.EVP_CipherFinal_ex.argtypes = [ctypes.c_void_p,
-                                            ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EVP_DigestInit = self._lib.EVP_DigestInit
-        self.EVP_DigestInit.restype = ctypes.c_int
-        self._lib.EVP_DigestInit.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EVP_DigestUpdate = self._lib.EVP_DigestUpdate
-        self.EVP_DigestUpdate.restype = ctypes.c_int
-        self.EVP_DigestUpdate.argtypes = [ctypes.c_void_p,
-                                          ctypes.c_void_p, ctypes.c_int]
-
-        self.EVP_DigestFinal = self._lib.EVP_DigestFinal
-        self.EVP_DigestFinal.restype = ctypes.c_int
-        self.EVP_DigestFinal.argtypes = [ctypes.c_void_p,
-                                         ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EVP_ecdsa = self._lib.EVP_ecdsa
-        self._lib.EVP_ecdsa.restype = ctypes.c_void_p
-        self._lib.EVP_ecdsa.argtypes = []
-
-        self.ECDSA_sign = self._lib.ECDSA_sign
-        self.ECDSA_sign.restype = ctypes.c_int
-        self.ECDSA_sign.argtypes = [ctypes.c_int, ctypes.c_void_p,
-                                    ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
-
-        self.ECDSA_verify = self._lib.ECDSA_verify
-        self.ECDSA_verify.restype = ctypes.c_int
-        self.ECDSA_verify.argtypes = [ctypes.c_int, ctypes.c_void_p,
-                                      ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
-
-        self.EVP_MD_CTX_create = self._lib.EVP_MD_CTX_create
-        self.EVP_MD_CTX_create.restype = ctypes.c_void_p
-        self.EVP_MD_CTX_create.argtypes = []
-
-        self.EVP_MD_CTX_init = self._lib.EVP_MD_CTX_init
-        self.EVP_MD_CTX_init.restype = None
-        self.EVP_MD_CTX_init.argtypes = [ctypes.c_void_p]
-
-        self.EVP_MD_CTX_destroy = self._lib.EVP_MD_CTX_destroy
-        self.EVP_MD_CTX_destroy.restype = None
-        self.EVP_MD_CTX_destroy.argtypes = [ctypes.c_void_p]
-
-        self.RAND_bytes = self._lib.RAND_bytes
-        self.RAND_bytes.restype = ctypes.c_int
-        self.RAND_bytes.argtypes = [ctypes.c_void_p, ctypes.c_int]
-
-
-        self.EVP_sha256 = self._lib.EVP_sha256
-        self.EVP_sha256.restype = ctypes.c_void_p
-        self.EVP_sha256.argtypes = []
-
-        self.i2o_ECPublicKey = self._lib.i2o_ECPublicKey
-        self.i2o_ECPublicKey.restype = ctypes.c_void_p
-        self.i2o_ECPublicKey.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
-
-        self.i2d_ECPKParameters = self._lib.i2d_ECPKParameters
-        self.i2d_ECPKParameters.restype = ctypes.c_void_p
-        self.i2d_ECPKParameters.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
-
-        self.EVP_sha512 = self._lib.EVP_sha512
-        self.EVP_sha512.restype = ctypes.c_void_p
-        self.EVP_sha512.argtypes = []
-
-        self.HMAC = self._lib.HMAC
-        self.HMAC.restype = ctypes.c_void_p
-        self.HMAC.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
-                              ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p]
-
-        try:
-            self.PKCS5_PBKDF2_HMAC = self._lib.PKCS5_PBKDF2_HMAC
-        except:
-            # The above is not compatible with all versions of OSX.
-            self.PKCS5_PBKDF2_HMAC = self._lib.PKCS5_PBKDF2_HMAC_SHA1
-            
-        self.PKCS5_PBKDF2_HMAC.restype = ctypes.c_int
-        self.PKCS5_PBKDF2_HMAC.argtypes = [ctypes.c_void_p, ctypes.c_int,
-                                           ctypes.c_void_p, ctypes.c_int,
-                                           ctypes.c_int, ctypes.c_void_p,
-                                           ctypes.c_int, ctypes.c_void_p]
+    def __getattr__(self, name):
+        if name == '_lib':
+            return self.load()._lib
+        if name in ('curves', 'curve_aliases'):
+            self._set_curves()
+            return self.__dict__[name]
+        if name in SIGNATURES:
+            return self._bind(name)
+        raise AttributeError(name)
+
+    def load(self, library=None):
+        """
+        loads the library now (library, if given, must be called
+        before anything else is used) and returns the wrapper
+        """
+        with self._load_lock:
+            if '_lib' in self.__dict__:
+                if library is not None and library != self.library:
+                    raise Exception("OpenSSL is already loaded from %s" % self.library)
+                return self
+            if library is None:
+                library = self._library or find_library()
+            self._lib = ctypes.CDLL(library)
+            self.library = library
+        return self
+
+    def _bind(self, name):
+        signature = SIGNATURES[name]
+        for symbol in (name,) + signature[2:]:
+            try:
+                function = getattr(self._lib, symbol)
+                break
+            except AttributeError:
+                pass
+        else:
+            raise AttributeError("%s is not available in %s" % (name, self.library))
+        function.restype = signature[0]
+        function.argtypes = signature[1]
+        setattr(self, name, function)
+        return function
 
-        self._set_ciphers()
-        self._set_curves()
+    def bind_all(self):
+        """
+        binds every function available in the library and
+        returns the names of those that are not
+        """
+        missing = []
+        for name in sorted(SIGNATURES):
+            try:
+                getattr(self, name)
+            except AttributeError:
+                missing.append(name)
+        return missing
 
     def _set_ciphers(self):
         self.cipher_algo = {
-            'aes-128-cbc': CipherName('aes-128-cbc', self.EVP_aes_128_cbc, 16),
-            'aes-256-cbc': CipherName('aes-256-cbc', self.EVP_aes_256_cbc, 16),
-            'aes-128-cfb': CipherName('aes-128-cfb', self.EVP_aes_128_cfb128, 16),
-            'aes-256-cfb': CipherName('aes-256-cfb', self.EVP_aes_256_cfb128, 16),
-            'aes-128-ofb': CipherName('aes-128-ofb', self._lib.EVP_aes_128_ofb, 16),
-            'aes-256-ofb': CipherName('aes-256-ofb', self._lib.EVP_aes_256_ofb, 16),
-            #'aes-128-ctr': CipherName('aes-128-ctr', self._lib.EVP_aes_128_ctr, 16),
-            #'aes-256-ctr': CipherName('aes-256-ctr', self._lib.EVP_aes_256_ctr, 16),
-            'bf-cfb': CipherName('bf-cfb', self.EVP_bf_cfb64, 8),
-            'bf-cbc': CipherName('bf-cbc', self.EVP_bf_cbc, 8),
-            'rc4': CipherName('rc4', self.EVP_rc4, 128), # 128 is the initialisation size not block size
+            'aes-128-cbc': CipherName('aes-128-cbc', lambda: self.EVP_aes_128_cbc(), 16),
+            'aes-256-cbc': CipherName('aes-256-cbc', lambda: self.EVP_aes_256_cbc(), 16),
+            'aes-128-cfb': CipherName('aes-128-cfb', lambda: self.EVP_aes_128_cfb128(), 16),
+            'aes-256-cfb': CipherName('aes-256-cfb', lambda: self.EVP_aes_256_cfb128(), 16),
+            'aes-128-ofb': CipherName('aes-128-ofb', lambda: self.EVP_aes_128_ofb(), 16),
+            'aes-256-ofb': CipherName('aes-256-ofb', lambda: self.EVP_aes_256_ofb(), 16),
+            #'aes-128-ctr': CipherName('aes-128-ctr', lambda: self.EVP_aes_128_ctr(), 16),
+            #'aes-256-ctr': CipherName('aes-256-ctr', lambda: self.EVP_aes_256_ctr(), 16),
+            'bf-cfb': CipherName('bf-cfb', lambda: self.EVP_bf_cfb64(), 8),
+            'bf-cbc': CipherName('bf-cbc', lambda: self.EVP_bf_cbc(), 8),
+            'rc4': CipherName('rc4', lambda: self.EVP_rc4(), 128), # 128 is the initialisation size not block size
         }
 
     def _set_curves(self):
-        self.curves = {
-            'secp112r1': 704,
-            'secp112r2': 705,
-            'secp128r1': 706,
-            'secp128r2': 707,
-            'secp160k1': 708,
-            'secp160r1': 709,
-            'secp160r2': 710,
-            'secp192k1': 711,
-            'secp224k1': 712,
-            'secp224r1': 713,
-            'secp256k1': 714,
-            'secp384r1': 715,
-            'secp521r1': 716,
-            'sect113r1': 717,
-            'sect113r2': 718,
-            'sect131r1': 719,
-            'sect131r2': 720,
-            'sect163k1': 721,
-            'sect163r1': 722,
-            'sect163r2': 723,
-            'sect193r1': 724,
-            'sect193r2': 725,
-            'sect233k1': 726,
-            'sect233r1': 727,
-            'sect239k1': 728,
-            'sect283k1': 729,
-            'sect283r1': 730,
-            'sect409k1': 731,
-            'sect409r1': 732,
-            'sect571k1': 733,
-            'sect571r1': 734,
-        }
+        """
+        builds the table of curves from the ones built into the
+        library: curves maps the short name of each curve to its
+        id, curve_aliases other names (NIST and SEC 2) to short names
+        """
+        count = self.EC_get_builtin_curves(None, 0)
+        builtin = (BuiltinCurve * count)()
+        self.EC_get_builtin_curves(builtin, count)
+        curves = {}
+        aliases = {}
+        for entry in builtin:
+            name = self.OBJ_nid2sn(entry.nid)
+            curves[name] = entry.nid
+            nist = self.EC_curve_nid2nist(entry.nid)
+            if nist and nist != name:
+                aliases[nist] = name
+        for alias, name in CURVE_ALIASES.items():
+            if name in curves:
+                aliases[alias] = name
+        # curves is set last, as other threads may read it
+        self.curve_aliases = aliases
+        self.curves = curves
+
+    def version_number(self):
+        """
+        returns the version of the loaded library as a number
+        (0x30000000 for 3.0.0, 0x1000200f for 1.0.2)
+        """
+        return self.OpenSSL_version_num()
 
     def BN_num_bytes(self, x):
         """
@@ -405,8 +390,10 @@ class _OpenSSL:
 
     def get_curve(self, name):
         """
-        returns the id of a elliptic curve
+        returns the id of a elliptic curve, by its
+        short name or an alias (see _set_curves)
         """
+        name = self.curve_aliases.get(name, name)
         if name not in self.curves:
             raise Exception("Unknown curve")
         return self.curves[name]
@@ -453,35 +440,4 @@ class _OpenSSL:
             buffer = self.create_string_buffer(size)
         return buffer
 
-try:
-    OpenSSL = _OpenSSL('libcrypto.so')
-except:
-    try:
-        OpenSSL = _OpenSSL('libeay32.dll')
-    except:
-        try:
-            OpenSSL = _OpenSSL('libcrypto.dylib')
-        except:
-            try:
-                # try homebrew installation
-                OpenSSL = _OpenSSL('/usr/local/opt/openssl/lib/libcrypto.dylib')
-            except:
-                try:
-                  # Load it from an Bitmessage.app on OSX
-                  OpenSSL = _OpenSSL('./../Frameworks/libcrypto.dylib')
-                except:
-                  try:
-                      from os import path
-                      lib_path = path.join(sys._MEIPASS, "libeay32.dll")
-                      OpenSSL = _OpenSSL(lib_path)
-                  except:
-                      if 'linux' in sys.platform or 'darwin' in sys.platform or 'freebsd' in sys.platform:
-                          try:
-                              from ctypes.util import find_library
-                              OpenSSL = _OpenSSL(find_library('ssl'))
-                          except Exception, err:
-                              sys.stderr.write('(On Linux) Couldn\'t find and load the OpenSSL library. You must install it. If you believe that you already have it installed, this exception information might be of use:\n')
-                              from ctypes.util import find_library
-                              OpenSSL = _OpenSSL(find_library('ssl'))
-                      else:
-                          raise Exception("Couldn't find and load the OpenSSL library. You must install it.")
+OpenSSL = _OpenSSL()
@@ -23,12 +23,16 @@
 # DEALINGS IN THE SOFTWARE.
 
 import hashlib
+import struct
+import sys
 import time
-from random import randint
 
 from echelper import ECHelper
 from curve import Curve
 from keypair import KeyPair
+from point import Point
+import aio as ec_aio
+import keystore as ec_keystore
 
 
 CURVE = "secp256k1"
@@ -41,9 +45,10 @@ def sign(curve, keys, signer_index, message="Hello message"):
     # Set signer
     signer = keys[signer_index]
 
-    # Make room for c_i, s_i, z'_i, and z''_i variables
+    # Make room for c_i, z'_i, and z''_i variables, and draw random
+    # s_i (s_pi is replaced in step 4)
     cs = [0] * key_count
-    ss = [0] * key_count
+    ss = curve.scalars.take( key_count )
     z_s = [0] * key_count
     z__s = [0] * key_count
 
@@ -57,14 +62,13 @@ def sign(curve, keys, signer_index, message="Hello message"):
     Y_tilde = signer.private_key * H
 
     # Step 2
-    u = randint( 0, curve.order )
+    u = curve.scalars.next()
     pi_plus_1 = (signer_index+1) % key_count
     cs[pi_plus_1] = H1( curve, public_keys_hash, Y_tilde, message,
                         u * curve.G, u * H )
 
     # Step 3
     for i in range( signer_index+1, key_count ) + range( signer_index ):
-        ss[i] = randint( 0, curve.order )
         next_i = (i+1) % key_count
         z_s[i] = ss[i] * curve.G + cs[i] * public_keys[i]
         z__s[i] = ss[i] * H + cs[i] * Y_tilde
@@ -104,9 +108,11 @@ def verify( curve, public_keys, message, c_0, ss, Y_tilde ):
     # Step 1
     public_keys_hash = curve.hash_to_field( "%s" % public_keys_coords )
     H = H2( curve, public_keys_coords )
+    # Every scalar is part of the signature, so the
+    # precomputed tables of G, H and Y_tilde may be used
     for i in range( n ):
-        z_s[i] = ss[i] * curve.G + cs[i] * public_keys[i]
-        z__s[i] = ss[i] * H + cs[i] * Y_tilde
+        z_s[i] = curve.G.mul_public( ss[i] ) + public_keys[i].mul_public( cs[i] )
+        z__s[i] = H.mul_public( ss[i] ) + Y_tilde.mul_public( cs[i] )
         if i < n - 1:
             cs[i+1] = H1( curve, public_keys_hash, Y_tilde, message, z_s[i], z__s[i] )
 
@@ -125,11 +131,105 @@ def verify( curve, public_keys, message, c_0, ss, Y_tilde ):
 
     return cs[0] == H1_ver
 
+def clsag_sign( curve, keys, signer_index, message="Hello message" ):
+    """
+    Signs like sign, with the same key image Y_tilde, but in the
+    style of CLSAG: the two equations of every ring member are
+    aggregated with the coefficient mu = H3( keys, Y_tilde ) into
+
+        Z_i = s_i * ( G + mu * H ) + c_i * ( P_i + mu * Y_tilde )
+
+    so only one point is computed and hashed per member. The
+    signature has the same form as the one returned by sign.
+    """
+    key_count = len( keys )
+
+    # Set signer
+    signer = keys[signer_index]
+
+    cs = [0] * key_count
+    ss = curve.scalars.take( key_count )
+
+    public_keys = map( lambda key: key.public_key, keys )
+    public_keys_coords = map( lambda point: (point.x, point.y), public_keys )
+
+    # Step 1
+    public_keys_hash = curve.hash_to_field( "%s" % public_keys_coords )
+    H = H2( curve, public_keys_coords )
+    Y_tilde = signer.private_key * H
+
+    # Aggregate the bases and the key image
+    mu = H3( curve, public_keys_hash, Y_tilde )
+    B = curve.G + mu * H
+    mu_Y_tilde = mu * Y_tilde
+
+    # Step 2
+    u = curve.scalars.next()
+    pi_plus_1 = (signer_index+1) % key_count
+    cs[pi_plus_1] = H4( curve, public_keys_hash, Y_tilde, message, u * B )
+
+    # Step 3
+    for i in range( signer_index+1, key_count ) + range( signer_index ):
+        next_i = (i+1) % key_count
+        z = ss[i] * B + cs[i] * ( public_keys[i] + mu_Y_tilde )
+        cs[next_i] = H4( curve, public_keys_hash, Y_tilde, message, z )
+
+    # Step 4
+    ss[signer_index] = ( u - signer.private_key * cs[signer_index] ) % curve.order
+
+    return ( public_keys,
+             message,
+             cs[0],
+             ss,
+             Y_tilde
+           )
+
+def clsag_verify( curve, public_keys, message, c_0, ss, Y_tilde ):
+    """
+    Verifies a signature made by clsag_sign.
+    """
+    public_keys_coords = map( lambda point: ( point.x, point.y ) , public_keys )
+
+    n = len( public_keys )
+
+    public_keys_hash = curve.hash_to_field( "%s" % public_keys_coords )
+    H = H2( curve, public_keys_coords )
+    mu = H3( curve, public_keys_hash, Y_tilde )
+    B = curve.G + mu * H
+    mu_Y_tilde = mu * Y_tilde
+
+    c = c_0
+    for i in range( n ):
+        z = B.mul_public( ss[i] ) + c * ( public_keys[i] + mu_Y_tilde )
+        c = H4( curve, public_keys_hash, Y_tilde, message, z )
+
+    if DEBUG:
+        print "VERIFY c_n==c_0: (%d == %d)" % ( c, c_0 )
+
+    return c_0 == c
+
+def asign( curve, keys, signer_index, message="Hello message" ):
+    """
+    Awaitable version of sign, run on the asynchronous executor.
+    """
+    return ec_aio.run( sign, curve, keys, signer_index, message )
+
+def averify( curve, public_keys, message, c_0, ss, Y_tilde ):
+    """
+    Awaitable version of verify, run on the asynchronous executor.
+    """
+    return ec_aio.run( verify, curve, public_keys, message, c_0, ss, Y_tilde )
+
 def H2( curve, in_str ):
     """
-    Hash the input as a string and return the hash as an integer.
+    Hash the input as a string and return the hash as a point.
     """
-    return curve.hash_to_point( "H2_salt%s" % in_str )
+    H = curve.hash_to_point( "H2_salt%s" % in_str )
+    # The signature equations are taken modulo the order, so H must
+    # lie in the subgroup generated by G
+    if curve.h != 1:
+        H = curve.h * H
+    return H
 
 def H1( curve, keys, Y_tilde, message, P1, P2):
     """
@@ -140,6 +240,62 @@ def H1( curve, keys, Y_tilde, message, P1, P2):
                                      P1.x, P1.y, P2.x, P2.y)
     return curve.hash_to_field( "H1_salt%s" % str )
 
+def H3( curve, keys, Y_tilde ):
+    """
+    The aggregation coefficient of clsag_sign and clsag_verify.
+    """
+    return curve.hash_to_field( "H3_salt%s,%s" % ( keys, Y_tilde ) )
+
+def H4( curve, keys, Y_tilde, message, P ):
+    """
+    The challenge hash of clsag_sign and clsag_verify, which
+    hashes a single point per ring member.
+    """
+    str = "%s,%s,%s,%X,%X" % ( keys, Y_tilde, message, P.x, P.y )
+    return curve.hash_to_field( "H4_salt%s" % str )
+
+# Ring size and message length of an encoded signature
+SIGNATURE_HEADER = struct.Struct( ">II" )
+
+def encode_signature( curve, signature ):
+    """
+    Encodes a signature returned by sign as the ring size and
+    message length (4 bytes each, big-endian), the message, the
+    compressed public keys and Y_tilde, and c_0 and the s_i as
+    big-endian integers of the byte length of the curve order.
+    """
+    public_keys, message, c_0, ss, Y_tilde = signature
+    width = ( curve.order.bit_length() + 7 ) // 8
+    return "".join( [ SIGNATURE_HEADER.pack( len( public_keys ), len( message ) ), message ] +
+                    [ point.to_bytes() for point in public_keys ] + [ Y_tilde.to_bytes() ] +
+                    [ ( "%0*x" % ( 2 * width, v ) ).decode( "hex" ) for v in [ c_0 ] + list( ss ) ] )
+
+def decode_signature( curve, data ):
+    """
+    Decodes a signature encoded by encode_signature into the
+    arguments of verify (without the curve). Raises an exception
+    if the encoding is malformed or a point is not valid (see
+    Point.is_valid).
+    """
+    width = ( curve.order.bit_length() + 7 ) // 8
+    point_width = curve.point_size( True )
+    if len( data ) < SIGNATURE_HEADER.size:
+        raise Exception( 'Signature is truncated' )
+    n, message_length = SIGNATURE_HEADER.unpack_from( data, 0 )
+    offset = SIGNATURE_HEADER.size + message_length
+    if n == 0 or len( data ) != offset + ( n + 1 ) * point_width + ( n + 1 ) * width:
+        raise Exception( 'Signature has the wrong length' )
+    message = data[SIGNATURE_HEADER.size:offset]
+    points = []
+    for i in range( n + 1 ):
+        point = Point.from_bytes( curve, data[offset:offset + point_width] )
+        if not point.is_valid():
+            raise Exception( 'Signature has an invalid point' )
+        points.append( point )
+        offset += point_width
+    values = [ int( data[offset + i * width:offset + ( i + 1 ) * width].encode( "hex" ), 16 ) for i in range( n + 1 ) ]
+    return ( points[:n], message, values[0], values[1:], points[n] )
+
 def get_signature_size( signature ):
     public_keys, message, c_0, ss, Y_tilde = signature
     # Each public key is 64 bytes (32 bytes per coordinate)
@@ -150,36 +306,51 @@ def get_signature_size( signature ):
     size += 64
     return size
 
-def run_test( curve, keys, signer_index ):
-    signature = sign( curve, keys, signer_index )
-    assert verify( curve, *signature )
+# Signing and verification functions of each scheme
+SCHEMES = {
+    "lsag": ( sign, verify ),
+    "clsag": ( clsag_sign, clsag_verify ),
+}
+
+def run_test( curve, keys, signer_index, scheme="lsag" ):
+    scheme_sign, scheme_verify = SCHEMES[scheme]
+    signature = scheme_sign( curve, keys, signer_index )
+    assert scheme_verify( curve, *signature )
     return get_signature_size( signature )
 
-def run_multiple_tests( curve, keys, signer_index=0, tests=1 ):
+def run_multiple_tests( curve, keys, signer_index=0, tests=1, scheme="lsag" ):
     t_start = time.time()
-    size = sum( map( lambda _: run_test( curve, keys, signer_index ), range( tests ) ) )
+    size = sum( map( lambda _: run_test( curve, keys, signer_index, scheme ), range( tests ) ) )
     t_end = time.time()
     t = t_end - t_start
-    print "Signing and verifying %d messages with %d keys took %.3f seconds (%.3f s/msg, %.3f ms/msg/key)" \
-                % ( tests, len( keys ), t, t / tests, 1000 * t / tests / len( keys ) )
-    print "The %d signatures were %d bytes in total (%.3f b/test, %.3f b/test/key)" % ( tests, size, float(size) / tests, float(size) / tests / len(keys) )
-    return ( len( keys ), tests, t, size )
+    print "%s: Signing and verifying %d messages with %d keys took %.3f seconds (%.3f s/msg, %.3f ms/msg/key)" \
+                % ( scheme, tests, len( keys ), t, t / tests, 1000 * t / tests / len( keys ) )
+    print "%s: The %d signatures were %d bytes in total (%.3f b/test, %.3f b/test/key)" % ( scheme, tests, size, float(size) / tests, float(size) / tests / len(keys) )
+    return ( scheme, len( keys ), tests, t, size )
 
-def run():
+def run( keystore_path=None ):
     curve = Curve( CURVE )
 
-    # Generate private/public key pairs
-    print "Generating %d key pairs..." % KEY_COUNT
-    t = time.time()
-    key_gen_time = keys = map( lambda _: KeyPair( curve ), range( KEY_COUNT ) )
-    print "Generating %d key pairs took %.3f seconds" % ( KEY_COUNT, time.time() - t )
+    if keystore_path is not None:
+        # Map the key pairs from a key store, generating it on first use
+        t = time.time()
+        keys = ec_keystore.load_or_generate( curve, keystore_path, KEY_COUNT )
+        print "Loading %d key pairs from %s took %.3f seconds" % ( KEY_COUNT, keystore_path, time.time() - t )
+    else:
+        # Generate private/public key pairs
+        print "Generating %d key pairs..." % KEY_COUNT
+        t = time.time()
+        key_gen_time = keys = map( lambda _: KeyPair( curve ), range( KEY_COUNT ) )
+        print "Generating %d key pairs took %.3f seconds" % ( KEY_COUNT, time.time() - t )
 
     results = []
 
     for i in [ 2, 3, 5, 10, 20, 30, 50, 100, 200, 300, 500, 1000, 2000, 3000, 5000, 10000]:
-        results.append( run_multiple_tests( curve, keys[0:i], tests=10 ) )
+        for scheme in [ "lsag", "clsag" ]:
+            results.append( run_multiple_tests( curve, keys[0:i], tests=10, scheme=scheme ) )
 
     print repr( results )   
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    # Optionally: python sample_lsag.py keys.db
+    run( sys.argv[1] if len( sys.argv ) > 1 else None )
\ No newline at end of file
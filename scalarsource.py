@@ -0,0 +1,107 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import binascii
+import ctypes
+import os
+import threading
+
+from pyelliptic.openssl import OpenSSL
+
+class ScalarSource:
+    '''
+    Uniformly random scalars in [1, order) for one curve, for
+    private keys and signature nonces.
+
+    Each call reads the random bytes it needs from RAND_bytes, up
+    to block_size bytes at a time, into a bytearray that is reused
+    for every call. Each scalar takes the top bits of
+    order.bit_length() bits of the next bytes, and values that are
+    0 or not below the order are rejected, so every scalar is
+    equally likely.
+
+    No bytes are kept for later calls: the buffer is zeroed before
+    each call returns, so future keys and nonces are never held in
+    memory.
+
+    Sources are safe to share between threads. OpenSSL is reseeded
+    when the source is first used in a process forked from the one
+    that last used it.
+    '''
+
+    def __init__(self, curve, block_size=4096):
+        '''
+        Constructor
+        '''
+        self.curve = curve
+        self.order = curve.order
+        bits = self.order.bit_length()
+        self.width = ( bits + 7 ) // 8
+        self.shift = 8 * self.width - bits
+        # A whole number of scalars per block
+        self.block_size = max( block_size - block_size % self.width, self.width )
+        self.__buffer = bytearray( self.block_size )
+        self.__lock = threading.Lock()
+        self.__pid = os.getpid()
+        self.blocks = 0
+
+    def take(self, n):
+        """
+        Returns a list of n random scalars.
+        """
+        width = self.width
+        buf = self.__buffer
+        scalars = []
+        with self.__lock:
+            if os.getpid() != self.__pid:
+                self.__pid = os.getpid()
+                OpenSSL.RAND_poll()
+            while len( scalars ) < n:
+                size = min( ( n - len( scalars ) ) * width, self.block_size )
+                try:
+                    self.__fill( size )
+                    for offset in xrange( 0, size, width ):
+                        k = int( binascii.hexlify( buf[offset:offset + width] ), 16 ) >> self.shift
+                        if 0 < k < self.order:
+                            scalars.append( k )
+                finally:
+                    buf[:size] = bytearray( size )
+        return scalars
+
+    def next(self):
+        """
+        Returns one random scalar.
+        """
+        return self.take( 1 )[0]
+
+    def __fill(self, size):
+        view = ( ctypes.c_char * size ).from_buffer( self.__buffer )
+        if OpenSSL.RAND_bytes( view, size ) != 1:
+            raise Exception( 'RAND_bytes failed' )
+        self.blocks += 1
+
+    def __str__(self):
+        return "ScalarSource<width: %d, blocks read: %d>" % ( self.width, self.blocks )
+
+    __repr__ = __str__
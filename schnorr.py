@@ -0,0 +1,210 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Schnorr signatures following BIP-340.
+
+On secp256k1 the signatures are BIP-340 signatures: public keys are
+the 32-byte x coordinate of a point with an even y coordinate, and
+signatures are the x coordinate of R followed by s. The same
+construction is used on the other curves over prime fields, with
+field-sized encodings and SHA-512 instead of SHA-256 for fields
+larger than 256 bits.
+
+batch_verify checks many signatures at once with a random linear
+combination of the verification equations, evaluated as a single
+multi-scalar multiplication (EC_POINTs_mul).
+"""
+
+import ctypes
+import hashlib
+
+from pyelliptic.openssl import OpenSSL
+from echelper import ECHelper
+import point as ec_point
+import bignum as ec_bignum
+
+def _hash_function(curve):
+    if curve.field_bytes <= 32:
+        return hashlib.sha256
+    return hashlib.sha512
+
+def tagged_hash(curve, tag, msg):
+    """
+    Returns hash( hash( tag ) || hash( tag ) || msg ), the
+    BIP-340 tagged hash, as an integer.
+    """
+    h = _hash_function( curve )
+    tag_hash = h( tag ).digest()
+    return int( h( tag_hash + tag_hash + msg ).hexdigest(), 16 )
+
+def int_to_bytes(curve, i):
+    """
+    Encodes an integer as curve.field_bytes big-endian bytes.
+    """
+    return ECHelper.int2bin( i ).rjust( curve.field_bytes, '\0' )
+
+def bytes_to_int(b):
+    return int( b.encode( 'hex' ) or '0', 16 )
+
+def _check_curve(curve):
+    if curve.field_type != 'prime':
+        raise Exception( 'Schnorr signatures are only implemented for curves over prime fields' )
+
+def lift_x(curve, xs):
+    """
+    Returns the points with the given x coordinates and even y
+    coordinates, or None for those that are not on the curve.
+    """
+    _check_curve( curve )
+    xs = list( xs )
+    ys = [ ECHelper.modular_sqrt( curve.f( x ), curve.p ) for x in xs ]
+    points = []
+    for x, y in zip( xs, ys ):
+        if x >= curve.p or ( y == 0 and curve.f( x ) % curve.p != 0 ):
+            points.append( None )
+        else:
+            points.append( ec_point.Point( curve, x=x, y=y if y % 2 == 0 else curve.p - y ) )
+    return points
+
+def public_key(curve, private_key):
+    """
+    Returns the x-only public key for a private key.
+    """
+    _check_curve( curve )
+    return int_to_bytes( curve, ( private_key * curve.G ).x )
+
+def sign(curve, private_key, message, aux_rand=None):
+    """
+    Signs a message (a string) with a private key (an integer).
+    aux_rand is fresh randomness mixed into the nonce; it is
+    drawn from OpenSSL if not given.
+    """
+    _check_curve( curve )
+    n = curve.order
+    if not 0 < private_key < n:
+        raise Exception( 'Private key out of range' )
+    if aux_rand is None:
+        aux_rand = OpenSSL.rand( curve.field_bytes )
+
+    P = private_key * curve.G
+    d = private_key if P.y % 2 == 0 else n - private_key
+    P_bytes = int_to_bytes( curve, P.x )
+
+    t = d ^ tagged_hash( curve, "BIP0340/aux", aux_rand )
+    k = tagged_hash( curve, "BIP0340/nonce", int_to_bytes( curve, t ) + P_bytes + message ) % n
+    if k == 0:
+        raise Exception( 'Nonce is zero' )
+    R = k * curve.G
+    if R.y % 2 != 0:
+        k = n - k
+    R_bytes = int_to_bytes( curve, R.x )
+    e = tagged_hash( curve, "BIP0340/challenge", R_bytes + P_bytes + message ) % n
+    return R_bytes + int_to_bytes( curve, ( k + e * d ) % n )
+
+def _parse(curve, public_key, signature):
+    """
+    Splits a signature into (r, s, R bytes), returning
+    None if it is malformed.
+    """
+    size = curve.field_bytes
+    if len( public_key ) != size or len( signature ) != 2 * size:
+        return None
+    r, s = bytes_to_int( signature[:size] ), bytes_to_int( signature[size:] )
+    if r >= curve.p or s >= curve.order:
+        return None
+    return r, s
+
+def verify(curve, public_key, message, signature):
+    """
+    Verifies a signature on a message under an
+    x-only public key.
+    """
+    _check_curve( curve )
+    parsed = _parse( curve, public_key, signature )
+    if parsed is None:
+        return False
+    r, s = parsed
+    P = lift_x( curve, [ bytes_to_int( public_key ) ] )[0]
+    if P is None:
+        return False
+    n = curve.order
+    e = tagged_hash( curve, "BIP0340/challenge", signature[:curve.field_bytes] + public_key + message ) % n
+    R = curve.G.mul_public( s ) + P.mul_public( n - e )
+    if R.is_infinity():
+        return False
+    return R.y % 2 == 0 and R.x == r
+
+def batch_verify(curve, items):
+    """
+    Verifies a list of (public key, message, signature) tuples at
+    once. Returns True only if all signatures are valid.
+
+    With random a_1 = 1, a_2, ..., a_u, this checks that
+        (a_1 s_1 + ... + a_u s_u) G - sum( a_i R_i ) - sum( a_i e_i P_i )
+    is the point at infinity, in one multi-scalar multiplication.
+    """
+    _check_curve( curve )
+    items = list( items )
+    if not items:
+        return True
+    n = curve.order
+    size = curve.field_bytes
+
+    parsed = [ _parse( curve, pk, sig ) for pk, _, sig in items ]
+    if None in parsed:
+        return False
+    points = lift_x( curve, [ r for r, _ in parsed ] + [ bytes_to_int( pk ) for pk, _, _ in items ] )
+    if None in points:
+        return False
+
+    # Random weights from the OpenSSL generator, one per signature
+    randomness = OpenSSL.rand( 16 * ( len( items ) - 1 ) )
+    weights = [ 1 ] + [ bytes_to_int( randomness[16*i:16*(i+1)] ) % ( n - 1 ) + 1 for i in range( len( items ) - 1 ) ]
+
+    g_scalar = 0
+    r_scalars = []
+    p_scalars = []
+    for ( pk, message, signature ), ( r, s ), a in zip( items, parsed, weights ):
+        e = tagged_hash( curve, "BIP0340/challenge", signature[:size] + pk + message ) % n
+        g_scalar += a * s
+        r_scalars.append( n - a )
+        p_scalars.append( -a * e % n )
+
+    return multi_mul( curve, g_scalar % n, points, r_scalars + p_scalars ).is_infinity()
+
+def multi_mul(curve, g_scalar, points, scalars):
+    """
+    Returns g_scalar * G + sum( scalars[i] * points[i] ),
+    computed by OpenSSL in one interleaved multiplication.
+    """
+    count = len( points )
+    bns = [ ec_bignum.BigNum( decval=k ) for k in scalars ]
+    g_bn = ec_bignum.BigNum( decval=g_scalar )
+    os_points = ( ctypes.c_void_p * count )( *[ p.os_point for p in points ] )
+    os_scalars = ( ctypes.c_void_p * count )( *[ bn.bn for bn in bns ] )
+    result = OpenSSL.EC_POINT_new( curve.os_group )
+    OpenSSL.EC_POINTs_mul( curve.os_group, result, g_bn.bn, count, os_points, os_scalars,
+                           ec_bignum.BigNumContext.get().ctx )
+    return ec_point.Point( curve, openssl_point=result, owned=True )
@@ -0,0 +1,107 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import threading
+import unittest
+
+import aio
+from executor import Executor
+
+class Freeable:
+
+    def __init__(self):
+        self.freed = False
+
+    def free(self):
+        self.freed = True
+
+@unittest.skipUnless( aio.available(), 'asyncio (trollius on Python 2) is not installed' )
+class AsyncExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.asyncio = aio._import_asyncio()
+        self.loop = self.asyncio.new_event_loop()
+        self.asyncio.set_event_loop( self.loop )
+        self.executor = Executor( 2 )
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+        self.loop.close()
+        self.asyncio.set_event_loop( None )
+
+    def blocked(self, value):
+        self.release.wait( 10 )
+        return value
+
+    def settle(self):
+        # Lets the done callbacks scheduled on the loop run
+        self.loop.run_until_complete( self.asyncio.sleep( 0.01 ) )
+
+    def test_results_and_exceptions(self):
+        runner = aio.AsyncExecutor( self.executor )
+        def fail():
+            raise ValueError( 'failed' )
+        self.assertEqual( self.loop.run_until_complete( runner.run( pow, 2, 10 ) ), 1024 )
+        self.assertRaises( ValueError, self.loop.run_until_complete, runner.run( fail ) )
+
+    def test_backpressure(self):
+        runner = aio.AsyncExecutor( self.executor, max_in_flight=1, max_pending=2 )
+        waiters = [ runner.run( self.blocked, i ) for i in range( 3 ) ]
+        self.assertEqual( ( runner.in_flight(), runner.pending() ), ( 1, 2 ) )
+        self.assertRaises( aio.Overloaded, runner.run, self.blocked, 3 )
+        self.release.set()
+        self.assertEqual( self.loop.run_until_complete( self.asyncio.gather( *waiters ) ), [ 0, 1, 2 ] )
+        self.assertEqual( ( runner.in_flight(), runner.pending() ), ( 0, 0 ) )
+
+    def test_cancel_pending(self):
+        runner = aio.AsyncExecutor( self.executor, max_in_flight=1, max_pending=1 )
+        running = runner.run( self.blocked, 0 )
+        waiting = runner.run( self.blocked, 1 )
+        waiting.cancel()
+        self.settle()
+        # The cancelled call no longer takes a place in the queue
+        self.assertEqual( runner.pending(), 0 )
+        queued = runner.run( self.blocked, 2 )
+        self.release.set()
+        self.assertEqual( self.loop.run_until_complete( self.asyncio.gather( running, queued ) ), [ 0, 2 ] )
+        self.assertTrue( waiting.cancelled() )
+
+    def test_cancel_running_frees_result(self):
+        runner = aio.AsyncExecutor( self.executor, max_in_flight=1 )
+        result = Freeable()
+        running = runner.run( self.blocked, result )
+        running.cancel()
+        self.release.set()
+        for _ in range( 100 ):
+            if not runner.in_flight():
+                break
+            self.settle()
+        self.assertTrue( running.cancelled() )
+        self.assertTrue( result.freed )
+
+if __name__ == '__main__':
+    unittest.main()
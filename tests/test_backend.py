@@ -0,0 +1,55 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from pyelliptic.openssl import OpenSSL
+from curve import Curve
+from keypair import KeyPair
+from point import Point
+import backend
+
+class BackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.names = ['legacy']
+        if OpenSSL.version_number() >= backend.OPENSSL_3:
+            self.names.append( 'evp' )
+
+    def test_ecdh_agrees(self):
+        alice, bob = KeyPair( self.curve ), KeyPair( self.curve )
+        for name in self.names:
+            chosen = backend.BACKENDS[name]
+            self.assertEqual( chosen.ecdh( alice, bob.public_key ), chosen.ecdh( bob, alice.public_key ) )
+
+    def test_ecdh_rejects_off_curve_peer(self):
+        keypair = KeyPair( self.curve )
+        peer = Point( self.curve, x=255, y=255 )
+        for name in self.names:
+            self.assertRaises( Exception, backend.BACKENDS[name].ecdh, keypair, peer )
+
+if __name__ == '__main__':
+    unittest.main()
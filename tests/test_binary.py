@@ -0,0 +1,80 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from curve import Curve
+from point import Point
+
+BINARY_CURVES = [ 'sect163k1', 'sect163r2', 'sect233k1', 'sect283r1' ]
+
+class BinaryCurveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curves = [ Curve( name ) for name in BINARY_CURVES ]
+
+    def test_parameters(self):
+        for c in self.curves:
+            self.assertEqual( c.field_type, 'power-of-two' )
+            # The order and cofactor read from the DER parameters
+            # must describe the group generated by G
+            self.assertTrue( ( c.order * c.G ).is_infinity() )
+            self.assertFalse( ( ( c.order - 1 ) * c.G ).is_infinity() )
+            # Hasse's bound on the number of points
+            t = c.h * c.order - ( 1 << c.m ) - 1
+            self.assertTrue( t * t <= 4 << c.m )
+
+    def test_coordinates_round_trip(self):
+        for c in self.curves:
+            P = 12345 * c.G
+            Q = Point( c, x=P.x, y=P.y )
+            self.assertTrue( Q.is_valid() )
+            self.assertEqual( Q, P )
+            self.assertEqual( Q + c.G, 12346 * c.G )
+
+    def test_hash_to_point(self):
+        for c in self.curves:
+            points = [ c.hash_to_point( "message %d" % i ) for i in range( 10 ) ]
+            F = c.gf2m
+            for P in points:
+                # y^2 + xy = x^3 + ax^2 + b
+                x2 = F.sqr( P.x )
+                self.assertEqual( F.sqr( P.y ) ^ F.mul( P.x, P.y ), F.mul( x2, P.x ) ^ F.mul( c.a, x2 ) ^ c.b )
+                # The cofactor is cleared, so P is in the subgroup
+                self.assertTrue( P.is_valid() )
+            self.assertEqual( c.hash_to_point( "message 0" ), points[0] )
+
+    def test_hash_to_point_prime_cofactor(self):
+        c = Curve( 'secp128r2' )
+        self.assertEqual( c.h, 4 )
+        for P in c.hash_to_points( [ "message %d" % i for i in range( 10 ) ] ):
+            self.assertTrue( P.is_valid() )
+
+    def test_hash_to_point_even_degree(self):
+        c = Curve( 'c2pnb176v1' )
+        self.assertEqual( c.m % 2, 0 )
+        self.assertRaises( Exception, c.hash_to_point, "message" )
+
+if __name__ == "__main__":
+    unittest.main()
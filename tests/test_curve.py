@@ -0,0 +1,93 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import random
+import unittest
+
+from curve import Curve
+from echelper import ECHelper
+from point import Point
+
+class MulBaseManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.rng = random.Random( 0 )
+
+    def test_matches_mul(self):
+        c = self.curve
+        scalars = [ self.rng.randrange( 1, c.order ) for _ in range( 30 ) ] + [ 1, c.order - 1, c.order + 5 ]
+        self.assertEqual( c.mul_base_many( scalars ), [ k * c.G for k in scalars ] )
+
+    def test_add(self):
+        c = self.curve
+        Q = c.mul_base( self.rng.randrange( 1, c.order ) )
+        scalars = [ self.rng.randrange( 1, c.order ) for _ in range( 10 ) ]
+        self.assertEqual( c.mul_base_many( scalars, add=Q ), [ k * c.G + Q for k in scalars ] )
+
+    def test_edge_cases(self):
+        c = self.curve
+        self.assertEqual( c.mul_base_many( [] ), [] )
+        products = c.mul_base_many( [ 0, 5, c.order ] )
+        self.assertTrue( products[0].is_infinity() and products[2].is_infinity() )
+        self.assertEqual( products[1], 5 * c.G )
+
+class ValidateManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        rng = random.Random( 0 )
+        self.points = [ self.curve.mul_base( rng.randrange( 1, self.curve.order ) ) for _ in range( 40 ) ]
+
+    def test_all_valid(self):
+        c = self.curve
+        self.assertEqual( c.validate_many( self.points ), [] )
+        self.assertEqual( c.validate_many( [ ( P.x, P.y ) for P in self.points ], workers=3 ), [] )
+        self.assertEqual( c.validate_many( [] ), [] )
+
+    def test_flags_invalid(self):
+        c = self.curve
+        items = list( self.points )
+        items[3] = ( 255, 255 )                           # off the curve
+        items[17] = Point( c, x=255, y=255 )              # off the curve, as a Point
+        items[25] = ( self.points[25].x + c.p, self.points[25].y )   # not reduced
+        items[31] = Point.infinity( c )
+        for workers in ( 1, 4 ):
+            self.assertEqual( c.validate_many( items, workers=workers ), [ 3, 17, 25, 31 ] )
+
+    def test_outside_subgroup(self):
+        # On secp128r2 (cofactor 4), a point of the full group that is
+        # on the curve but not in the subgroup of order c.order
+        c = Curve( 'secp128r2' )
+        x = 1
+        while True:
+            y = ECHelper.modular_sqrt( c.f( x ), c.p )
+            if y and not ( c.order * Point( c, x=x, y=y ) ).is_infinity():
+                break
+            x += 1
+        self.assertEqual( c.validate_many( [ c.G, ( x, y ), 4 * Point( c, x=x, y=y ) ] ), [ 1 ] )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from pyelliptic.openssl import OpenSSL
+import client
+from client import Client, REQUEST, RESPONSE, COUNT, INFO, OK, ERROR, recv_exact
+import daemon
+
+class DaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join( self.directory, 'pyec.sock' )
+        self.server = daemon.Server( self.path, workers=2, max_delay=0.05 ).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        shutil.rmtree( self.directory )
+
+    def call(self, sock, request_id, operation, curve_id, body=""):
+        sock.sendall( REQUEST.pack( request_id, operation, curve_id, len( body ) ) + body )
+        return self.response( sock )
+
+    def response(self, sock):
+        response_id, status, length = RESPONSE.unpack( recv_exact( sock, RESPONSE.size ) )
+        return response_id, status, recv_exact( sock, length ) if length else ""
+
+    def connect(self):
+        sock = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+        sock.settimeout( 10 )
+        sock.connect( self.path )
+        return sock
+
+    def test_round_trip(self):
+        with Client( self.path, timeout=10 ) as c:
+            keys = c.keygen( 'secp256k1', 3 )
+            self.assertEqual( len( keys ), 3 )
+            private_key, public_key = keys[0]
+            signature = c.sign( 'secp256k1', private_key, "message" )
+            self.assertTrue( c.verify( 'secp256k1', public_key, "message", signature ) )
+            self.assertFalse( c.verify( 'secp256k1', public_key, "massage", signature ) )
+            items = [ ( public_key, "message %d" % i, c.sign( 'secp256k1', private_key, "message %d" % i ) )
+                      for i in range( 6 ) ]
+            items[4] = ( items[4][0], "forged", items[4][2] )
+            self.assertEqual( c.verify_many( 'secp256k1', items ), [ True ] * 4 + [ False, True ] )
+
+    def test_curve_table(self):
+        for name, curve_id in client.CURVES.items():
+            if OpenSSL.curve_aliases.get( name, name ) in OpenSSL.curves:
+                self.assertEqual( client.lookup_curve( name ), OpenSSL.get_curve( name ) )
+        self.assertEqual( client.lookup_curve( 714 ), 714 )
+        self.assertRaises( Exception, client.lookup_curve, 'nosuchcurve' )
+
+    def test_client_does_not_load_openssl(self):
+        script = """if True:
+            import sys
+            from client import Client
+            with Client( sys.argv[1], timeout=10 ) as c:
+                private_key, public_key = c.keygen( 'secp256k1' )[0]
+                signature = c.sign( 'secp256k1', private_key, 'message' )
+                assert c.verify( 'secp256k1', public_key, 'message', signature )
+            # pyelliptic is what binds libcrypto
+            assert not [ name for name in sys.modules if name.startswith( 'pyelliptic' ) ]
+        """
+        root = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+        self.assertEqual( subprocess.call( [ sys.executable, '-c', script, self.path ], cwd=root ), 0 )
+
+    def test_unknown_curve_id(self):
+        sock = self.connect()
+        try:
+            response_id, status, body = self.call( sock, 1, INFO, 12345 )
+            self.assertEqual( ( response_id, status ), ( 1, ERROR ) )
+            # The server is still serving
+            response_id, status, body = self.call( sock, 2, INFO, OpenSSL.get_curve( 'secp256k1' ) )
+            self.assertEqual( ( response_id, status, body ), ( 2, OK, COUNT.pack( 32 ) ) )
+        finally:
+            sock.close()
+
+    def test_failing_handler_answers_once(self):
+        def handle_info( curve, requests ):
+            requests[0].reply( "first" )
+            raise Exception( 'failed' )
+        original = daemon.HANDLERS[INFO]
+        daemon.HANDLERS[INFO] = handle_info
+        sock = self.connect()
+        try:
+            curve_id = OpenSSL.get_curve( 'secp256k1' )
+            # Both requests are handled in one batch
+            sock.sendall( REQUEST.pack( 1, INFO, curve_id, 0 ) + REQUEST.pack( 2, INFO, curve_id, 0 ) )
+            responses = sorted( [ self.response( sock ), self.response( sock ) ] )
+            self.assertEqual( responses[0][:2], ( 1, OK ) )
+            self.assertEqual( responses[1], ( 2, ERROR, 'failed' ) )
+            daemon.HANDLERS[INFO] = original
+            self.assertEqual( self.call( sock, 3, INFO, curve_id )[:2], ( 3, OK ) )
+        finally:
+            daemon.HANDLERS[INFO] = original
+            sock.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import random
+import unittest
+
+from echelper import ECHelper
+from curve import Curve
+
+class BatchInverseTest(unittest.TestCase):
+
+    def test_matches_single_inversions(self):
+        p = Curve( 'secp256k1' ).p
+        rng = random.Random( 0 )
+        values = [ rng.randrange( 1, p ) for _ in range( 50 ) ]
+        self.assertEqual( ECHelper.batch_inverse( values, p ), [ pow( a, p - 2, p ) for a in values ] )
+
+    def test_zero_has_no_inverse(self):
+        p = 101
+        self.assertEqual( ECHelper.batch_inverse( [ 3, 0, 202, 5 ], p ), [ 34, 0, 0, 81 ] )
+        self.assertEqual( ECHelper.batch_inverse( [ 0, 0 ], p ), [ 0, 0 ] )
+        self.assertEqual( ECHelper.batch_inverse( [], p ), [] )
+
+class ModularSqrtTest(unittest.TestCase):
+
+    def check(self, p):
+        for a in range( 50 ):
+            r = ECHelper.modular_sqrt( a, p )
+            if ECHelper.legendre_symbol( a, p ) == 1:
+                self.assertEqual( r * r % p, a )
+            else:
+                self.assertEqual( r, 0 )
+        self.assertEqual( ECHelper.modular_sqrt( p + 4, p ) ** 2 % p, 4 )
+
+    def test_p_3_mod_4(self):
+        self.check( Curve( 'secp256k1' ).p )
+
+    def test_p_1_mod_4(self):
+        self.check( Curve( 'secp224r1' ).p )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import threading
+import unittest
+
+from bignum import BigNumContext
+from curve import Curve
+from executor import Executor
+
+class BigNumContextTest(unittest.TestCase):
+
+    def test_per_thread(self):
+        contexts = {}
+        def record( name ):
+            contexts[name] = ( BigNumContext.get().ctx, BigNumContext.get().ctx )
+        threads = [ threading.Thread( target=record, args=( i, ) ) for i in range( 4 ) ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        record( 'main' )
+        # The same context on every call from a thread, a different one per thread
+        self.assertTrue( all( first == second for first, second in contexts.values() ) )
+        self.assertEqual( len( set( first for first, _ in contexts.values() ) ), 5 )
+
+    def test_release(self):
+        context = BigNumContext.get()
+        BigNumContext.release()
+        self.assertIsNot( BigNumContext.get(), context )
+
+class ExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = Executor( 3 )
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_result(self):
+        c = Curve( 'secp256k1' )
+        futures = [ self.executor.submit( c.mul_base, k ) for k in range( 1, 20 ) ]
+        self.assertEqual( [ f.result( 10 ) for f in futures ], [ k * c.G for k in range( 1, 20 ) ] )
+        self.assertTrue( all( f.done() and f.exception() is None for f in futures ) )
+
+    def test_exception(self):
+        def fail( message ):
+            raise ValueError( message )
+        future = self.executor.submit( fail, 'failed' )
+        self.assertRaises( ValueError, future.result, 10 )
+        self.assertTrue( isinstance( future.exception(), ValueError ) )
+        # The worker survives the exception
+        self.assertEqual( self.executor.submit( pow, 2, 8 ).result( 10 ), 256 )
+
+    def test_workers_use_own_contexts(self):
+        # Every call waits until all three have started, so
+        # each runs on a different worker
+        started = threading.Condition()
+        running = []
+        def context():
+            with started:
+                running.append( 1 )
+                started.notify_all()
+                while len( running ) < 3:
+                    started.wait( 10 )
+            return BigNumContext.get().ctx
+        futures = [ self.executor.submit( context ) for _ in range( 3 ) ]
+        self.assertEqual( len( set( f.result( 10 ) for f in futures ) ), 3 )
+
+    def test_map_and_callbacks(self):
+        self.assertEqual( self.executor.map( lambda x: x * x, range( 100 ), chunksize=7 ),
+                          [ x * x for x in range( 100 ) ] )
+        future = self.executor.submit( pow, 3, 3 )
+        future.result( 10 )
+        seen = []
+        future.add_done_callback( lambda f: seen.append( f.result() ) )
+        self.assertEqual( seen, [ 27 ] )
+
+    def test_cancel(self):
+        release = threading.Event()
+        blockers = [ self.executor.submit( release.wait, 10 ) for _ in range( 3 ) ]
+        queued = self.executor.submit( pow, 2, 2 )
+        self.assertTrue( queued.cancel() )
+        release.set()
+        for f in blockers:
+            f.result( 10 )
+        self.assertTrue( queued.cancelled() and queued.done() )
+        self.assertRaises( RuntimeError, queued.result, 10 )
+
+if __name__ == '__main__':
+    unittest.main()
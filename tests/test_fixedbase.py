@@ -0,0 +1,111 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import threading
+import unittest
+
+from curve import Curve, OPTIMIZED_METHODS
+import fixedbase as ec_fixedbase
+
+class FixedBasePointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        ec_fixedbase.cache.clear()
+
+    def tearDown(self):
+        ec_fixedbase.cache.clear()
+
+    def test_matches_ec_point_mul(self):
+        c = self.curve
+        P = 7 * c.G
+        for window in ( 1, 4, 5 ):
+            fixed = P.precompute( window )
+            for k in ( 0, 1, 2, 15, 16, c.order - 1, c.order, c.order + 5, c.scalars.next() ):
+                self.assertEqual( fixed * k, P * k )
+
+    def test_secret_multiplications_bypass_the_cache(self):
+        c = self.curve
+        P = 7 * c.G
+        for k in c.scalars.take( 2 * ec_fixedbase.cache.threshold ):
+            c.G * k
+            P * k
+            c.mul_base( k )
+        self.assertEqual( ec_fixedbase.cache.tables(), [] )
+
+    def test_mul_public_uses_the_cache(self):
+        c = self.curve
+        P = 7 * c.G
+        scalars = c.scalars.take( ec_fixedbase.cache.threshold + 2 )
+        self.assertEqual( [ P.mul_public( k ) for k in scalars ], [ P * k for k in scalars ] )
+        self.assertEqual( ec_fixedbase.cache.tables(), [ P ] )
+
+    def test_optimized_curve_is_not_cached(self):
+        c = Curve( 'P-256' )
+        self.assertIn( c.method, OPTIMIZED_METHODS )
+        self.assertTrue( c.optimized )
+        self.assertFalse( ec_fixedbase.cacheable( c ) )
+        scalars = c.scalars.take( 2 * ec_fixedbase.cache.threshold )
+        self.assertEqual( [ c.G.mul_public( k ) for k in scalars ], [ c.G * k for k in scalars ] )
+        self.assertEqual( ec_fixedbase.cache.tables(), [] )
+
+    def test_cached_after_threshold(self):
+        c = self.curve
+        self.assertNotIn( c.method, OPTIMIZED_METHODS )
+        self.assertTrue( ec_fixedbase.cacheable( c ) )
+        P = 7 * c.G
+        threshold = ec_fixedbase.cache.threshold
+        for k in c.scalars.take( threshold - 1 ):
+            P.mul_public( k )
+        self.assertEqual( ec_fixedbase.cache.tables(), [] )
+        P.mul_public( 5 )
+        self.assertEqual( ec_fixedbase.cache.tables(), [ P ] )
+
+    def test_table_built_once(self):
+        c = self.curve
+        built = []
+        original = ec_fixedbase.FixedBasePoint
+        class CountingPoint(original):
+            def __init__(self, *args, **kwargs):
+                built.append( 1 )
+                original.__init__( self, *args, **kwargs )
+        cache = ec_fixedbase.PrecomputationCache( threshold=1 )
+        results = []
+        def lookup():
+            results.append( cache.lookup( c.G ) )
+        ec_fixedbase.FixedBasePoint = CountingPoint
+        try:
+            threads = [ threading.Thread( target=lookup ) for _ in range( 8 ) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            ec_fixedbase.FixedBasePoint = original
+            cache.clear()
+        self.assertEqual( len( built ), 1 )
+        self.assertEqual( len( set( map( id, results ) ) ), 1 )
+
+if __name__ == "__main__":
+    unittest.main()
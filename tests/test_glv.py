@@ -0,0 +1,85 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import random
+import unittest
+
+from curve import Curve
+from point import Point
+import glv
+
+class GLVTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.engine = glv.GLVEngine( self.curve )
+        self.rng = random.Random( 0 )
+
+    def scalar(self):
+        return self.rng.randrange( 1, self.curve.order )
+
+    def point(self):
+        return self.curve.mul_base( self.scalar() )
+
+    def test_decompose(self):
+        for _ in range( 100 ):
+            k = self.scalar()
+            k1, k2 = glv.decompose( k )
+            self.assertEqual( ( k1 + k2 * glv.LAMBDA ) % glv.N, k )
+            self.assertTrue( abs( k1 ).bit_length() <= 129 and abs( k2 ).bit_length() <= 129 )
+
+    def test_wnaf(self):
+        for w in ( 2, 4, 5, 8 ):
+            for _ in range( 20 ):
+                k = self.scalar()
+                digits = glv.wnaf( k, w )
+                self.assertEqual( sum( d << i for i, d in enumerate( digits ) ), k )
+                nonzero = [ i for i, d in enumerate( digits ) if d ]
+                self.assertTrue( all( digits[i] % 2 == 1 and abs( digits[i] ) < 1 << ( w - 1 ) for i in nonzero ) )
+                self.assertTrue( all( j - i >= w for i, j in zip( nonzero, nonzero[1:] ) ) )
+
+    def test_mul_pair_matches_openssl(self):
+        c, e = self.curve, self.engine
+        for _ in range( 20 ):
+            a, b = self.scalar(), self.scalar()
+            P, Q = self.point(), self.point()
+            self.assertEqual( e.mul_pair( a, P, b, Q ), c.mul_pair( a, P, b, Q ) )
+            self.assertEqual( e.mul_pair( a, c.G, b, Q ), c.mul_pair( a, c.G, b, Q ) )
+            self.assertEqual( e.mul( P, a ), a * P )
+
+    def test_edge_cases(self):
+        c, e = self.curve, self.engine
+        P = self.point()
+        a = self.scalar()
+        self.assertTrue( e.mul_pair( a, P, c.order - a, P ).is_infinity() )
+        self.assertEqual( e.mul_pair( a, P, a, P ), ( 2 * a ) * P )
+        self.assertEqual( e.mul_pair( 0, P, a, c.G ), a * c.G )
+        self.assertEqual( e.mul_pair( a + c.order, P, 0, Point.infinity( c ) ), a * P )
+        self.assertTrue( e.mul_pair( 0, P, 0, c.G ).is_infinity() )
+
+    def test_rejects_other_curves(self):
+        self.assertRaises( Exception, glv.GLVEngine, Curve( 'prime256v1' ) )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from curve import Curve
+import hd
+
+SEED = "000102030405060708090a0b0c0d0e0f".decode( "hex" )
+
+# ( path, private key, chain code, compressed public key )
+BIP32_VECTOR_1 = [
+    ( "m",
+      "e8f32e723decf4051aefac8e2c93c9c5b214313817cdb01a1494b917c8436b35",
+      "873dff81c02f525623fd1fe5167eac3a55a049de3d314bb42ee227ffed37d508",
+      "0339a36013301597daef41fbe593a02cc513d0b55527ec2df1050e2e8ff49c85c2" ),
+    ( "m/0H",
+      "edb2e14f9ee77d26dd93b4ecede8d16ed408ce149b6cd80b0715a2d911a0afea",
+      "47fdacbd0f1097043b78c63c20c34ef4ed9a111d980047ad16282c7ae6236141",
+      "035a784662a4a20a65bf6aab9ae98a6c068a81c52e4b032c0fb5400c706cfccc56" ),
+    ( "m/0H/1",
+      "3c6cb8d0f6a264c91ea8b5030fadaa8e538b020f0a387421a12de9319dc93368",
+      "2a7857631386ba23dacac34180dd1983734e444fdbf774041578e9b6adb37c19",
+      "03501e454bf00751f24b1b489aa925215d66af2234e3891c3b21a52bedb3cd711c" ),
+    ( "m/0H/1/2H",
+      "cbce0d719ecf7431d88e6a89fa1483e02e35092af60c042b1df2ff59fa424dca",
+      "04466b9cc8e161e966409ca52986c584f07e9dc81f735db683c3ff6ec7b1503f",
+      "0357bfe1e341d01c69fe5654309956cbea516822fba8a601743a012a7896ee8dc2" ),
+    ( "m/0H/1/2H/2",
+      "0f479245fb19a38a1954c5c7c0ebab2f9bdfd96a17563ef28a6a4b1a2a764ef4",
+      "cfb71883f01676f587d023cc53a35bc7f88f724b1f8c2892ac1275ac822a3edd",
+      "02e8445082a72f29b75ca48748a914df60622a609cacfce8ed0e35804560741d29" ),
+    ( "m/0H/1/2H/2/1000000000",
+      "471b76e389e528d6de6d816857e012c5455051cad6660850e58372a6c3e6e7c8",
+      "c783e67b921d2beb8f6b389cc646d7263b4145701dadd2161548a8b078e65e9e",
+      "022a471424da5e657499d1ff51cb43c47481a03b1e77f951fe64cec9f5a48f7011" ),
+]
+
+# SLIP-0010 test vector 1 for nist256p1
+SLIP10_NIST256P1_VECTOR_1 = [
+    ( "m",
+      "612091aaa12e22dd2abef664f8a01a82cae99ad7441b7ef8110424915c268bc2",
+      "beeb672fe4621673f722f38529c07392fecaa61015c80c34f29ce8b41b3cb6ea",
+      "0266874dc6ade47b3ecd096745ca09bcd29638dd52c2c12117b11ed3e458cfa9e8" ),
+    ( "m/0H",
+      "6939694369114c67917a182c59ddb8cafc3004e63ca5d3b84403ba8613debc0c",
+      "3460cea53e6a6bb5fb391eeef3237ffd8724bf0a40e94943c98b83825342ee11",
+      "0384610f5ecffe8fda089363a41f56a5c7ffc1d81b59a612d0d649b2d22355590c" ),
+    ( "m/0H/1",
+      "284e9d38d07d21e4e281b645089a94f4cf5a5a81369acf151a1c3a57f18b2129",
+      "4187afff1aafa8445010097fb99d23aee9f599450c7bd140b6826ac22ba21d0c",
+      "03526c63f8d0b4bbbf9c80df553fe66742df4676b241dabefdef67733e070f6844" ),
+    ( "m/0H/1/2H",
+      "694596e8a54f252c960eb771a3c41e7e32496d03b954aeb90f61635b8e092aa7",
+      "98c7514f562e64e74170cc3cf304ee1ce54d6b6da4f880f313e8204c2a185318",
+      "0359cf160040778a4b14c5f4d7b76e327ccc8c4a6086dd9451b7482b5a4972dda0" ),
+    ( "m/0H/1/2H/2",
+      "5996c37fd3dd2679039b23ed6f70b506c6b56b3cb5e424681fb0fa64caf82aaa",
+      "ba96f776a5c3907d7fd48bde5620ee374d4acfd540378476019eab70790c63a0",
+      "029f871f4cb9e1c97f9f4de9ccd0d4a2f2a171110c61178f84430062230833ff20" ),
+    ( "m/0H/1/2H/2/1000000000",
+      "21c4f269ef0a5fd1badf47eeacebeeaa3de22eb8e5b0adcd0f27dd99d34d0119",
+      "b9b7b82d326bb9cb5b5b121066feea4eb93d5241103c9e7a18aad40f1dde8059",
+      "02216cd26d31147f72427a453c443ed2cde8a1e53c9cc44e5ddf739725413fe3f4" ),
+]
+
+class HDTest(unittest.TestCase):
+
+    def check(self, root, vector):
+        for path, private_key, chain_code, public_key in vector:
+            node = root.derive( path )
+            self.assertEqual( "%064x" % node.private_key, private_key )
+            self.assertEqual( node.chain_code.encode( "hex" ), chain_code )
+            self.assertEqual( node.public_key.to_bytes( True ).encode( "hex" ), public_key )
+            self.assertEqual( node.path, hd.parse_path( path ) )
+
+    def test_bip32_vector_1(self):
+        self.check( hd.HDNode.from_seed( Curve( 'secp256k1' ), SEED ), BIP32_VECTOR_1 )
+
+    def test_slip10_nist256p1_vector_1(self):
+        self.check( hd.HDNode.from_seed( Curve( 'prime256v1' ), SEED, key="Nist256p1 seed" ), SLIP10_NIST256P1_VECTOR_1 )
+
+    def test_public_derivation(self):
+        # m/0H/1/2H/2/1000000000 from the public key of m/0H/1/2H alone
+        node = hd.HDNode.from_seed( Curve( 'secp256k1' ), SEED ).derive( "m/0H/1/2H" )
+        public = node.neuter().derive( "2/1000000000" )
+        self.assertFalse( public.is_private() )
+        self.assertEqual( public.public_key.to_bytes( True ).encode( "hex" ), BIP32_VECTOR_1[-1][3] )
+        self.assertEqual( public.chain_code.encode( "hex" ), BIP32_VECTOR_1[-1][2] )
+        self.assertRaises( Exception, node.neuter().child, hd.HARDENED )
+
+    def test_derive_range(self):
+        root = hd.HDNode.from_seed( Curve( 'secp256k1' ), SEED )
+        for node in ( root, root.neuter() ):
+            self.assertEqual( node.derive_range( 0, 8 ), [ node.child( i ) for i in range( 8 ) ] )
+        start = hd.HARDENED - 2
+        self.assertEqual( root.derive_range( start, 4 ), [ root.child( i ) for i in range( start, start + 4 ) ] )
+
+    def test_paths(self):
+        self.assertEqual( hd.parse_path( "m/44'/0H/0h/7" ), ( 44 + hd.HARDENED, hd.HARDENED, hd.HARDENED, 7 ) )
+        self.assertEqual( hd.format_path( hd.parse_path( "m/44'/0'/0'/0" ) ), "m/44'/0'/0'/0" )
+
+    def test_key_tree(self):
+        curve = Curve( 'secp256k1' )
+        tree = hd.KeyTree.from_seed( curve, SEED )
+        root = hd.HDNode.from_seed( curve, SEED )
+        self.assertEqual( tree.node( "m/0H/1/2H" ), root.derive( "m/0H/1/2H" ) )
+        self.assertEqual( tree.node( "m/0H/1/2H/2" ), root.derive( "m/0H/1/2H/2" ) )
+        self.assertEqual( tree.node( "m/0H/1" ), root.derive( "m/0H/1" ) )
+        self.assertEqual( ( tree.hits, tree.misses ), ( 1, 2 ) )
+
+if __name__ == '__main__':
+    unittest.main()
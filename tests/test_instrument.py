@@ -0,0 +1,81 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import ctypes
+import unittest
+
+from pyelliptic.openssl import OpenSSL
+from curve import Curve
+from keypair import KeyPair
+from point import Point
+import instrument
+import sample_lsag
+
+class InstrumentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        keys = [ KeyPair( self.curve ) for _ in range( 5 ) ]
+        self.signature = sample_lsag.sign( self.curve, keys, 0 )
+
+    def tearDown(self):
+        instrument.disable()
+        instrument.reset()
+
+    def test_documented_call_count(self):
+        # The example in the module docstring: 4 EC_POINT_mul per ring member
+        with instrument.profile() as p:
+            self.assertTrue( sample_lsag.verify( self.curve, *self.signature ) )
+        self.assertEqual( p.stats['calls']['EC_POINT_mul']['count'], 20 )
+        self.assertEqual( p.stats['native'].get( 'EC_POINT', 0 ), 0 )
+        self.assertIn( 'EC_POINT_mul', p.report() )
+        self.assertFalse( instrument.is_enabled() )
+
+    def test_disable_restores_originals(self):
+        OpenSSL.bind_all()
+        before = dict( ( name, fn ) for name, fn in vars( OpenSSL ).items() if isinstance( fn, ctypes._CFuncPtr ) )
+        init = Point.__dict__['__init__']
+        instrument.enable()
+        self.assertTrue( instrument.is_enabled() )
+        self.assertIsNot( OpenSSL.EC_POINT_mul, before['EC_POINT_mul'] )
+        self.assertIsNot( Point.__dict__['__init__'], init )
+        instrument.disable()
+        self.assertFalse( instrument.is_enabled() )
+        after = dict( ( name, fn ) for name, fn in vars( OpenSSL ).items() if isinstance( fn, ctypes._CFuncPtr ) )
+        self.assertEqual( after, before )
+        self.assertIs( Point.__dict__['__init__'], init )
+        # Nothing is counted once disabled
+        instrument.reset()
+        2 * self.curve.G
+        self.assertEqual( instrument.stats()['calls'], {} )
+
+    def test_native_leak_is_counted(self):
+        with instrument.profile() as p:
+            leaked = OpenSSL.EC_POINT_new( self.curve.os_group )
+        self.assertEqual( p.stats['native']['EC_POINT'], 1 )
+        OpenSSL.EC_POINT_free( leaked )
+
+if __name__ == '__main__':
+    unittest.main()
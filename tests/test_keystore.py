@@ -0,0 +1,97 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from curve import Curve
+from keypair import KeyPair
+import keystore
+
+class KeyStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join( self.directory, 'keys.db' )
+        self.keys = KeyPair.generate_many( self.curve, 20 )
+
+    def tearDown(self):
+        shutil.rmtree( self.directory )
+
+    def test_round_trip(self):
+        keystore.save( self.curve, self.path, self.keys )
+        store = keystore.load( self.curve, self.path )
+        self.assertEqual( len( store ), len( self.keys ) )
+        self.assertTrue( store.has_private_keys() )
+        for key, stored in zip( self.keys, store ):
+            self.assertEqual( stored.private_key, key.private_key )
+            self.assertEqual( stored.public_key, key.public_key )
+            self.assertEqual( stored, key )
+        for i, key in enumerate( self.keys ):
+            self.assertEqual( store.index( key.public_key ), i )
+        self.assertEqual( store[-1].keypair().public_key, self.keys[-1].public_key )
+        store.close()
+
+    def test_slices(self):
+        keystore.save( self.curve, self.path, self.keys )
+        store = keystore.load( self.curve, self.path )
+        ring = store[5:10]
+        self.assertEqual( len( ring ), 5 )
+        self.assertEqual( ring[0].public_key, self.keys[5].public_key )
+        self.assertEqual( ring.index( self.keys[7].public_key ), 2 )
+        self.assertRaises( ValueError, ring.index, self.keys[0].public_key )
+        self.assertRaises( IndexError, ring.__getitem__, 5 )
+        # Closing a slice leaves the mapping of the store usable
+        ring.close()
+        self.assertEqual( store[9].public_key, self.keys[9].public_key )
+        store.close()
+
+    def test_public_only(self):
+        keystore.save( self.curve, self.path, self.keys, private=False )
+        store = keystore.load( self.curve, self.path )
+        self.assertFalse( store.has_private_keys() )
+        key = store[3]
+        self.assertEqual( key.public_key, self.keys[3].public_key )
+        self.assertFalse( hasattr( key, 'private_key' ) )
+        self.assertEqual( getattr( key, 'private_key', None ), None )
+        store.close()
+
+    def test_rejects_other_curve(self):
+        keystore.save( self.curve, self.path, self.keys )
+        self.assertRaises( Exception, keystore.load, Curve( 'secp256r1' ), self.path )
+
+    def test_load_or_generate(self):
+        store = keystore.load_or_generate( self.curve, self.path, 10 )
+        self.assertEqual( len( store ), 10 )
+        public_keys = [ key.public_key for key in store ]
+        again = keystore.load_or_generate( self.curve, self.path, 5 )
+        self.assertEqual( [ key.public_key for key in again ], public_keys[:5] )
+        for key in again:
+            self.assertEqual( key.private_key * self.curve.G, key.public_key )
+
+if __name__ == "__main__":
+    unittest.main()
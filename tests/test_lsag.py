@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from curve import Curve
+from keypair import KeyPair
+import sample_lsag
+
+class RingSignatureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.keys = KeyPair.generate_many( self.curve, 5 )
+
+    def check_scheme(self, scheme):
+        sign, verify = sample_lsag.SCHEMES[scheme]
+        c = self.curve
+        for signer in ( 0, 2, 4 ):
+            public_keys, message, c_0, ss, Y_tilde = sign( c, self.keys, signer, "message" )
+            self.assertTrue( verify( c, public_keys, message, c_0, ss, Y_tilde ) )
+            # The key image only depends on the signer
+            self.assertEqual( Y_tilde, sign( c, self.keys, signer, "other message" )[4] )
+
+            self.assertFalse( verify( c, public_keys, "massage", c_0, ss, Y_tilde ) )
+            self.assertFalse( verify( c, public_keys, message, ( c_0 + 1 ) % c.order, ss, Y_tilde ) )
+            tampered = list( ss )
+            tampered[signer] = ( tampered[signer] + 1 ) % c.order
+            self.assertFalse( verify( c, public_keys, message, c_0, tampered, Y_tilde ) )
+            self.assertFalse( verify( c, public_keys, message, c_0, ss, 2 * Y_tilde ) )
+            other_ring = public_keys[:]
+            other_ring[( signer + 1 ) % len( other_ring )] = KeyPair( c ).public_key
+            self.assertFalse( verify( c, other_ring, message, c_0, ss, Y_tilde ) )
+
+    def test_lsag(self):
+        self.check_scheme( "lsag" )
+
+    def test_clsag(self):
+        self.check_scheme( "clsag" )
+
+    def test_schemes_share_the_key_image(self):
+        c = self.curve
+        self.assertEqual( sample_lsag.sign( c, self.keys, 1 )[4], sample_lsag.clsag_sign( c, self.keys, 1 )[4] )
+
+    def test_encoding(self):
+        c = self.curve
+        for message in ( "message", "" ):
+            signature = sample_lsag.sign( c, self.keys, 3, message )
+            data = sample_lsag.encode_signature( c, signature )
+            decoded = sample_lsag.decode_signature( c, data )
+            self.assertEqual( decoded, signature )
+            self.assertTrue( sample_lsag.verify( c, *decoded ) )
+            self.assertEqual( sample_lsag.encode_signature( c, decoded ), data )
+
+    def test_decoding_rejects_truncated(self):
+        c = self.curve
+        data = sample_lsag.encode_signature( c, sample_lsag.sign( c, self.keys, 3, "message" ) )
+        # Inside the header, the message, a point and the last scalar
+        for length in ( 0, 3, sample_lsag.SIGNATURE_HEADER.size, 12, 40, len( data ) - 1 ):
+            self.assertRaises( Exception, sample_lsag.decode_signature, c, data[:length] )
+
+    def test_decoding_rejects_trailing_garbage(self):
+        c = self.curve
+        data = sample_lsag.encode_signature( c, sample_lsag.sign( c, self.keys, 3, "message" ) )
+        for garbage in ( "\0", "garbage", data ):
+            self.assertRaises( Exception, sample_lsag.decode_signature, c, data + garbage )
+
+    def test_decoding_rejects_bad_header_and_points(self):
+        c = self.curve
+        data = sample_lsag.encode_signature( c, sample_lsag.sign( c, self.keys, 3, "message" ) )
+        n, length = sample_lsag.SIGNATURE_HEADER.unpack_from( data, 0 )
+        body = data[sample_lsag.SIGNATURE_HEADER.size:]
+        for header in ( ( 0, length ), ( n + 1, length ), ( n, length + 1 ), ( n, 0xFFFFFFFF ) ):
+            self.assertRaises( Exception, sample_lsag.decode_signature, c, sample_lsag.SIGNATURE_HEADER.pack( *header ) + body )
+        # A first public key that is not on the curve
+        offset = sample_lsag.SIGNATURE_HEADER.size + length
+        bad_point = "\x02" + "\xff" * ( c.point_size( True ) - 1 )
+        bad = data[:offset] + bad_point + data[offset + len( bad_point ):]
+        self.assertRaises( Exception, sample_lsag.decode_signature, c, bad )
+
+if __name__ == "__main__":
+    unittest.main()
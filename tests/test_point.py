@@ -0,0 +1,100 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import random
+import unittest
+
+from curve import Curve
+from point import Point, PointAccumulator
+
+class PointAccumulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.rng = random.Random( 0 )
+        self.points = [ self.curve.mul_base( self.rng.randrange( 1, self.curve.order ) ) for _ in range( 20 ) ]
+
+    def chain(self, points, start=None):
+        # The same sum with Point.__add__
+        total = start if start is not None else Point.infinity( self.curve )
+        for point in points:
+            total = total + point
+        return total
+
+    def test_empty(self):
+        acc = PointAccumulator( self.curve )
+        self.assertTrue( acc.is_infinity() )
+        self.assertTrue( acc.value().is_infinity() )
+        self.assertEqual( acc.count, 0 )
+        acc.add_many( [] )
+        self.assertTrue( acc.value().is_infinity() )
+
+    def test_add(self):
+        acc = PointAccumulator( self.curve )
+        for point in self.points:
+            acc.add( point )
+        self.assertEqual( acc.value(), self.chain( self.points ) )
+        self.assertEqual( acc.count, len( self.points ) )
+
+    def test_add_many_and_iadd(self):
+        acc = PointAccumulator( self.curve, start=self.points[0] )
+        acc.add_many( self.points[1:10] )
+        for point in self.points[10:]:
+            acc += point
+        self.assertEqual( acc.value(), self.chain( self.points ) )
+
+    def test_infinity(self):
+        P = self.points[0]
+        acc = PointAccumulator( self.curve )
+        acc.add( P ).add( Point.infinity( self.curve ) )
+        self.assertEqual( acc.value(), P )
+        # P + (-P) is the point at infinity, and adding on from there works
+        acc.add_mul( self.curve.order - 1, P )
+        self.assertTrue( acc.is_infinity() )
+        self.assertEqual( acc.value(), self.chain( [ P, ( self.curve.order - 1 ) * P ] ) )
+        acc.add( self.points[1] )
+        self.assertEqual( acc.value(), self.points[1] )
+
+    def test_add_mul_and_mul(self):
+        scalars = [ self.rng.randrange( 1, self.curve.order ) for _ in self.points ]
+        acc = PointAccumulator( self.curve )
+        for k, point in zip( scalars, self.points ):
+            acc.add_mul( k, point )
+        expected = self.chain( [ k * point for k, point in zip( scalars, self.points ) ] )
+        self.assertEqual( acc.value(), expected )
+        acc *= 3
+        self.assertEqual( acc.value(), 3 * expected )
+
+    def test_reset(self):
+        acc = PointAccumulator( self.curve )
+        acc.add_many( self.points )
+        acc.reset()
+        self.assertTrue( acc.is_infinity() )
+        self.assertEqual( acc.count, 0 )
+        acc.add( self.points[0] )
+        self.assertEqual( acc.value(), self.points[0] )
+
+if __name__ == '__main__':
+    unittest.main()
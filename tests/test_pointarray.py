@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import pickle
+import random
+import unittest
+
+from curve import Curve
+from pointarray import PointArray
+
+class PointArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.rng = random.Random( 0 )
+        self.points = [ self.curve.mul_base( self.scalar() ) for _ in range( 17 ) ]
+        self.array = PointArray.from_points( self.curve, self.points )
+
+    def scalar(self):
+        return self.rng.randrange( 1, self.curve.order )
+
+    def test_round_trip(self):
+        self.assertEqual( len( self.array ), len( self.points ) )
+        self.assertEqual( list( self.array ), self.points )
+        self.assertEqual( self.array[-1], self.points[-1] )
+        self.assertEqual( self.array.record( 3 ), self.points[3].to_bytes() )
+
+    def test_mul(self):
+        scalars = [ self.scalar() for _ in self.points ]
+        expected = [ k * P for k, P in zip( scalars, self.points ) ]
+        for workers in ( None, 1, 4 ):
+            self.assertEqual( list( self.array.mul( scalars, workers=workers ) ), expected )
+        k = self.scalar()
+        self.assertEqual( list( self.array.mul( k, workers=4 ) ), [ k * P for P in self.points ] )
+        self.assertRaises( Exception, self.array.mul, scalars[1:] )
+
+    def test_add(self):
+        others = [ self.curve.mul_base( self.scalar() ) for _ in self.points ]
+        other = PointArray.from_points( self.curve, others )
+        expected = [ P + Q for P, Q in zip( self.points, others ) ]
+        for workers in ( None, 4 ):
+            self.assertEqual( list( self.array.add( other, workers=workers ) ), expected )
+        Q = others[0]
+        self.assertEqual( list( self.array.add( Q, workers=4 ) ), [ P + Q for P in self.points ] )
+
+    def test_infinity(self):
+        # P + (-P) and 0 * P are encoded as the point at infinity
+        negated = self.array.mul( self.curve.order - 1 )
+        self.assertTrue( all( P.is_infinity() for P in self.array.add( negated, workers=4 ) ) )
+        self.assertTrue( all( P.is_infinity() for P in PointArray.zeros( self.curve, 3 ) ) )
+
+    def test_slices(self):
+        part = self.array[2:9]
+        self.assertEqual( list( part ), self.points[2:9] )
+        self.assertEqual( list( self.array[1:12:3] ), self.points[1:12:3] )
+        scalars = [ self.scalar() for _ in range( len( part ) ) ]
+        self.assertEqual( list( part.mul( scalars, workers=2 ) ),
+                          [ k * P for k, P in zip( scalars, self.points[2:9] ) ] )
+
+    def test_pickle_slice(self):
+        part = self.array[5:11]
+        for protocol in range( pickle.HIGHEST_PROTOCOL + 1 ):
+            copy = pickle.loads( pickle.dumps( part, protocol ) )
+            self.assertEqual( len( copy ), 6 )
+            self.assertEqual( list( copy ), self.points[5:11] )
+            self.assertEqual( copy.to_bytes(), part.to_bytes() )
+
+    def test_pickle_shared_slice(self):
+        shared = self.array.share()
+        try:
+            part = shared[4:8]
+            copy = pickle.loads( pickle.dumps( part, pickle.HIGHEST_PROTOCOL ) )
+            self.assertEqual( list( copy ), self.points[4:8] )
+            # Both map the same file
+            shared.buffer[4*shared.width:5*shared.width] = self.points[0].to_bytes()
+            self.assertEqual( copy[0], self.points[0] )
+        finally:
+            shared.unlink()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from curve import Curve
+import fixedbase as ec_fixedbase
+import instrument
+import precomp
+
+class PrecompTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join( self.directory, 'G.tbl' )
+
+    def tearDown(self):
+        ec_fixedbase.cache.clear()
+        shutil.rmtree( self.directory )
+
+    def test_round_trip(self):
+        c = self.curve
+        P = 5 * c.G
+        precomp.save( P.precompute( 4 ), self.path )
+        fixed = precomp.load( c, self.path, P )
+        self.assertEqual( fixed, P )
+        self.assertEqual( fixed.window, 4 )
+        for k in c.scalars.take( 10 ):
+            self.assertEqual( fixed * k, P * k )
+
+    def test_rejects_other_point_and_curve(self):
+        c = self.curve
+        precomp.save( c.G.precompute( 4 ), self.path )
+        self.assertRaises( Exception, precomp.load, c, self.path, 2 * c.G )
+        self.assertRaises( Exception, precomp.load, Curve( 'secp256r1' ), self.path )
+
+    def test_load_or_build(self):
+        c = self.curve
+        fixed = precomp.load_or_build( c, self.path, cache=False )
+        self.assertTrue( os.path.exists( self.path ) )
+        self.assertEqual( fixed, c.G )
+        self.assertEqual( ec_fixedbase.cache.tables(), [] )
+        precomp.load_or_build( c, self.path )
+        self.assertEqual( ec_fixedbase.cache.tables(), [ c.G ] )
+
+    def test_concurrent_lazy_loading(self):
+        c = self.curve
+        precomp.save( c.G.precompute( 4 ), self.path )
+        scalars = c.scalars.take( 20 )
+        expected = [ c.G * k for k in scalars ]
+        results = []
+        with instrument.profile() as p:
+            fixed = precomp.load( c, self.path )
+            def work():
+                results.append( [ ( fixed * k ).to_bytes() for k in scalars ] )
+            threads = [ threading.Thread( target=work ) for _ in range( 8 ) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            fixed.free()
+        self.assertEqual( results, [ [ P.to_bytes() for P in expected ] ] * len( threads ) )
+        # Every entry decoded by more than one thread was freed
+        self.assertEqual( p.stats['native'].get( 'EC_POINT', 0 ), 0 )
+
+if __name__ == "__main__":
+    unittest.main()
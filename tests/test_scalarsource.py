@@ -0,0 +1,46 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from curve import Curve
+
+class ScalarSourceTest(unittest.TestCase):
+
+    def test_range(self):
+        for name in ( 'secp256k1', 'secp521r1', 'sect163k1' ):
+            c = Curve( name )
+            scalars = c.scalars.take( 500 )
+            self.assertEqual( len( scalars ), 500 )
+            self.assertEqual( len( set( scalars ) ), 500 )
+            self.assertTrue( all( 0 < k < c.order for k in scalars ) )
+            self.assertTrue( 0 < c.scalars.next() < c.order )
+
+    def test_nothing_kept_between_calls(self):
+        source = Curve( 'secp256k1' ).scalars
+        source.take( 3 * source.block_size // source.width )
+        self.assertFalse( any( source._ScalarSource__buffer ) )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from curve import Curve
+import schnorr
+
+# Test vectors 0-3 of BIP-340: secret key, public key,
+# auxiliary randomness, message and signature
+SIGNING_VECTORS = [
+    ( "0000000000000000000000000000000000000000000000000000000000000003",
+      "F9308A019258C31049344F85F89D5229B531C845836F99B08601F113BCE036F9",
+      "0000000000000000000000000000000000000000000000000000000000000000",
+      "0000000000000000000000000000000000000000000000000000000000000000",
+      "E907831F80848D1069A5371B402410364BDF1C5F8307B0084C55F1CE2DCA8215"
+      "25F66A4A85EA8B71E482A74F382D2CE5EBEEE8FDB2172F477DF4900D310536C0" ),
+    ( "B7E151628AED2A6ABF7158809CF4F3C762E7160F38B4DA56A784D9045190CFEF",
+      "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+      "0000000000000000000000000000000000000000000000000000000000000001",
+      "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+      "6896BD60EEAE296DB48A229FF71DFE071BDE413E6D43F917DC8DCF8C78DE3341"
+      "8906D11AC976ABCCB20B091292BFF4EA897EFCB639EA871CFA95F6DE339E4B0A" ),
+    ( "C90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B14E5C9",
+      "DD308AFEC5777E13121FA72B9CC1B7CC0139715309B086C960E18FD969774EB8",
+      "C87AA53824B4D7AE2EB035A2B5BBBCCC080E76CDC6D1692C4B0B62D798E6D906",
+      "7E2D58D8B3BCDF1ABADEC7829054F90DDA9805AAB56C77333024B9D0A508B75C",
+      "5831AAEED7B44BB74E5EAB94BA9D4294C49BCF2A60728D8B4C200F50DD313C1B"
+      "AB745879A5AD954A72C45A91C3A51D3C7ADEA98D82F8481E0E1E03674A6F3FB7" ),
+    ( "0B432B2677937381AEF05BB02A66ECD012773062CF3FA2549E44F58ED2401710",
+      "25D1DFF95105F5253C4022F628A996AD3A0D95FBF21D468A1B33F8C160D8F517",
+      "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF",
+      "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF",
+      "7EB0509757E246F19449885651611CB965ECC1A187DD51B64FDA1EDC9637D5EC"
+      "97582B9CB13DB3933705B32BA982AF5AF25FD78881EBB32771FC5922EFC66EA3" ),
+]
+
+def unhex(s):
+    return s.decode( "hex" )
+
+class SchnorrTest(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = Curve( 'secp256k1' )
+
+    def test_bip340_vectors(self):
+        c = self.curve
+        for secret, public, aux, message, signature in SIGNING_VECTORS:
+            k = int( secret, 16 )
+            self.assertEqual( schnorr.public_key( c, k ), unhex( public ) )
+            self.assertEqual( schnorr.sign( c, k, unhex( message ), unhex( aux ) ), unhex( signature ) )
+            self.assertTrue( schnorr.verify( c, unhex( public ), unhex( message ), unhex( signature ) ) )
+
+    def test_rejects_tampered_signatures(self):
+        c = self.curve
+        _, public, _, message, signature = SIGNING_VECTORS[1]
+        public, message, signature = unhex( public ), unhex( message ), unhex( signature )
+        flipped = lambda s, i: s[:i] + chr( ord( s[i] ) ^ 1 ) + s[i + 1:]
+        self.assertFalse( schnorr.verify( c, public, flipped( message, 0 ), signature ) )
+        self.assertFalse( schnorr.verify( c, public, message, flipped( signature, 5 ) ) )
+        self.assertFalse( schnorr.verify( c, public, message, flipped( signature, 40 ) ) )
+        self.assertFalse( schnorr.verify( c, flipped( public, 31 ), message, signature ) )
+        # s not below the order
+        self.assertFalse( schnorr.verify( c, public, message, signature[:32] + schnorr.int_to_bytes( c, c.order ) ) )
+        self.assertFalse( schnorr.verify( c, public, message, signature[:-1] ) )
+
+    def test_batch_verify(self):
+        c = self.curve
+        items = [ ( unhex( public ), unhex( message ), unhex( signature ) )
+                  for _, public, _, message, signature in SIGNING_VECTORS ]
+        for k in c.scalars.take( 10 ):
+            message = "message %d" % k
+            items.append( ( schnorr.public_key( c, k ), message, schnorr.sign( c, k, message ) ) )
+        self.assertTrue( schnorr.batch_verify( c, items ) )
+        self.assertTrue( schnorr.batch_verify( c, [] ) )
+        public, message, signature = items[6]
+        items[6] = ( public, message + "!", signature )
+        self.assertFalse( schnorr.batch_verify( c, items ) )
+
+    def test_other_curves(self):
+        for name in ( 'secp256r1', 'secp384r1', 'secp521r1' ):
+            c = Curve( name )
+            k = c.scalars.next()
+            signature = schnorr.sign( c, k, "message" )
+            self.assertEqual( len( signature ), 2 * c.field_bytes )
+            self.assertTrue( schnorr.verify( c, schnorr.public_key( c, k ), "message", signature ) )
+            self.assertFalse( schnorr.verify( c, schnorr.public_key( c, k ), "massage", signature ) )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import io
+import unittest
+
+from curve import Curve
+from executor import Executor
+from keypair import KeyPair
+import sample_lsag
+import verifier
+
+CURVE = 'secp256k1'
+
+class VerifyStreamTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        curve = Curve( CURVE )
+        keys = [ KeyPair( curve ) for _ in range( 3 ) ]
+        cls.records = [ sample_lsag.encode_signature( curve, sample_lsag.sign( curve, keys, i % 3, "message %d" % i ) ).encode( "hex" )
+                        for i in range( 7 ) ]
+
+    def setUp(self):
+        self.pool = Executor( 2 )
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def verify(self, records, max_in_flight=3):
+        return list( verifier.verify_stream( records, CURVE, self.pool, max_in_flight ) )
+
+    def test_valid_stream(self):
+        results = self.verify( self.records )
+        self.assertEqual( [ ( index, result ) for index, result, _ in results ],
+                          [ ( i, 'valid' ) for i in range( len( self.records ) ) ] )
+        self.assertTrue( all( latency >= 0 for _, _, latency in results ) )
+
+    def test_forged_item(self):
+        records = list( self.records )
+        # Change the first byte of the message of the fourth signature
+        data = bytearray( records[3].decode( "hex" ) )
+        data[sample_lsag.SIGNATURE_HEADER.size] ^= 1
+        records[3] = str( data ).encode( "hex" )
+        records[5] = "not hex"
+        results = [ result for _, result, _ in self.verify( records ) ]
+        self.assertEqual( results[:5], [ 'valid', 'valid', 'valid', 'invalid', 'valid' ] )
+        self.assertTrue( results[5].startswith( 'error: ' ) )
+        self.assertEqual( results[6], 'valid' )
+
+    def test_partial_batch_is_flushed(self):
+        # Fewer records than max_in_flight: all are yielded at the end of the input
+        results = self.verify( self.records[:2], max_in_flight=8 )
+        self.assertEqual( [ ( index, result ) for index, result, _ in results ], [ ( 0, 'valid' ), ( 1, 'valid' ) ] )
+
+    def test_read_ahead_is_bounded(self):
+        read = []
+        def records():
+            for record in self.records:
+                read.append( record )
+                yield record
+        for index, result, _ in verifier.verify_stream( records(), CURVE, self.pool, 2 ):
+            self.assertTrue( len( read ) <= index + 2 )
+
+    def test_read_error_flushes_pending(self):
+        def records():
+            for record in self.records[:3]:
+                yield record
+            raise IOError( 'read failed' )
+        seen = []
+        try:
+            for index, result, _ in verifier.verify_stream( records(), CURVE, self.pool, 8 ):
+                seen.append( ( index, result ) )
+        except IOError:
+            pass
+        else:
+            self.fail( 'the read error was not raised' )
+        self.assertEqual( seen, [ ( 0, 'valid' ), ( 1, 'valid' ), ( 2, 'valid' ) ] )
+
+class ReadBinaryTest(unittest.TestCase):
+
+    def test_records(self):
+        data = "".join( verifier.LENGTH.pack( len( r ) ) + r for r in [ "abc", "", "defg" ] )
+        self.assertEqual( list( verifier.read_binary( io.BytesIO( data ), 16 ) ), [ "abc", "", "defg" ] )
+
+    def test_truncated(self):
+        data = verifier.LENGTH.pack( 5 ) + "abc"
+        self.assertRaises( Exception, list, verifier.read_binary( io.BytesIO( data ), 16 ) )
+        self.assertRaises( Exception, list, verifier.read_binary( io.BytesIO( "\x00\x00" ), 16 ) )
+        self.assertRaises( Exception, list, verifier.read_binary( io.BytesIO( verifier.LENGTH.pack( 17 ) ), 16 ) )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,272 @@
+# MIT License
+#
+# Copyright (C) 2014 Jesper Borgstrup
+# -------------------------------------------------------------------
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Streaming verifier for dumps of LSAG signatures.
+
+    python verifier.py [options] [file ...]
+
+reads signatures encoded with sample_lsag.encode_signature from the
+files, or from stdin if none (or -) is given. With --format lines
+(the default) each non-empty line holds one hex-encoded signature;
+with --format binary each signature is preceded by its length as a
+4-byte big-endian integer.
+
+The signatures are decoded and verified on a pool of worker threads,
+or processes with --processes. At most --max-in-flight signatures are
+read but not yet written, so memory use does not grow with the input.
+One line per signature is written to stdout, in input order:
+
+    <index> valid
+    <index> invalid
+    <index> error: <reason>
+
+followed by a throughput and latency summary on stderr. The exit
+status is 0 if every signature was valid, 1 if any was not, and 2 if
+the input could not be read.
+"""
+
+import collections
+import multiprocessing
+import optparse
+import random
+import struct
+import sys
+import time
+
+from curve import Curve
+import executor as ec_executor
+import sample_lsag
+
+LENGTH = struct.Struct( ">I" )
+# Latencies kept for the percentiles in the summary
+LATENCY_SAMPLES = 10000
+
+def read_lines( stream ):
+    """
+    Yields the hex-encoded signature on every non-empty line.
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+def read_binary( stream, max_size ):
+    """
+    Yields every length-prefixed signature.
+    """
+    while True:
+        prefix = stream.read( LENGTH.size )
+        if not prefix:
+            return
+        if len( prefix ) < LENGTH.size:
+            raise Exception( 'Input ends inside a length prefix' )
+        size, = LENGTH.unpack( prefix )
+        if size > max_size:
+            raise Exception( 'Signature of %d bytes is larger than the maximum %d' % ( size, max_size ) )
+        record = stream.read( size )
+        if len( record ) < size:
+            raise Exception( 'Input ends inside a signature' )
+        yield record
+
+def read_inputs( paths, binary=False, max_size=1 << 24 ):
+    """
+    Yields the signatures in every file of paths in turn
+    (- being stdin).
+    """
+    for path in paths or [ "-" ]:
+        stream = sys.stdin if path == "-" else open( path, "rb" )
+        try:
+            if binary:
+                for record in read_binary( stream, max_size ):
+                    yield record
+            else:
+                for record in read_lines( stream ):
+                    yield record
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+# Curves by name, made once per worker process
+_curves = {}
+
+def verify_record( curvename, record, binary ):
+    """
+    Decodes and verifies one signature and returns
+    'valid', 'invalid' or 'error: <reason>'.
+    """
+    try:
+        curve = _curves.get( curvename )
+        if curve is None:
+            curve = _curves.setdefault( curvename, Curve( curvename ) )
+        data = record if binary else record.decode( "hex" )
+        if sample_lsag.verify( curve, *sample_lsag.decode_signature( curve, data ) ):
+            return 'valid'
+        return 'invalid'
+    except Exception, e:
+        return 'error: %s' % e
+
+class ProcessPool:
+    '''
+    A multiprocessing.Pool with the submit interface of an Executor.
+    '''
+
+    def __init__(self, workers):
+        '''
+        Constructor
+        '''
+        self.workers = workers
+        self.pool = multiprocessing.Pool( workers )
+
+    def submit(self, fn, *args):
+        return ProcessFuture( self.pool.apply_async( fn, args ) )
+
+    def shutdown(self):
+        self.pool.close()
+        self.pool.join()
+
+class ProcessFuture:
+    '''
+    The result of a ProcessPool call.
+    '''
+
+    def __init__(self, async_result):
+        '''
+        Constructor
+        '''
+        self.async_result = async_result
+
+    def result(self):
+        return self.async_result.get()
+
+def verify_stream( records, curvename, pool, max_in_flight, binary=False ):
+    """
+    Verifies the signatures of the iterable records on pool and
+    yields ( index, result, latency ) for each in input order,
+    latency being the seconds from reading to the result. Records
+    are only read while fewer than max_in_flight are pending.
+    If reading fails, the pending results are yielded before
+    the exception is raised again.
+    """
+    pending = collections.deque()
+    error = None
+    try:
+        for index, record in enumerate( records ):
+            pending.append( ( index, time.time(), pool.submit( verify_record, curvename, record, binary ) ) )
+            if len( pending ) >= max_in_flight:
+                index, t_read, future = pending.popleft()
+                result = future.result()
+                yield index, result, time.time() - t_read
+    except Exception:
+        error = sys.exc_info()
+    while pending:
+        index, t_read, future = pending.popleft()
+        result = future.result()
+        yield index, result, time.time() - t_read
+    if error is not None:
+        raise error[0], error[1], error[2]
+
+class Summary:
+    '''
+    Counts the results of verify_stream, keeping a random sample
+    of at most LATENCY_SAMPLES latencies for the percentiles.
+    '''
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.t_start = time.time()
+        self.counts = { 'valid': 0, 'invalid': 0, 'error': 0 }
+        self.latencies = []
+        self.total = 0
+        self.max_latency = 0.0
+
+    def add(self, result, latency):
+        self.counts[result.split( ':' )[0]] += 1
+        self.total += 1
+        self.max_latency = max( self.max_latency, latency )
+        # Reservoir sampling
+        if len( self.latencies ) < LATENCY_SAMPLES:
+            self.latencies.append( latency )
+        else:
+            i = random.randint( 0, self.total - 1 )
+            if i < LATENCY_SAMPLES:
+                self.latencies[i] = latency
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        latencies = sorted( self.latencies )
+        return latencies[min( len( latencies ) - 1, int( p * len( latencies ) ) )]
+
+    def __str__(self):
+        t = time.time() - self.t_start
+        return "%d signatures (%d valid, %d invalid, %d errors) in %.3f seconds, %.1f signatures/s; " \
+               "latency p50 %.2f ms, p95 %.2f ms, max %.2f ms" \
+                    % ( self.total, self.counts['valid'], self.counts['invalid'], self.counts['error'],
+                        t, self.total / t if t > 0 else 0.0, 1000 * self.percentile( 0.5 ),
+                        1000 * self.percentile( 0.95 ), 1000 * self.max_latency )
+
+def main( argv=None ):
+    parser = optparse.OptionParser( usage="python verifier.py [options] [file ...]" )
+    parser.add_option( "-c", "--curve", default=sample_lsag.CURVE, help="curve of the signatures [%default]" )
+    parser.add_option( "-f", "--format", choices=[ "lines", "binary" ], default="lines",
+                       help="lines (hex, one per line) or binary (length-prefixed) [%default]" )
+    parser.add_option( "-w", "--workers", type="int", default=ec_executor.cpu_count(),
+                       help="worker threads or processes [%default]" )
+    parser.add_option( "--processes", action="store_true", default=False,
+                       help="verify on worker processes instead of threads" )
+    parser.add_option( "--max-in-flight", type="int",
+                       help="signatures read but not written at most [4 * workers]" )
+    parser.add_option( "--max-size", type="int", default=1 << 24,
+                       help="largest binary signature in bytes [%default]" )
+    parser.add_option( "-q", "--quiet", action="store_true", default=False,
+                       help="only write the summary" )
+    options, paths = parser.parse_args( argv )
+
+    binary = options.format == "binary"
+    max_in_flight = options.max_in_flight or 4 * options.workers
+    pool = ProcessPool( options.workers ) if options.processes else ec_executor.Executor( options.workers )
+    summary = Summary()
+    status = 0
+    try:
+        records = read_inputs( paths, binary, options.max_size )
+        for index, result, latency in verify_stream( records, options.curve, pool, max_in_flight, binary ):
+            summary.add( result, latency )
+            if result != 'valid':
+                status = 1
+            if not options.quiet:
+                sys.stdout.write( "%d %s\n" % ( index, result ) )
+    except Exception, e:
+        sys.stderr.write( "verifier: %s\n" % e )
+        status = 2
+    finally:
+        sys.stdout.flush()
+        pool.shutdown()
+    sys.stderr.write( "%s\n" % summary )
+    return status
+
+if __name__ == "__main__":
+    sys.exit( main() )